@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+API Quota Manager
+Token buckets that spread each news API's daily request allowance over the
+day, persisted in SQLite so restarts never reset the count
+"""
+
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Requests per UTC day each provider allows (both free tiers: 100)
+NEWSAPI_DAILY_LIMIT = int(os.getenv('NEWSAPI_DAILY_LIMIT', 100))
+GNEWS_DAILY_LIMIT = int(os.getenv('GNEWS_DAILY_LIMIT', 100))
+# Most requests one aggregation cycle may send to a provider: enough for
+# the all-Africa query plus one per country after an idle stretch
+API_BURST = int(os.getenv('NEWS_API_BURST', 13))
+
+SECONDS_PER_DAY = 86400
+
+
+def _utc_day(now: float) -> str:
+    """Quota day of a timestamp; provider quotas reset at midnight UTC"""
+    return datetime.fromtimestamp(now, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+class TokenBucket:
+    """Daily request budget for one API
+
+    Tokens refill at daily_limit per day up to burst, so a cycle can spend a
+    burst at once while the day as a whole stays under daily_limit; used
+    counts requests made on the current UTC day as a hard cap.
+    """
+
+    __slots__ = ('api', 'daily_limit', 'burst', 'tokens', 'used', 'day', 'updated_at')
+
+    def __init__(self, api: str, daily_limit: int, burst: int, tokens: Optional[float] = None,
+                 used: int = 0, day: Optional[str] = None, updated_at: Optional[float] = None):
+        self.api = api
+        self.daily_limit = daily_limit
+        self.burst = burst
+        self.tokens = float(burst) if tokens is None else min(tokens, burst)
+        self.used = used
+        self.updated_at = time.time() if updated_at is None else updated_at
+        self.day = day or _utc_day(self.updated_at)
+
+    def refill(self, now: float):
+        day = _utc_day(now)
+        if day != self.day:
+            self.day = day
+            self.used = 0
+        elapsed = max(now - self.updated_at, 0.0)
+        self.tokens = min(self.burst, self.tokens + elapsed * self.daily_limit / SECONDS_PER_DAY)
+        self.updated_at = now
+
+    def available(self, now: float) -> int:
+        """Requests that may be made right now"""
+        self.refill(now)
+        return max(min(int(self.tokens), self.daily_limit - self.used), 0)
+
+    def take(self, count: int, now: float) -> int:
+        """Spend up to count tokens; returns how many were granted"""
+        granted = min(count, self.available(now))
+        self.tokens -= granted
+        self.used += granted
+        return granted
+
+
+class ApiQuotaManager:
+    """Token buckets for every news API, stored in the api_quota table
+
+    Not thread-safe; the aggregation that spends it runs one cycle at a time.
+    """
+
+    def __init__(self, db_path: str, writer=None):
+        self.db_path = db_path
+        # Optional SQLiteWriter; without one, flush() opens its own connection
+        self.writer = writer
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._stored: Dict[str, tuple] = {}
+        self._dirty = set()
+
+        self.init_table()
+        self.load()
+
+    def init_table(self):
+        """Create the quota table if needed"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS api_quota (
+                    api TEXT PRIMARY KEY,
+                    day TEXT NOT NULL,
+                    used INTEGER NOT NULL,
+                    tokens REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            ''')
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            logger.error(f"API quota table initialization error: {e}")
+
+    def load(self):
+        """Load stored budgets; they are applied when each API is configured"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            for api, day, used, tokens, updated_at in conn.execute(
+                    'SELECT api, day, used, tokens, updated_at FROM api_quota'):
+                self._stored[api] = (day, used, tokens, updated_at)
+            conn.close()
+        except Exception as e:
+            logger.error(f"Error loading API quotas: {e}")
+
+    def configure(self, api: str, daily_limit: int, burst: int):
+        """Set an API's daily limit and the most it may spend at once"""
+        burst = max(min(burst, daily_limit), 0)
+        stored = self._stored.get(api)
+        if stored is not None:
+            day, used, tokens, updated_at = stored
+            bucket = TokenBucket(api, daily_limit, burst, tokens=tokens, used=used,
+                                 day=day, updated_at=updated_at)
+        else:
+            bucket = TokenBucket(api, daily_limit, burst)
+        self._buckets[api] = bucket
+
+    def available(self, api: str, now: Optional[float] = None) -> int:
+        """Requests the API may receive right now"""
+        bucket = self._buckets.get(api)
+        if bucket is None:
+            return 0
+        return bucket.available(time.time() if now is None else now)
+
+    def acquire(self, api: str, count: int = 1, now: Optional[float] = None) -> int:
+        """Reserve up to count requests; returns how many were granted"""
+        bucket = self._buckets.get(api)
+        if bucket is None:
+            return 0
+        granted = bucket.take(count, time.time() if now is None else now)
+        if granted:
+            self._dirty.add(api)
+        if granted < count:
+            logger.info(f"{api} quota: {granted}/{count} requests granted, "
+                        f"{bucket.used}/{bucket.daily_limit} used today")
+        return granted
+
+    def stats(self) -> Dict[str, Dict]:
+        """Budget state of every configured API"""
+        now = time.time()
+        return {
+            api: {
+                'daily_limit': bucket.daily_limit,
+                'used_today': bucket.used,
+                'available': bucket.available(now),
+            }
+            for api, bucket in self._buckets.items()
+        }
+
+    def flush(self):
+        """Write budgets spent since the last flush"""
+        if not self._dirty:
+            return
+
+        sql = '''
+            INSERT OR REPLACE INTO api_quota (api, day, used, tokens, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+        '''
+        rows = []
+        for api in self._dirty:
+            bucket = self._buckets[api]
+            rows.append((api, bucket.day, bucket.used, bucket.tokens, bucket.updated_at))
+        try:
+            if self.writer is not None:
+                self.writer.submit(sql, rows)
+            else:
+                conn = sqlite3.connect(self.db_path)
+                conn.executemany(sql, rows)
+                conn.commit()
+                conn.close()
+            self._dirty.clear()
+        except Exception as e:
+            logger.error(f"Error saving API quotas: {e}")
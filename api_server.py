@@ -3,14 +3,25 @@
 Simple API server to serve aggregated news data to the React frontend
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 import json
 import os
 from datetime import datetime, timedelta
 import logging
 from news_aggregator_clean import AfricanNewsAggregator
+from news_snapshot import NewsSnapshot, SnapshotWatcher, StagedPublisher
+from article_store import SORT_ORDERS
+from pagination import cursor_sort_key, decode_cursor, next_cursor
+from response_cache import (CACHE_CONTROL, ResponseCache, dynamic_etag,
+                            not_modified, snapshot_tag)
+from refresh_coordinator import RefreshCoordinator
+from trending import DEFAULT_WINDOW, MAX_TOPICS, WINDOWS, TrendingEngine
+from news_export import JSON_EXPORT_FILE, ExportFollower
+from binary_snapshot import BINARY_SNAPSHOT_FILE
+from leader_lease import FOLLOW_INTERVAL, SHARED_WORKERS, LeaderLease
 import asyncio
+import atexit
 import threading
 import time
 
@@ -23,12 +34,235 @@ CORS(app)  # Enable CORS for React frontend
 
 # Global aggregator instance
 aggregator = AfricanNewsAggregator()
+
+# Aggregations run on one long-lived loop so the feed session (keep-alive
+# connections, cached DNS) is reused between polls
+aggregation_loop = asyncio.new_event_loop()
+
+
+def close_aggregator():
+    """Close the feed session on its loop, then flush pending writes"""
+    try:
+        aggregation_loop.run_until_complete(aggregator.aclose())
+    except RuntimeError:
+        # The loop is busy with an aggregation the process is abandoning
+        aggregator.close()
+
+
+atexit.register(close_aggregator)
 news_cache = {
     'articles': [],
+    'snapshot': NewsSnapshot(()),
     'last_updated': None,
-    'trending_topics': []
+    # Ranked topics per trending window
+    'trending_topics': {},
+    # Modification time of the cache file the articles were loaded from
+    'file_mtime': None
 }
 
+# Tails the aggregator daemon's NDJSON snapshot and delta log
+export_follower = ExportFollower()
+
+
+# Topic counts, updated with each batch of articles the server loads
+trending_engine = TrendingEngine()
+
+# Under gunicorn with several workers, the lease holder updates the cache
+# and saves it as a binary snapshot; the other workers serve that file
+leader_lease = LeaderLease(aggregator.db_path) if SHARED_WORKERS else None
+if leader_lease is not None:
+    atexit.register(leader_lease.stop)
+snapshot_watcher = SnapshotWatcher(BINARY_SNAPSHOT_FILE)
+# Version of the last snapshot saved for other workers and restarts
+saved_version = None
+
+
+def set_cached_articles(articles):
+    """Replace the served articles, rebuild their indexes and responses"""
+    try:
+        trending_engine.add(articles)
+        news_cache['trending_topics'] = trending_engine.rankings()
+    except Exception as e:
+        logger.error(f"Error updating trending topics: {e}")
+    news_cache['last_updated'] = datetime.now().isoformat()
+
+    snapshot = NewsSnapshot.build(
+        articles, version=news_cache['snapshot'].version + 1)
+    snapshot.topics = news_cache['trending_topics']
+    try:
+        snapshot.responses = render_responses(snapshot, articles)
+    except Exception as e:
+        logger.error(f"Error pre-rendering responses: {e}")
+
+    news_cache['articles'] = articles
+    news_cache['snapshot'] = snapshot
+
+
+def load_binary_snapshot(prerender=False):
+    """Serve the binary snapshot straight from its mapping, if it changed
+
+    Nothing is parsed, so the server answers within milliseconds of
+    starting; the first cache update replaces it with fresher articles.
+    Workers that are not the leader call this to follow the leader.
+    """
+    global saved_version
+    snapshot = snapshot_watcher.poll()
+    if snapshot is None:
+        return False
+    if prerender:
+        try:
+            snapshot.responses = render_responses(snapshot, snapshot.articles)
+        except Exception as e:
+            logger.error(f"Error pre-rendering responses: {e}")
+    news_cache['articles'] = snapshot.articles
+    news_cache['snapshot'] = snapshot
+    news_cache['trending_topics'] = snapshot.topics
+    news_cache['last_updated'] = snapshot.built_at.isoformat()
+    saved_version = snapshot.version
+    logger.info(f"Mapped {len(snapshot)} articles from {BINARY_SNAPSHOT_FILE}")
+    return True
+
+
+def save_snapshot():
+    """Save the served snapshot for other workers and restarts, if it changed"""
+    global saved_version
+    snapshot = news_cache['snapshot']
+    if snapshot.version == saved_version:
+        return
+    try:
+        if snapshot.save(BINARY_SNAPSHOT_FILE):
+            saved_version = snapshot.version
+    except Exception as e:
+        logger.error(f"Error saving binary snapshot: {e}")
+
+
+def news_payload(snapshot, page=1, limit=20, sort='recent', cursor=None, **filters):
+    """Body of /api/news for one snapshot"""
+    if cursor is not None:
+        # Keyset page: continues after the cursor even if the snapshot changed
+        total, paginated_articles, has_more = snapshot.page_after(
+            cursor_sort_key(cursor), limit, **filters)
+    else:
+        # Posting lists for newest first, the column store otherwise
+        start_idx = (page - 1) * limit
+        total, paginated_articles = snapshot.page(
+            start_idx, limit, sort=sort, **filters)
+        has_more = start_idx + limit < total
+
+    return {
+        'success': True,
+        'articles': paginated_articles,
+        'total': total,
+        'page': page,
+        'limit': limit,
+        'has_more': has_more,
+        # Cursors follow the newest-first order only
+        'next_cursor': next_cursor(paginated_articles, has_more) if sort == 'recent' else None,
+        'last_updated': news_cache['last_updated']
+    }
+
+
+def trending_payload(window=DEFAULT_WINDOW, limit=10):
+    topics = news_cache['trending_topics'].get(window, ())[:limit]
+    return {
+        'success': True,
+        # (topic, mentions) pairs, as before; topics adds score and velocity
+        'trending_topics': [[topic['topic'], topic['count']] for topic in topics],
+        'topics': list(topics),
+        'window': window,
+        'last_updated': news_cache['last_updated']
+    }
+
+
+def sources_payload():
+    sources = []
+    for name, config in aggregator.news_sources.items():
+        sources.append({
+            'id': name,
+            'name': config['name'],
+            'country': config['country'],
+            'language': config['language'],
+            'category': config['category'],
+            'credibility': config['credibility']
+        })
+
+    return {
+        'success': True,
+        'sources': sources
+    }
+
+
+def categories_payload(articles):
+    categories = list(set(a.get('category', 'general') for a in articles))
+    return {
+        'success': True,
+        'categories': sorted(categories)
+    }
+
+
+def countries_payload(articles):
+    countries = set()
+    for article in articles:
+        countries.update(article.get('country_focus', []))
+
+    return {
+        'success': True,
+        'countries': sorted(list(countries))
+    }
+
+
+def news_key(category='', country=''):
+    """Response cache key for a first page of /api/news"""
+    return f"news:{category.lower()}:{country.lower()}"
+
+
+def render_responses(snapshot, articles):
+    """Pre-render the common responses of a snapshot before it is served"""
+    cache = ResponseCache(snapshot_tag(snapshot))
+
+    # Default first pages: unfiltered, per category and per country
+    cache.add(news_key(), news_payload(snapshot))
+    for category in snapshot.postings['category']:
+        cache.add(news_key(category=category),
+                  news_payload(snapshot, category=category))
+    for country in snapshot.postings['country']:
+        cache.add(news_key(country=country),
+                  news_payload(snapshot, country=country))
+
+    cache.add('trending', trending_payload())
+    cache.add('sources', sources_payload())
+    cache.add('categories', categories_payload(articles))
+    cache.add('countries', countries_payload(articles))
+
+    logger.info(f"Pre-rendered {len(cache)} responses ({cache.size()} bytes) "
+                f"for snapshot v{snapshot.version}")
+    return cache
+
+
+def cached_response(key):
+    """Pre-rendered response for key from the current snapshot, if any"""
+    responses = news_cache['snapshot'].responses
+    rendered = responses.get(key) if responses is not None else None
+    if rendered is None:
+        return None
+
+    body, encoding = rendered.select(request.headers.get('Accept-Encoding'))
+    headers = rendered.headers(encoding)
+    if rendered.is_not_modified(request.headers.get('If-None-Match')):
+        return Response(status=304, headers=headers)
+    return Response(body, mimetype='application/json', headers=headers)
+
+
+def snapshot_response(payload):
+    """JSON response computed from the current snapshot, with a snapshot ETag"""
+    etag = dynamic_etag(snapshot_tag(news_cache['snapshot']), request.full_path)
+    headers = {'ETag': etag, 'Cache-Control': CACHE_CONTROL}
+    if not_modified(request.headers.get('If-None-Match'), (etag,)):
+        return Response(status=304, headers=headers)
+    response = jsonify(payload)
+    response.headers.update(headers)
+    return response
+
 
 def update_news_cache():
     """Update news cache in background"""
@@ -36,32 +270,43 @@ def update_news_cache():
     try:
         logger.info("Updating news cache...")
 
+        # Follow the aggregator daemon's export if it is running: only
+        # deltas are read between its snapshots
+        if export_follower.available():
+            articles = export_follower.poll()
+            if articles is None:
+                logger.info("Export unchanged")
+            else:
+                set_cached_articles(articles)
+                logger.info(
+                    f"Serving {len(news_cache['articles'])} exported articles")
+            return
+
         # Try to load from file first (if aggregator has run recently)
-        if os.path.exists('latest_news.json'):
-            with open('latest_news.json', 'r', encoding='utf-8') as f:
+        if os.path.exists(JSON_EXPORT_FILE):
+            # The aggregator daemon rewrites it whenever a source has news
+            mtime = os.path.getmtime(JSON_EXPORT_FILE)
+            if mtime == news_cache['file_mtime']:
+                logger.info("Cache file unchanged")
+                return
+            with open(JSON_EXPORT_FILE, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                news_cache['articles'] = data.get('articles', [])
-                news_cache['last_updated'] = datetime.now().isoformat()
+                set_cached_articles(data.get('articles', []))
+                news_cache['file_mtime'] = mtime
                 logger.info(
                     f"Loaded {len(news_cache['articles'])} articles from cache file")
                 return
 
-        # If no cache file, try to aggregate fresh data
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        articles = loop.run_until_complete(aggregator.aggregate_all_sources())
+        # If no cache file, poll the sources that are due
+        articles = aggregation_loop.run_until_complete(poll_due_sources())
 
-        if articles:
-            news_cache['articles'] = [article.to_dict()
-                                      for article in articles]
-            news_cache['trending_topics'] = aggregator.get_trending_topics(
-                articles)
-        else:
-            # Fallback to cached articles from database
+        if not articles:
+            # Fallback to cached articles from database, keeping what is
+            # served (possibly a mapped snapshot) if it has none
             cached_articles = aggregator.get_cached_articles()
-            news_cache['articles'] = cached_articles
+            if cached_articles:
+                set_cached_articles(cached_articles)
 
-        news_cache['last_updated'] = datetime.now().isoformat()
         logger.info(
             f"Updated cache with {len(news_cache['articles'])} articles")
 
@@ -69,12 +314,70 @@ def update_news_cache():
         logger.error(f"Error updating news cache: {e}")
 
 
+def publish_aggregated_articles():
+    """Serve the latest articles of every source"""
+    articles = aggregator.current_articles()
+    set_cached_articles([article.to_dict() for article in articles])
+
+
+async def poll_due_sources():
+    """Poll due sources, serving each one's articles shortly after it arrives"""
+    publisher = StagedPublisher(lambda staged: publish_aggregated_articles())
+    try:
+        return await aggregator.aggregate_due_sources(on_articles=publisher.stage)
+    finally:
+        publisher.flush()
+
+
+def refresh_news_cache():
+    """Update the news cache, then save it for other workers and restarts"""
+    update_news_cache()
+    save_snapshot()
+
+
+# Concurrent refreshes (API calls and the periodic thread) share one run
+refresh_coordinator = RefreshCoordinator(refresh_news_cache)
+
+
+def is_leader():
+    """Whether this worker updates the cache, rather than following the file"""
+    return leader_lease is None or leader_lease.is_leader
+
+
+def next_update_delay():
+    """Seconds until the next source is due, or the cache file is rechecked"""
+    if export_follower.available() or os.path.exists(JSON_EXPORT_FILE):
+        # Checking the files is a few stat calls; new articles show up promptly
+        return refresh_coordinator.min_interval
+    delay = aggregator.poll_scheduler.seconds_until_next()
+    return max(delay, refresh_coordinator.min_interval)
+
+
 def periodic_update():
-    """Periodically update news cache"""
+    """Periodically update news cache, or follow the leader's snapshot"""
+    if leader_lease is not None:
+        leader_lease.start()
     while True:
-        update_news_cache()
-        time.sleep(1800)  # Update every 30 minutes
-
+        if not is_leader():
+            try:
+                load_binary_snapshot(prerender=True)
+            except Exception as e:
+                logger.error(f"Error following snapshot: {e}")
+            time.sleep(FOLLOW_INTERVAL)
+            continue
+
+        refresh_coordinator.refresh()
+        if leader_lease is None:
+            time.sleep(next_update_delay())
+            continue
+        # Wake early on losing the lease, to follow the new leader
+        deadline = time.monotonic() + next_update_delay()
+        while is_leader() and time.monotonic() < deadline:
+            time.sleep(min(FOLLOW_INTERVAL, deadline - time.monotonic()))
+
+
+# Serve the last snapshot until the first update completes
+binary_snapshot_loaded = load_binary_snapshot()
 
 # Start background update thread
 update_thread = threading.Thread(target=periodic_update, daemon=True)
@@ -91,38 +394,65 @@ def get_news():
         category = request.args.get('category', '')
         country = request.args.get('country', '')
         search = request.args.get('search', '')
-
-        # Filter articles
-        articles = news_cache['articles']
-
-        if category:
-            articles = [a for a in articles if a.get(
-                'category', '').lower() == category.lower()]
-
-        if country:
-            articles = [a for a in articles if country.lower(
-            ) in [c.lower() for c in a.get('country_focus', [])]]
+        language = request.args.get('language', '')
+        source = request.args.get('source', '')
+        breaking = request.args.get('breaking')
+        trending = request.args.get('trending')
+        sort = request.args.get('sort', 'recent')
+        cursor = request.args.get('cursor')
 
         if search:
-            search_lower = search.lower()
-            articles = [a for a in articles if
-                        search_lower in a.get('title', '').lower() or
-                        search_lower in a.get('description', '').lower()]
-
-        # Pagination
-        start_idx = (page - 1) * limit
-        end_idx = start_idx + limit
-        paginated_articles = articles[start_idx:end_idx]
+            # Ranked full-text search over the whole article cache
+            offset = (page - 1) * limit
+            articles = aggregator.search_cached_articles(
+                search, category=category or None, country=country or None,
+                language=language or None, limit=limit, offset=offset)
+            total = aggregator.count_search_results(
+                search, category=category or None, country=country or None,
+                language=language or None)
+
+            return jsonify({
+                'success': True,
+                'articles': articles,
+                'total': total,
+                'page': page,
+                'limit': limit,
+                'has_more': offset + limit < total,
+                'last_updated': news_cache['last_updated']
+            })
 
-        return jsonify({
-            'success': True,
-            'articles': paginated_articles,
-            'total': len(articles),
-            'page': page,
-            'limit': limit,
-            'has_more': end_idx < len(articles),
-            'last_updated': news_cache['last_updated']
-        })
+        if sort not in SORT_ORDERS:
+            return jsonify({
+                'success': False,
+                'error': f"sort must be one of: {', '.join(SORT_ORDERS)}",
+                'articles': []
+            }), 400
+
+        after = None
+        if cursor:
+            try:
+                if sort != 'recent':
+                    raise ValueError("cursor requires sort=recent")
+                after = decode_cursor(cursor)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e),
+                    'articles': []
+                }), 400
+
+        # Default first pages are served as pre-rendered bytes
+        if (page == 1 and limit == 20 and sort == 'recent' and after is None
+                and not (category and country) and not language and not source
+                and breaking is None and trending is None):
+            response = cached_response(news_key(category, country))
+            if response is not None:
+                return response
+
+        return snapshot_response(news_payload(
+            news_cache['snapshot'], page, limit, sort=sort, cursor=after,
+            category=category, country=country, language=language,
+            source=source, is_breaking=breaking, is_trending=trending))
 
     except Exception as e:
         logger.error(f"Error serving news: {e}")
@@ -137,11 +467,20 @@ def get_news():
 def get_trending():
     """Get trending topics"""
     try:
-        return jsonify({
-            'success': True,
-            'trending_topics': news_cache['trending_topics'][:10],
-            'last_updated': news_cache['last_updated']
-        })
+        window = request.args.get('window', DEFAULT_WINDOW)
+        limit = min(max(request.args.get('limit', 10, type=int), 1), MAX_TOPICS)
+        if window not in WINDOWS:
+            return jsonify({
+                'success': False,
+                'error': f"window must be one of: {', '.join(WINDOWS)}",
+                'trending_topics': []
+            }), 400
+
+        if window == DEFAULT_WINDOW and limit == 10:
+            response = cached_response('trending')
+            if response is not None:
+                return response
+        return jsonify(trending_payload(window, limit))
     except Exception as e:
         logger.error(f"Error serving trending topics: {e}")
         return jsonify({
@@ -155,21 +494,10 @@ def get_trending():
 def get_sources():
     """Get available news sources"""
     try:
-        sources = []
-        for name, config in aggregator.news_sources.items():
-            sources.append({
-                'id': name,
-                'name': config['name'],
-                'country': config['country'],
-                'language': config['language'],
-                'category': config['category'],
-                'credibility': config['credibility']
-            })
-
-        return jsonify({
-            'success': True,
-            'sources': sources
-        })
+        response = cached_response('sources')
+        if response is not None:
+            return response
+        return jsonify(sources_payload())
     except Exception as e:
         logger.error(f"Error serving sources: {e}")
         return jsonify({
@@ -183,12 +511,10 @@ def get_sources():
 def get_categories():
     """Get available categories"""
     try:
-        categories = list(set(a.get('category', 'general')
-                          for a in news_cache['articles']))
-        return jsonify({
-            'success': True,
-            'categories': sorted(categories)
-        })
+        response = cached_response('categories')
+        if response is not None:
+            return response
+        return jsonify(categories_payload(news_cache['articles']))
     except Exception as e:
         logger.error(f"Error serving categories: {e}")
         return jsonify({
@@ -202,14 +528,10 @@ def get_categories():
 def get_countries():
     """Get available countries"""
     try:
-        countries = set()
-        for article in news_cache['articles']:
-            countries.update(article.get('country_focus', []))
-
-        return jsonify({
-            'success': True,
-            'countries': sorted(list(countries))
-        })
+        response = cached_response('countries')
+        if response is not None:
+            return response
+        return jsonify(countries_payload(news_cache['articles']))
     except Exception as e:
         logger.error(f"Error serving countries: {e}")
         return jsonify({
@@ -223,7 +545,13 @@ def get_countries():
 def refresh_news():
     """Manually refresh news cache"""
     try:
-        update_news_cache()
+        if is_leader():
+            # Sources are marked due only if this call starts a new run
+            refresh_coordinator.refresh(
+                on_run=aggregator.poll_scheduler.mark_due)
+        else:
+            # Another worker aggregates; serve what it has saved
+            load_binary_snapshot(prerender=True)
         return jsonify({
             'success': True,
             'message': 'News cache refreshed',
@@ -251,8 +579,10 @@ def health_check():
 
 
 if __name__ == '__main__':
-    # Initial cache update
-    update_news_cache()
+    # Initial cache update, unless a mapped snapshot is already served or
+    # the leader worker updates it
+    if not binary_snapshot_loaded and leader_lease is None:
+        refresh_coordinator.refresh()
 
     # Run the server
     port = int(os.environ.get('PORT', 5000))
@@ -0,0 +1,468 @@
+#!/usr/bin/env python3
+"""
+Article Database Schema
+Column-oriented article cache shared by the aggregators: one row per article
+with typed columns, a country join table, and indexes matching the API's
+query patterns, plus an FTS5 index over titles and descriptions kept in sync
+by triggers. Databases using the original JSON blob table are migrated.
+"""
+
+import json
+import logging
+import re
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 5
+
+ARTICLE_COLUMNS = (
+    'id', 'title', 'description', 'content', 'url', 'thumbnail', 'source',
+    'category', 'language', 'published_at', 'is_breaking', 'is_trending',
+    'engagement_score', 'credibility_score'
+)
+
+UPSERT_ARTICLE_SQL = '''
+    INSERT INTO articles ({columns})
+    VALUES ({placeholders})
+    ON CONFLICT(id) DO UPDATE SET {updates}
+'''.format(
+    columns=', '.join(ARTICLE_COLUMNS),
+    placeholders=', '.join('?' for _ in ARTICLE_COLUMNS),
+    updates=', '.join(f"{column} = excluded.{column}"
+                      for column in ARTICLE_COLUMNS if column != 'id')
+)
+
+DELETE_COUNTRIES_SQL = 'DELETE FROM article_countries WHERE article_id = ?'
+
+INSERT_COUNTRY_SQL = '''
+    INSERT OR REPLACE INTO article_countries (article_id, position, country, published_at)
+    VALUES (?, ?, ?, ?)
+'''
+
+
+def init_article_schema(conn: sqlite3.Connection):
+    """Create the article tables, migrating the JSON blob table if present
+
+    Runs as one write transaction, so of several workers opening the same
+    file only the first migrates and the rest find the current schema.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    cursor = conn.cursor()
+    # Take the write lock before inspecting the schema, so two workers
+    # cannot both see the legacy table and rename it
+    cursor.execute('BEGIN IMMEDIATE')
+    try:
+        _create_article_schema(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _create_article_schema(conn: sqlite3.Connection):
+    """Schema statements of init_article_schema, run inside its transaction"""
+    cursor = conn.cursor()
+
+    version = cursor.execute('PRAGMA user_version').fetchone()[0]
+    columns = [row[1] for row in cursor.execute('PRAGMA table_info(articles)')]
+    legacy = 'data' in columns
+    if legacy:
+        # Keep the old rows aside while the new table is created
+        cursor.execute('DROP INDEX IF EXISTS idx_articles_source')
+        cursor.execute('DROP INDEX IF EXISTS idx_articles_category')
+        cursor.execute('ALTER TABLE articles RENAME TO articles_v1')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS articles (
+            id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            description TEXT,
+            content TEXT,
+            url TEXT,
+            thumbnail TEXT,
+            source TEXT,
+            category TEXT,
+            language TEXT,
+            published_at TEXT,
+            is_breaking INTEGER NOT NULL DEFAULT 0,
+            is_trending INTEGER NOT NULL DEFAULT 0,
+            engagement_score REAL NOT NULL DEFAULT 0,
+            credibility_score REAL NOT NULL DEFAULT 5,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS article_countries (
+            article_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            country TEXT NOT NULL,
+            published_at TEXT,
+            PRIMARY KEY (article_id, position)
+        ) WITHOUT ROWID
+    ''')
+
+    # id completes the (published_at, id) order used by cursor pagination
+    cursor.execute('DROP INDEX IF EXISTS idx_articles_category_published')
+    cursor.execute('DROP INDEX IF EXISTS idx_articles_published')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_articles_category_published_id
+        ON articles(category, published_at, id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_articles_published_id ON articles(published_at, id)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_articles_created_at ON articles(created_at)
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_articles_source_created
+        ON articles(source, created_at)
+    ''')
+    cursor.execute('DROP INDEX IF EXISTS idx_article_countries_country_published')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_article_countries_country_published_id
+        ON article_countries(country, published_at, article_id)
+    ''')
+
+    if legacy:
+        migrate_legacy_articles(conn)
+    elif columns and version < 5:
+        normalize_published_at(conn)
+
+    init_search_index(conn)
+
+    cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+
+def init_search_index(conn: sqlite3.Connection):
+    """Create the FTS5 index over articles and the triggers that sync it"""
+    cursor = conn.cursor()
+    exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE name = 'articles_fts'").fetchone()
+
+    # External-content table: the text lives only in articles; prefix
+    # indexes make two- and three-letter prefix queries index lookups
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+            title, description,
+            content='articles', content_rowid='rowid',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS articles_fts_insert AFTER INSERT ON articles BEGIN
+            INSERT INTO articles_fts(rowid, title, description)
+            VALUES (new.rowid, new.title, new.description);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS articles_fts_delete AFTER DELETE ON articles BEGIN
+            INSERT INTO articles_fts(articles_fts, rowid, title, description)
+            VALUES ('delete', old.rowid, old.title, old.description);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS articles_fts_update
+        AFTER UPDATE OF title, description ON articles BEGIN
+            INSERT INTO articles_fts(articles_fts, rowid, title, description)
+            VALUES ('delete', old.rowid, old.title, old.description);
+            INSERT INTO articles_fts(rowid, title, description)
+            VALUES (new.rowid, new.title, new.description);
+        END
+    ''')
+
+    if not exists:
+        # Index articles cached before the search table existed
+        cursor.execute("INSERT INTO articles_fts(articles_fts) VALUES ('rebuild')")
+
+
+def migrate_legacy_articles(conn: sqlite3.Connection):
+    """Copy rows from the old JSON blob table into the column schema"""
+    cursor = conn.cursor()
+    migrated = 0
+
+    rows = cursor.execute('SELECT data, created_at FROM articles_v1').fetchall()
+    for data, created_at in rows:
+        try:
+            article = json.loads(data)
+        except Exception as e:
+            logger.error(f"Skipping unreadable cached article: {e}")
+            continue
+
+        cursor.execute(UPSERT_ARTICLE_SQL, article_row(article))
+        cursor.execute('UPDATE articles SET created_at = ? WHERE id = ?',
+                       (created_at, article['id']))
+        cursor.executemany(INSERT_COUNTRY_SQL, country_rows(article))
+        migrated += 1
+
+    cursor.execute('DROP TABLE articles_v1')
+    logger.info(f"Migrated {migrated} cached articles to the column schema")
+
+
+def normalize_published_at(conn: sqlite3.Connection):
+    """Rewrite stored published_at values in the format _iso writes"""
+    cursor = conn.cursor()
+    # (key columns, table) of each table carrying a published_at copy
+    for keys, table in (('id', 'articles'),
+                        ('article_id, position', 'article_countries')):
+        rows = cursor.execute(f'SELECT published_at, {keys} FROM {table}').fetchall()
+        updates = [(_iso(row[0]),) + tuple(row[1:]) for row in rows
+                   if _iso(row[0]) != row[0]]
+        condition = ' AND '.join(f"{key.strip()} = ?" for key in keys.split(','))
+        cursor.executemany(
+            f'UPDATE {table} SET published_at = ? WHERE {condition}', updates)
+        if updates:
+            logger.info(f"Normalized published_at on {len(updates)} {table} rows")
+
+
+def _field(article, name, default=None):
+    """Read a field from a NewsArticle or a dict"""
+    if isinstance(article, dict):
+        return article.get(name, default)
+    return getattr(article, name, default)
+
+
+def _iso(value) -> Optional[str]:
+    """published_at as stored: naive UTC ISO 8601 to the second, or None
+
+    One fixed format keeps TEXT comparison in cursor queries in time order;
+    aware values are converted to UTC and unparseable ones are dropped.
+    """
+    if not value:
+        return None
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.isoformat(timespec='seconds')
+
+
+def article_row(article) -> Tuple:
+    """Column values for UPSERT_ARTICLE_SQL"""
+    return (
+        _field(article, 'id'),
+        _field(article, 'title', ''),
+        _field(article, 'description'),
+        _field(article, 'content'),
+        _field(article, 'url'),
+        _field(article, 'thumbnail'),
+        _field(article, 'source'),
+        (_field(article, 'category') or 'general').lower(),
+        _field(article, 'language'),
+        _iso(_field(article, 'published_at')),
+        int(bool(_field(article, 'is_breaking', False))),
+        int(bool(_field(article, 'is_trending', False))),
+        float(_field(article, 'engagement_score', 0.0) or 0.0),
+        float(_field(article, 'credibility_score', 5.0) or 5.0),
+    )
+
+
+def country_rows(article) -> List[Tuple]:
+    """Rows for INSERT_COUNTRY_SQL"""
+    article_id = _field(article, 'id')
+    published_at = _iso(_field(article, 'published_at'))
+    return [(article_id, position, country.lower(), published_at)
+            for position, country in enumerate(_field(article, 'country_focus') or [])]
+
+
+def article_write_statements(articles: Sequence) -> List[Tuple[str, list]]:
+    """(sql, rows) pairs that store articles and their countries"""
+    return [
+        (UPSERT_ARTICLE_SQL, [article_row(article) for article in articles]),
+        (DELETE_COUNTRIES_SQL, [(_field(article, 'id'),) for article in articles]),
+        (INSERT_COUNTRY_SQL, [row for article in articles
+                              for row in country_rows(article)]),
+    ]
+
+
+def _cutoff(max_age_hours) -> str:
+    """created_at cutoff in SQLite's CURRENT_TIMESTAMP format (UTC)"""
+    return (datetime.utcnow() - timedelta(hours=max_age_hours)).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def _filter_conditions(max_age_hours=None, category=None, country=None,
+                       language=None, source=None):
+    """JOIN text, WHERE conditions and parameters for an article query"""
+    joins = ''
+    conditions = []
+    params: List = []
+
+    if country:
+        # Driven by the (country, published_at, article_id) index
+        joins = ' JOIN article_countries c ON c.article_id = a.id'
+        conditions.append('c.country = ?')
+        params.append(country.lower())
+    if category:
+        conditions.append('a.category = ?')
+        params.append(category.lower())
+    if language:
+        conditions.append('a.language = ?')
+        params.append(language)
+    if source:
+        conditions.append('a.source = ?')
+        params.append(source)
+    if max_age_hours is not None:
+        conditions.append('a.created_at > ?')
+        params.append(_cutoff(max_age_hours))
+
+    return joins, conditions, params
+
+
+def _filter_clause(max_age_hours=None, category=None, country=None,
+                   language=None, source=None):
+    """FROM/WHERE clause and parameters for an article query"""
+    joins, conditions, params = _filter_conditions(
+        max_age_hours, category, country, language, source)
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+    return f"FROM articles a{joins}{where}", params
+
+
+def query_articles(conn: sqlite3.Connection, max_age_hours=None, category=None,
+                   country=None, language=None, source=None, limit=None,
+                   offset=0, order_by=None,
+                   after: Optional[Tuple[str, str]] = None) -> List[Dict]:
+    """Article dicts matching the filters, newest first
+
+    after is a (published_at, id) cursor: only articles that come after it
+    in (published_at DESC, id DESC) order are returned, read straight from
+    the index so deep pages cost the same as the first. Articles without a
+    published_at sort last, as NULL is below every date.
+    """
+    joins, conditions, params = _filter_conditions(
+        max_age_hours, category, country, language, source)
+    # Sort on the columns the chosen index is ordered by
+    published_column, id_column = key_columns = (
+        ('c.published_at', 'c.article_id') if country else ('a.published_at', 'a.id'))
+    if after is not None:
+        after_published, after_id = after
+        after_published = _iso(after_published)
+        if after_published is None:
+            # Cursor inside the undated tail
+            conditions.append(f"({published_column} IS NULL AND {id_column} < ?)")
+            params.append(after_id)
+        else:
+            # A NULL row-value comparison is never true, so add undated rows
+            conditions.append(f"(({published_column}, {id_column}) < (?, ?) "
+                              f"OR {published_column} IS NULL)")
+            params.extend((after_published, after_id))
+    if order_by is None:
+        order_by = ', '.join(f"{column} DESC" for column in key_columns)
+
+    where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+    sql = (f"SELECT {', '.join('a.' + c for c in ARTICLE_COLUMNS)} "
+           f"FROM articles a{joins}{where} ORDER BY {order_by}")
+    if limit is not None:
+        sql += ' LIMIT ? OFFSET ?'
+        params += [limit, offset]
+
+    articles = [row_to_dict(row) for row in conn.execute(sql, params)]
+    attach_countries(conn, articles)
+    return articles
+
+
+def count_articles(conn: sqlite3.Connection, max_age_hours=None, category=None,
+                   country=None, language=None, source=None) -> int:
+    """Number of articles matching the filters"""
+    clause, params = _filter_clause(
+        max_age_hours, category, country, language, source)
+    return conn.execute(f"SELECT COUNT(*) {clause}", params).fetchone()[0]
+
+
+def build_match_query(text: str) -> Optional[str]:
+    """FTS5 MATCH expression for free text, prefix-matching the last word"""
+    words = re.findall(r'\w+', text.lower())
+    if not words:
+        return None
+    # Quoting keeps words like AND/NOT/NEAR from being read as operators;
+    # only the word being typed is a prefix, so broad prefixes stay rare
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+
+def _search_clause(match_query: str, max_age_hours=None, category=None,
+                   country=None, language=None, source=None):
+    """FROM/WHERE clause and parameters for a full-text query"""
+    joins, conditions, params = _filter_conditions(
+        max_age_hours, category, country, language, source)
+    where = ' AND '.join(['articles_fts MATCH ?'] + conditions)
+    clause = (f"FROM articles_fts JOIN articles a ON a.rowid = articles_fts.rowid"
+              f"{joins} WHERE {where}")
+    return clause, [match_query] + params
+
+
+def search_articles(conn: sqlite3.Connection, text: str, max_age_hours=None,
+                    category=None, country=None, language=None, source=None,
+                    limit=20, offset=0) -> List[Dict]:
+    """Article dicts matching free text, best BM25 match first
+
+    Each dict gains a `snippet` with the matched words wrapped in <mark>
+    and the `score` it was ranked by (lower is better).
+    """
+    match_query = build_match_query(text)
+    if match_query is None:
+        return []
+
+    clause, params = _search_clause(
+        match_query, max_age_hours, category, country, language, source)
+    # Title matches weigh more than description matches
+    sql = (f"SELECT {', '.join('a.' + c for c in ARTICLE_COLUMNS)}, "
+           f"snippet(articles_fts, -1, '<mark>', '</mark>', '…', 16), "
+           f"bm25(articles_fts, 10.0, 1.0) AS score "
+           f"{clause} ORDER BY score LIMIT ? OFFSET ?")
+
+    articles = []
+    for row in conn.execute(sql, params + [limit, offset]):
+        article = row_to_dict(row[:len(ARTICLE_COLUMNS)])
+        article['snippet'] = row[-2]
+        article['score'] = row[-1]
+        articles.append(article)
+    attach_countries(conn, articles)
+    return articles
+
+
+def count_search_results(conn: sqlite3.Connection, text: str, max_age_hours=None,
+                         category=None, country=None, language=None,
+                         source=None) -> int:
+    """Number of articles matching free text"""
+    match_query = build_match_query(text)
+    if match_query is None:
+        return 0
+
+    clause, params = _search_clause(
+        match_query, max_age_hours, category, country, language, source)
+    return conn.execute(f"SELECT COUNT(*) {clause}", params).fetchone()[0]
+
+
+def row_to_dict(row: Sequence) -> Dict:
+    """Article dict in the same shape as NewsArticle.to_dict"""
+    article = dict(zip(ARTICLE_COLUMNS, row))
+    article['is_breaking'] = bool(article['is_breaking'])
+    article['is_trending'] = bool(article['is_trending'])
+    article['country_focus'] = []
+    return article
+
+
+def attach_countries(conn: sqlite3.Connection, articles: List[Dict], chunk_size: int = 500):
+    """Fill in country_focus for article dicts from the join table"""
+    by_id = {article['id']: article for article in articles}
+    ids = list(by_id)
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        rows = conn.execute(f'''
+            SELECT article_id, country FROM article_countries
+            WHERE article_id IN ({', '.join('?' for _ in chunk)})
+            ORDER BY article_id, position
+        ''', chunk)
+        for article_id, country in rows:
+            by_id[article_id]['country_focus'].append(country)
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Columnar Article Store
+NumPy column arrays over a snapshot's articles so filters run as vectorized
+masks and rankings as a single lexsort
+"""
+
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Fields articles can be filtered on; country is the country_focus list
+FILTER_FIELDS = ('category', 'country', 'language', 'source',
+                 'is_breaking', 'is_trending')
+
+FLAG_BREAKING = 1
+FLAG_TRENDING = 2
+
+# Column arrays of a store, as saved in binary snapshots
+COLUMNS = ('published_at', 'engagement_score', 'credibility_score', 'flags',
+           'category', 'source', 'language', 'country_indptr', 'country_codes')
+# Categorical fields with a vocabulary of codes
+CATEGORICAL_FIELDS = ('category', 'source', 'language', 'country')
+
+# Ranking orders: column names, most significant first, all descending
+SORT_ORDERS = {
+    'recent': ('published_at',),
+    'engagement': ('engagement_score', 'published_at'),
+    'credibility': ('credibility_score', 'published_at'),
+}
+
+
+def filter_key(field: str, value):
+    """Normalize a filter value to the key articles are indexed under"""
+    if field in ('is_breaking', 'is_trending'):
+        if isinstance(value, str):
+            return value.lower() in ('1', 'true', 'yes')
+        return bool(value)
+    return str(value).lower()
+
+
+def field_keys(article: Dict, field: str):
+    """Keys an article is indexed under for one filter field"""
+    if field == 'country':
+        return set(c.lower() for c in article.get('country_focus') or [])
+    if field == 'category':
+        return ((article.get('category') or 'general').lower(),)
+    if field in ('is_breaking', 'is_trending'):
+        return (bool(article.get(field)),)
+    value = article.get(field)
+    return (value.lower(),) if value else ()
+
+
+def published_timestamp(article: Dict) -> float:
+    """Seconds since the epoch for an article's published_at, 0 if unknown
+
+    Naive values are UTC, like feed published_parsed dates.
+    """
+    published_at = article.get('published_at')
+    if published_at and not isinstance(published_at, datetime):
+        try:
+            published_at = datetime.fromisoformat(published_at.replace('Z', '+00:00'))
+        except (AttributeError, TypeError, ValueError):
+            return 0.0
+    if not published_at:
+        return 0.0
+    if published_at.tzinfo is None:
+        published_at = published_at.replace(tzinfo=timezone.utc)
+    return published_at.timestamp()
+
+
+class _Categorical:
+    """Value <-> integer code mapping for one categorical column"""
+
+    __slots__ = ('values', 'codes')
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class ArticleStore:
+    """Column arrays for the numeric, flag and categorical article fields
+
+    Row i describes articles[i] of the snapshot it was built from.
+    Categorical fields hold integer codes (-1 for missing), and countries
+    use a CSR layout: the codes of row i are
+    country_codes[country_indptr[i]:country_indptr[i + 1]].
+    """
+
+    def __init__(self, articles: Sequence[Dict]):
+        self.size = len(articles)
+        self.vocabularies = {field: _Categorical() for field in CATEGORICAL_FIELDS}
+
+        # Filled as Python lists and converted once; per-item writes into
+        # NumPy arrays are far slower
+        published_at = []
+        engagement_score = []
+        credibility_score = []
+        flags = []
+        codes = {field: [] for field in ('category', 'source', 'language')}
+        country_indptr = [0]
+        country_codes = []
+        countries = self.vocabularies['country']
+
+        for article in articles:
+            published_at.append(published_timestamp(article))
+            engagement_score.append(article.get('engagement_score') or 0.0)
+            credibility_score.append(article.get('credibility_score') or 0.0)
+            flags.append((FLAG_BREAKING if article.get('is_breaking') else 0)
+                         | (FLAG_TRENDING if article.get('is_trending') else 0))
+
+            for field, column in codes.items():
+                keys = field_keys(article, field)
+                column.append(self.vocabularies[field].code(keys[0]) if keys else -1)
+
+            country_codes.extend(countries.code(c) for c in field_keys(article, 'country'))
+            country_indptr.append(len(country_codes))
+
+        self.published_at = np.array(published_at, dtype=np.float64)
+        self.engagement_score = np.array(engagement_score, dtype=np.float32)
+        self.credibility_score = np.array(credibility_score, dtype=np.float32)
+        self.flags = np.array(flags, dtype=np.uint8)
+        self.category = np.array(codes['category'], dtype=np.int32)
+        self.source = np.array(codes['source'], dtype=np.int32)
+        self.language = np.array(codes['language'], dtype=np.int32)
+
+        self.country_indptr = np.array(country_indptr, dtype=np.int64)
+        self.country_codes = np.array(country_codes, dtype=np.int32)
+        self._index_countries()
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, np.ndarray],
+                     vocabularies: Dict[str, List[str]]) -> 'ArticleStore':
+        """Store over existing column arrays, e.g. those of a mapped snapshot"""
+        store = cls.__new__(cls)
+        store.size = len(columns['published_at'])
+        store.vocabularies = {}
+        for field in CATEGORICAL_FIELDS:
+            categorical = store.vocabularies[field] = _Categorical()
+            for value in vocabularies.get(field, ()):
+                categorical.code(value)
+        for name in COLUMNS:
+            setattr(store, name, columns[name])
+        store._index_countries()
+        return store
+
+    def _index_countries(self):
+        # Row of every CSR entry, so a country lookup is one vector compare
+        self.country_rows = np.repeat(
+            np.arange(self.size, dtype=np.int64), np.diff(self.country_indptr))
+
+    def __len__(self):
+        return self.size
+
+    def mask(self, **filters) -> np.ndarray:
+        """Boolean row mask for filters named after FILTER_FIELDS"""
+        mask = np.ones(self.size, dtype=bool)
+        for field, value in filters.items():
+            if value is None or value == '':
+                continue
+            key = filter_key(field, value)
+
+            if field in ('is_breaking', 'is_trending'):
+                bit = FLAG_BREAKING if field == 'is_breaking' else FLAG_TRENDING
+                mask &= ((self.flags & bit) != 0) == key
+            elif field == 'country':
+                code = self.vocabularies['country'].codes.get(key)
+                matched = np.zeros(self.size, dtype=bool)
+                if code is not None:
+                    matched[self.country_rows[self.country_codes == code]] = True
+                mask &= matched
+            elif field in ('category', 'source', 'language'):
+                code = self.vocabularies[field].codes.get(key)
+                if code is None:
+                    return np.zeros(self.size, dtype=bool)
+                mask &= getattr(self, field) == code
+            else:
+                raise ValueError(f"Unknown filter field: {field}")
+        return mask
+
+    def rank(self, sort: str = 'recent', offset: int = 0, limit: Optional[int] = None,
+             **filters) -> Tuple[int, np.ndarray]:
+        """Total matches and the rows of one page in the given sort order"""
+        if sort not in SORT_ORDERS:
+            raise ValueError(f"Unknown sort order: {sort}")
+
+        rows = np.flatnonzero(self.mask(**filters))
+        total = len(rows)
+        columns = SORT_ORDERS[sort]
+        end = None if limit is None else offset + limit
+
+        if end is not None and end < total:
+            # Only rows tied with or above the end-th best primary value can
+            # land on the page, so the full sort runs on those alone
+            primary = getattr(self, columns[0])[rows]
+            threshold = np.partition(primary, total - end)[total - end]
+            rows = rows[primary >= threshold]
+
+        # lexsort treats the last key as most significant; negate for descending
+        keys = [-getattr(self, column)[rows] for column in reversed(columns)]
+        order = rows[np.lexsort(keys)] if len(rows) else rows
+        return total, order[offset:end]
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-article memory and to_dict time, dataclass vs slotted NewsArticle
+Usage: python benchmarks/bench_article_memory.py [articles]
+"""
+
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from news_article import NewsArticle  # noqa: E402
+
+
+@dataclass
+class DataclassArticle:
+    """The previous NewsArticle definition"""
+    id: str
+    title: str
+    description: str
+    content: str
+    url: str
+    thumbnail: Optional[str]
+    source: str
+    category: str
+    country_focus: List[str]
+    language: str
+    published_at: datetime
+    is_breaking: bool = False
+    is_trending: bool = False
+    engagement_score: float = 0.0
+    credibility_score: float = 5.0
+
+    def to_dict(self):
+        data = asdict(self)
+        data['published_at'] = self.published_at.isoformat()
+        return data
+
+
+def make_records(count, seed=11):
+    """Article fields as they arrive from a parser: every string a new object"""
+    rng = random.Random(seed)
+    sources = ['BBC Africa', 'AllAfrica', 'TechCabal', 'Daily Nation', 'Punch']
+    categories = ['general', 'technology', 'business', 'politics', 'sports']
+    countries = ['nigeria', 'kenya', 'ghana', 'south-africa', 'egypt']
+    now = datetime.now()
+    records = []
+    for i in range(count):
+        record = {
+            'id': f"{i:032x}",
+            'title': f"Headline number {i} about {rng.choice(countries)}",
+            'description': f"Short summary of story {i} " * 4,
+            'content': f"Body of story {i} " * 10,
+            'url': f"https://example.com/news/{i}",
+            'thumbnail': None,
+            'source': rng.choice(sources),
+            'category': rng.choice(categories),
+            'country_focus': rng.sample(countries, 2),
+            'language': 'en',
+            'published_at': (now - timedelta(minutes=i)).isoformat(),
+            'is_breaking': False,
+            'is_trending': False,
+            'engagement_score': 5.5,
+            'credibility_score': 8.0,
+        }
+        # A JSON round trip gives each record its own copies of every string
+        records.append(json.loads(json.dumps(record)))
+    return records
+
+
+def build(cls, records):
+    articles = []
+    for record in records:
+        fields = dict(record)
+        fields['published_at'] = datetime.fromisoformat(fields['published_at'])
+        articles.append(cls(**fields))
+    return articles
+
+
+def measure(cls, count):
+    tracemalloc.start()
+    records = make_records(count)
+    articles = build(cls, records)
+    # Only what the articles keep alive is left once the parser output goes
+    del records
+    gc.collect()
+    per_article = tracemalloc.get_traced_memory()[0] / count
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for article in articles:
+        article.to_dict()
+    to_dict_us = (time.perf_counter() - start) / count * 1e6
+    return per_article, to_dict_us
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+
+    print(f"articles: {count}")
+    print(f"{'representation':>16} {'bytes/article':>14} {'to_dict us':>11}")
+    for name, cls in (('dataclass', DataclassArticle), ('slotted', NewsArticle)):
+        per_article, to_dict_us = measure(cls, count)
+        print(f"{name:>16} {per_article:14.0f} {to_dict_us:11.2f}")
+
+
+if __name__ == "__main__":
+    main()
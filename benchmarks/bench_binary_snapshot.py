@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark: API server cold start from latest_news.json or the NDJSON
+snapshot (parse and index every article) vs mapping the binary snapshot
+Reports the time until the first page can be served, and the time to
+serve it
+Usage: python benchmarks/bench_binary_snapshot.py [articles] [runs]
+"""
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_export import make_article  # noqa: E402
+from news_export import read_snapshot, write_json, write_snapshot  # noqa: E402
+from news_snapshot import NewsSnapshot  # noqa: E402
+
+
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return NewsSnapshot.build(json.load(f)['articles'])
+
+
+def load_ndjson(path):
+    return NewsSnapshot.build(read_snapshot(path)[1])
+
+
+def measure(load, path, runs):
+    start_times, page_times = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        snapshot = load(path)
+        start_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        snapshot.page(0, 20, country='kenya')
+        snapshot.page(0, 20, sort='engagement')
+        page_times.append(time.perf_counter() - start)
+    return statistics.median(start_times), statistics.median(page_times)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    articles = [make_article(n) for n in range(count)]
+
+    print(f"articles: {count}, runs: {runs}")
+    print(f"{'format':>8} {'file KB':>8} {'start ms':>9} {'first pages ms':>15}")
+    with tempfile.TemporaryDirectory() as directory:
+        paths = {name: os.path.join(directory, f"latest_news.{name}")
+                 for name in ('json', 'ndjson', 'bin')}
+        write_json(articles, paths['json'])
+        write_snapshot(articles, paths['ndjson'])
+        NewsSnapshot.build(articles).save(paths['bin'])
+
+        for name, load in (('json', load_json), ('ndjson', load_ndjson),
+                           ('bin', NewsSnapshot.open)):
+            start, page = measure(load, paths[name], runs)
+            print(f"{name:>8} {os.path.getsize(paths[name]) / 1024:8.0f} "
+                  f"{1000 * start:9.2f} {1000 * page:15.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: title deduplication with the MinHash/LSH index vs the quadratic scan
+Usage: python benchmarks/bench_dedup.py [max_titles]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dedup_index import NearDuplicateIndex, jaccard_similarity, title_words  # noqa: E402
+
+
+STOP_WORDS = ['the', 'in', 'of', 'to', 'a', 'for', 'on', 'as', 'and', 'after',
+              'over', 'with', 'says', 'new', 'at', 'by', 'from', 'is']
+
+
+def make_titles(count, seed=42):
+    """Synthetic headlines where roughly one in ten is a reworded repeat"""
+    rng = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(20000)]
+    titles = []
+    for _ in range(count):
+        if titles and rng.random() < 0.1:
+            words = rng.choice(titles).split()
+            words[rng.randrange(len(words))] = rng.choice(vocabulary)
+            titles.append(' '.join(words))
+        else:
+            # Real headlines share common short words, which creates
+            # low-similarity pairs that the LSH bands must filter out
+            words = rng.sample(vocabulary, rng.randint(6, 10))
+            words += rng.sample(STOP_WORDS, rng.randint(2, 4))
+            rng.shuffle(words)
+            titles.append(' '.join(words))
+    return titles
+
+
+def quadratic_dedup(titles):
+    """The original scan: every title against every kept title"""
+    kept = []
+    for title in titles:
+        words = title_words(title)
+        if not any(jaccard_similarity(words, seen) > 0.8 for seen in kept):
+            kept.append(words)
+    return len(kept)
+
+
+def index_dedup(titles):
+    """Deduplicate through the LSH index"""
+    index = NearDuplicateIndex(max_entries=None)
+    kept = 0
+    for i, title in enumerate(titles):
+        if index.check_and_add(str(i), title) is None:
+            kept += 1
+    return kept
+
+
+def timed(func, titles):
+    start = time.perf_counter()
+    kept = func(titles)
+    return time.perf_counter() - start, kept
+
+
+def main():
+    max_titles = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    sizes = [n for n in (1000, 5000, 10000, 50000, 100000) if n <= max_titles]
+
+    print(f"{'titles':>8} {'quadratic s':>12} {'kept':>7} {'lsh s':>8} {'kept':>7} {'us/title':>9}")
+    for size in sizes:
+        titles = make_titles(size)
+        lsh_time, lsh_kept = timed(index_dedup, titles)
+
+        # The quadratic scan is only practical for the smaller sizes
+        if size <= 5000:
+            quad_time, quad_kept = timed(quadratic_dedup, titles)
+            quad = f"{quad_time:12.2f} {quad_kept:7d}"
+        else:
+            quad = f"{'-':>12} {'-':>7}"
+
+        print(f"{size:8d} {quad} {lsh_time:8.2f} {lsh_kept:7d} "
+              f"{lsh_time / size * 1e6:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark: batch enrichment vs the per-article scoring helpers
+Usage: python benchmarks/bench_enrichment.py [articles]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_keywords import make_articles, substring_classify  # noqa: E402
+from enrichment import BREAKING_INDICATORS, ENGAGEMENT_WORDS, BatchEnricher  # noqa: E402
+from keyword_matcher import GazetteerMatcher  # noqa: E402
+
+
+def per_article_enrich(title, description):
+    """The original path: every helper rebuilds and rescans the text"""
+    countries, category = substring_classify(title, description)
+
+    content = f"{title} {description}".lower()
+    is_breaking = any(indicator in content for indicator in BREAKING_INDICATORS)
+
+    content = f"{title} {description}".lower()
+    score = 5.0 + (2.0 if is_breaking else 0.0)
+    for word in ENGAGEMENT_WORDS:
+        if word in content:
+            score += 0.5
+    if 30 <= len(title) <= 80:
+        score += 0.5
+    score = min(score, 10.0)
+    return category, countries, is_breaking, score > 7.0, score
+
+
+def make_entries(count):
+    rng = random.Random(3)
+    words = list(BREAKING_INDICATORS + ENGAGEMENT_WORDS)
+    entries = []
+    for title, description in make_articles(count):
+        # Sprinkle in scoring words so every branch is exercised
+        title = f"{title} {rng.choice(words)}" if rng.random() < 0.3 else title
+        entries.append({'title': title, 'description': description,
+                        'source_category': 'general',
+                        'source_country': 'international'})
+    return entries
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    entries = make_entries(count)
+    enricher = BatchEnricher(GazetteerMatcher.load())
+
+    start = time.perf_counter()
+    baseline = [per_article_enrich(e['title'], e['description']) for e in entries]
+    baseline_time = time.perf_counter() - start
+
+    # Fetchers enrich one feed (10 entries) or one API page (50) at a time
+    for batch_size in (10, 50, 1000):
+        start = time.perf_counter()
+        batched = []
+        for i in range(0, count, batch_size):
+            batched.extend(enricher.enrich(entries[i:i + batch_size]))
+        batch_time = time.perf_counter() - start
+        print(f"batch of {batch_size:>4}: {batch_time / count * 1e6:6.1f} us/article "
+              f"({baseline_time / batch_time:.1f}x)")
+
+    print(f"per-article:   {baseline_time / count * 1e6:6.1f} us/article")
+
+    same_scores = sum(1 for old, new in zip(baseline, batched)
+                      if (old[2], old[3], old[4]) == (new['is_breaking'], new['is_trending'],
+                                                      new['engagement_score']))
+    print(f"identical breaking/trending/score: {same_scores}/{count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Benchmark: rewriting and reloading latest_news.json on every update vs the
+NDJSON snapshot plus delta log
+Each update adds a small batch of articles to a large article set; reports
+the time the aggregator spends exporting and the API server spends loading
+Usage: python benchmarks/bench_export.py [articles] [updates]
+"""
+
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from news_export import ExportFollower, NewsExporter  # noqa: E402
+
+BATCH = 10
+
+
+def make_article(n):
+    return {
+        'id': f"article-{n:06d}",
+        'title': f"Headline number {n} about markets, elections and sport in Africa",
+        'description': "A short summary of the story as published by the feed. " * 4,
+        'content': "Article body text taken from the feed entry. " * 12,
+        'url': f"https://example.com/news/{n}",
+        'thumbnail': f"https://example.com/images/{n}.jpg",
+        'source': f"Source {n % 40}",
+        'category': 'politics',
+        'country_focus': ['kenya', 'nigeria'],
+        'language': 'en',
+        'published_at': datetime.now().isoformat(),
+        'is_breaking': False,
+        'is_trending': n % 7 == 0,
+        'engagement_score': 5.5,
+        'credibility_score': 8.0,
+    }
+
+
+def legacy(articles, updates, directory):
+    path = os.path.join(directory, 'latest_news.json')
+    export, load = [], []
+    for update in range(updates):
+        articles = articles + [make_article(1000000 + update * BATCH + n) for n in range(BATCH)]
+        start = time.perf_counter()
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'timestamp': datetime.now().isoformat(),
+                       'total_articles': len(articles),
+                       'articles': articles}, f, indent=2, ensure_ascii=False)
+        export.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with open(path, 'r', encoding='utf-8') as f:
+            loaded = json.load(f)['articles']
+        load.append(time.perf_counter() - start)
+    return export, load, len(loaded), os.path.getsize(path)
+
+
+def streaming(articles, updates, directory):
+    exporter = NewsExporter(os.path.join(directory, 'latest_news.ndjson'),
+                            os.path.join(directory, 'latest_news.deltas.ndjson'))
+    follower = ExportFollower(exporter.snapshot_path, exporter.deltas.path)
+    exporter.export(articles, force=True)
+    follower.poll()
+
+    export, load = [], []
+    for update in range(updates):
+        batch = [make_article(1000000 + update * BATCH + n) for n in range(BATCH)]
+        start = time.perf_counter()
+        exporter.append(batch)
+        export.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        loaded = follower.poll()
+        load.append(time.perf_counter() - start)
+    return export, load, len(loaded), os.path.getsize(exporter.snapshot_path)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+    updates = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    articles = [make_article(n) for n in range(count)]
+
+    print(f"articles: {count}, updates: {updates} x {BATCH} new articles")
+    print(f"{'format':>16} {'file KB':>8} {'export ms':>10} {'load ms':>8} {'served':>7}")
+    for name, run in (('json, indent=2', legacy), ('ndjson + deltas', streaming)):
+        with tempfile.TemporaryDirectory() as directory:
+            export, load, served, size = run(articles, updates, directory)
+        print(f"{name:>16} {size / 1024:8.0f} {1000 * statistics.mean(export):10.2f} "
+              f"{1000 * statistics.mean(load):8.2f} {served:7d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: fetch latency for the whole source set, a new session per run
+(TCPConnector(limit=10)) vs the long-lived FeedFetcher
+Serves 49 feeds from 43 local hosts (the shape of the real source list:
+a few publishers have two feeds); every new connection pays a simulated
+handshake delay and a few hosts are slow, as real feed servers are
+Usage: python benchmarks/bench_feed_fetch.py [runs]
+"""
+
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from feed_fetcher import FeedFetcher  # noqa: E402
+
+FEEDS = 49
+HOSTS = 43
+# Round trips of TCP + TLS setup on a fresh connection
+HANDSHAKE_DELAY = 0.15
+RESPONSE_DELAY = 0.05
+# Hosts that take this long to answer each request
+SLOW_HOSTS = {0: 1.0, 1: 0.8, 2: 0.5}
+
+FEED_BODY = ('<?xml version="1.0"?><rss><channel>'
+             + '<item><title>Story</title><link>https://example.com/</link></item>' * 10
+             + '</channel></rss>').encode()
+
+
+def make_app(host_index, stats):
+    async def feed(request):
+        transport = request.transport
+        if transport not in stats['transports']:
+            stats['transports'].add(transport)
+            stats['connections'] += 1
+            await asyncio.sleep(HANDSHAKE_DELAY)
+        await asyncio.sleep(SLOW_HOSTS.get(host_index, RESPONSE_DELAY))
+        return web.Response(body=FEED_BODY, content_type='application/rss+xml')
+
+    app = web.Application()
+    app.router.add_get('/feed/{n}', feed)
+    return app
+
+
+async def start_hosts(stats):
+    runners, ports = [], []
+    for host_index in range(HOSTS):
+        runner = web.AppRunner(make_app(host_index, stats))
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        runners.append(runner)
+        ports.append(site._server.sockets[0].getsockname()[1])
+    urls = [f"http://localhost:{ports[n % HOSTS]}/feed/{n}" for n in range(FEEDS)]
+    return runners, urls
+
+
+async def fetch_all(session, urls):
+    async def fetch(url):
+        async with session.get(url) as response:
+            return await response.read()
+    await asyncio.gather(*(fetch(url) for url in urls))
+
+
+async def per_run_session(urls):
+    connector = aiohttp.TCPConnector(limit=10)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await fetch_all(session, urls)
+
+
+async def measure(name, run, runs, stats):
+    timings = []
+    stats['connections'] = 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        await run()
+        timings.append(time.perf_counter() - start)
+    print(f"{name:>16} {timings[0]:10.2f} {statistics.mean(timings[1:]):12.2f} "
+          f"{stats['connections']:12d}")
+
+
+async def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    stats = {'transports': set(), 'connections': 0}
+    runners, urls = await start_hosts(stats)
+
+    print(f"feeds: {FEEDS}, hosts: {HOSTS}, runs: {runs}")
+    print(f"{'client':>16} {'first run s':>10} {'later runs s':>12} {'connections':>12}")
+    try:
+        await measure('session per run', lambda: per_run_session(urls), runs, stats)
+
+        fetcher = FeedFetcher()
+        await measure('FeedFetcher', lambda: fetch_all(fetcher.session(), urls), runs, stats)
+        await fetcher.close()
+    finally:
+        for runner in runners:
+            await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
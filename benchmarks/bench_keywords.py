@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark: country/category keyword matching with the compiled Aho-Corasick
+matcher vs the original per-call substring checks
+Usage: python benchmarks/bench_keywords.py [articles]
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from keyword_matcher import DEFAULT_GAZETTEER_PATH, GazetteerMatcher  # noqa: E402
+
+
+with open(DEFAULT_GAZETTEER_PATH, 'r', encoding='utf-8') as f:
+    GAZETTEER = json.load(f)
+
+FILLER = ('the officials said on monday that the plan would happen after talks '
+          'with regional leaders and residents who have waited for months').split()
+
+
+def substring_classify(title, description):
+    """The original approach: rebuild keyword lists and test each substring"""
+    content = f"{title} {description}".lower()
+    country_keywords = {country: list(keywords)
+                        for country, keywords in GAZETTEER['countries'].items()}
+    category_keywords = [(entry['name'], list(entry['keywords']))
+                         for entry in GAZETTEER['categories']]
+
+    countries = [country for country, keywords in country_keywords.items()
+                 if any(keyword in content for keyword in keywords)]
+    category = None
+    for name, keywords in category_keywords:
+        if any(keyword in content for keyword in keywords):
+            category = name
+            break
+    return countries, category
+
+
+def make_articles(count, seed=7):
+    """Synthetic title/description pairs mentioning a few gazetteer keywords"""
+    rng = random.Random(seed)
+    keywords = [k for ks in GAZETTEER['countries'].values() for k in ks]
+    keywords += [k for entry in GAZETTEER['categories'] for k in entry['keywords']]
+    articles = []
+    for _ in range(count):
+        title = rng.sample(FILLER, 6) + rng.sample(keywords, 2)
+        description = rng.sample(FILLER, 14) + rng.sample(keywords, 2)
+        rng.shuffle(title)
+        rng.shuffle(description)
+        articles.append((' '.join(title).capitalize(), ' '.join(description)))
+    return articles
+
+
+def timed(func, articles):
+    start = time.perf_counter()
+    for title, description in articles:
+        func(title, description)
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    articles = make_articles(count)
+
+    start = time.perf_counter()
+    matcher = GazetteerMatcher.load()
+    build_time = time.perf_counter() - start
+
+    substring_time = timed(substring_classify, articles)
+    matcher_time = timed(lambda t, d: matcher.match(f"{t} {d}"), articles)
+
+    print(f"articles: {count}, matcher build: {build_time * 1000:.1f} ms")
+    print(f"{'substring':>10}: {substring_time / count * 1e6:8.1f} us/article")
+    print(f"{'matcher':>10}: {matcher_time / count * 1e6:8.1f} us/article "
+          f"({substring_time / matcher_time:.1f}x)")
+
+    # Where the two disagree, the substring version usually matched inside
+    # a longer word ('niger' in 'nigeria', 'app' in 'happen')
+    differing = sum(
+        1 for title, description in articles
+        if substring_classify(title, description) != matcher.match(f"{title} {description}"))
+    print(f"classifications that differ: {differing}/{count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: fixed 30-minute polling vs the adaptive per-source scheduler
+Simulates sources publishing at different Poisson rates and reports feed
+requests made and the delay between publication and pickup
+Usage: python benchmarks/bench_poll_scheduler.py [hours]
+"""
+
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from poll_scheduler import PollScheduler  # noqa: E402
+
+FEED_ENTRIES = 10
+FIXED_INTERVAL = 1800
+
+# (label, sources, entries per hour)
+PROFILES = [
+    ('breaking', 4, 12.0),
+    ('daily', 25, 1.0),
+    ('weekly', 20, 0.05),
+]
+
+
+def make_sources(hours, seed=7):
+    """Publication times per source over the simulated period"""
+    rng = random.Random(seed)
+    sources = {}
+    for label, count, per_hour in PROFILES:
+        for i in range(count):
+            times = []
+            t = rng.expovariate(per_hour / 3600)
+            while t < hours * 3600:
+                times.append(t)
+                t += rng.expovariate(per_hour / 3600)
+            sources[f"{label}_{i}"] = (label, times)
+    return sources
+
+
+def poll(times, cursor, now):
+    """Entries visible at now that were not picked up yet (feed keeps 10)"""
+    end = cursor
+    while end < len(times) and times[end] <= now:
+        end += 1
+    visible = times[max(cursor, end - FEED_ENTRIES):end]
+    return end, visible, end - cursor > FEED_ENTRIES
+
+
+def simulate_fixed(sources, hours):
+    requests = {label: 0 for label, _, _ in PROFILES}
+    delays = {label: [] for label, _, _ in PROFILES}
+    for label, times in sources.values():
+        cursor = 0
+        now = 0.0
+        while now <= hours * 3600:
+            requests[label] += 1
+            cursor, visible, _ = poll(times, cursor, now)
+            delays[label].extend(now - t for t in visible)
+            now += FIXED_INTERVAL
+    return requests, delays
+
+
+def simulate_adaptive(sources, hours):
+    requests = {label: 0 for label, _, _ in PROFILES}
+    delays = {label: [] for label, _, _ in PROFILES}
+    now = 0.0
+    scheduler = PollScheduler(sources, now=now)
+    cursors = {name: 0 for name in sources}
+    while now <= hours * 3600:
+        for name in scheduler.due(now):
+            label, times = sources[name]
+            requests[label] += 1
+            cursors[name], visible, missed = poll(times, cursors[name], now)
+            delays[label].extend(now - t for t in visible)
+            scheduler.record_success(
+                name, len(visible),
+                saturated=missed or len(visible) >= FEED_ENTRIES, now=now)
+        now += max(scheduler.seconds_until_next(now), 1)
+    return requests, delays
+
+
+def main():
+    hours = int(sys.argv[1]) if len(sys.argv) > 1 else 48
+    sources = make_sources(hours)
+
+    print(f"sources: {len(sources)}, simulated hours: {hours}")
+    print(f"{'policy':>9} {'profile':>9} {'requests':>9} {'mean delay s':>13}")
+    for policy, simulate in (('fixed', simulate_fixed), ('adaptive', simulate_adaptive)):
+        requests, delays = simulate(sources, hours)
+        for label, _, _ in PROFILES:
+            mean = sum(delays[label]) / len(delays[label]) if delays[label] else 0.0
+            print(f"{policy:>9} {label:>9} {requests[label]:9d} {mean:13.0f}")
+        print(f"{policy:>9} {'total':>9} {sum(requests.values()):9d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: trending topics recomputed from the full article list on every
+publish (the old get_trending_topics) vs the incremental TrendingEngine
+Simulates a day of polls, each bringing a small batch of new articles on
+top of the retained ones, and reports the time spent per publish and per
+request
+Usage: python benchmarks/bench_trending.py [articles per day]
+"""
+
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from trending import TrendingEngine  # noqa: E402
+
+POLL_SECONDS = 300
+RETAINED = 5000
+
+PLACES = ['Nigeria', 'Kenya', 'South Africa', 'Ghana', 'Ethiopia', 'Cape Town',
+          'Addis Ababa', 'Lagos', 'Nairobi', 'Egypt', 'Morocco', 'Uganda']
+SUBJECTS = ['central bank', 'election results', 'fuel prices', 'power outages',
+            'football league', 'tech startups', 'floods', 'trade deal',
+            'health ministry', 'teachers strike', 'mobile money', 'border talks']
+VERBS = ['announces', 'faces', 'debates', 'reports', 'rejects', 'welcomes']
+
+
+def make_articles(count, seconds, seed=11):
+    rng = random.Random(seed)
+    start = time.time() - seconds
+    articles = []
+    for n in range(count):
+        published = start + seconds * n / count
+        title = (f"{rng.choice(PLACES)} {rng.choice(VERBS)} {rng.choice(SUBJECTS)} "
+                 f"as {rng.choice(SUBJECTS)} continue")
+        articles.append({
+            'id': f"article-{n}",
+            'title': title,
+            'description': f"Officials in {rng.choice(PLACES)} said the {rng.choice(SUBJECTS)} "
+                           f"would affect {rng.choice(PLACES)} this week.",
+            'published_at': datetime.fromtimestamp(published).isoformat(),
+        })
+    return articles
+
+
+def full_recount(articles, top_n=10):
+    """The previous get_trending_topics"""
+    topic_counts = {}
+    for article in articles:
+        text = f"{article['title']} {article['description']}".lower()
+        words = re.findall(r'\b[a-z]{4,}\b', text)
+        stop_words = {'news', 'said', 'says', 'after', 'will', 'also', 'been', 'have', 'were',
+                      'this', 'that', 'with', 'from', 'they', 'more', 'would', 'could', 'than',
+                      'what', 'when', 'where', 'while', 'about'}
+        for word in words:
+            if word not in stop_words and len(word) > 3:
+                topic_counts[word] = topic_counts.get(word, 0) + 1
+    return sorted(topic_counts.items(), key=lambda x: x[1], reverse=True)[:top_n]
+
+
+def main():
+    per_day = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    articles = make_articles(per_day, 86400)
+    polls = 86400 // POLL_SECONDS
+    batch = max(len(articles) // polls, 1)
+
+    full_publish = []
+    for end in range(batch, len(articles) + 1, batch):
+        retained = articles[max(end - RETAINED, 0):end]
+        start = time.perf_counter()
+        full_recount(retained)
+        full_publish.append(time.perf_counter() - start)
+
+    engine = TrendingEngine()
+    incremental_publish = []
+    for end in range(batch, len(articles) + 1, batch):
+        start = time.perf_counter()
+        engine.add(articles[end - batch:end])
+        engine.rankings()
+        incremental_publish.append(time.perf_counter() - start)
+
+    rankings = engine.rankings()
+    start = time.perf_counter()
+    for _ in range(10000):
+        rankings['24h'][:10]
+    request = (time.perf_counter() - start) / 10000
+
+    print(f"articles: {len(articles)}, polls: {len(full_publish)}, batch: {batch}")
+    print(f"{'method':>12} {'publish ms':>11} {'day total s':>12}")
+    print(f"{'full recount':>12} {1000 * sum(full_publish) / len(full_publish):11.2f} "
+          f"{sum(full_publish):12.2f}")
+    print(f"{'incremental':>12} {1000 * sum(incremental_publish) / len(incremental_publish):11.2f} "
+          f"{sum(incremental_publish):12.2f}")
+    print(f"request (top 10 slice): {request * 1e6:.2f} us "
+          f"(full recount per request: {1000 * full_publish[-1]:.2f} ms)")
+    print("top 24h topics:", [topic['topic'] for topic in rankings['24h'][:8]])
+
+
+if __name__ == "__main__":
+    main()
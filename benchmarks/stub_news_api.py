@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Local stub of the NewsAPI and GNews endpoints for testing the aggregator
+without spending real quota
+Answers /newsapi/everything and /gnews/search with generated articles after
+a configurable delay, and reports the requests it received at /stats
+Usage: python benchmarks/stub_news_api.py [port] [delay seconds]
+  then NEWSAPI_BASE_URL=http://127.0.0.1:<port>/newsapi
+       GNEWS_BASE_URL=http://127.0.0.1:<port>/gnews
+"""
+
+import asyncio
+import hashlib
+import sys
+from datetime import datetime, timedelta, timezone
+
+from aiohttp import web
+
+ARTICLES_PER_RESPONSE = 10
+
+
+def make_articles(provider, query, count=ARTICLES_PER_RESPONSE):
+    """Stable articles for a query, so repeated polls return the same stories"""
+    now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+    topic = query.strip('"').split(' OR ')[0]
+    articles = []
+    for n in range(count):
+        slug = hashlib.md5(f"{provider}:{query}:{n}".encode()).hexdigest()[:12]
+        article = {
+            'title': f"{topic} story {n} ({provider} {slug})",
+            'description': f"Coverage of {topic} from the {provider} stub",
+            'content': f"Stub article {n} about {topic}.",
+            'url': f"https://stub.example/{provider}/{slug}",
+            'publishedAt': (now - timedelta(minutes=7 * n)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'source': {'name': f"{provider.title()} Stub"},
+        }
+        article['urlToImage' if provider == 'newsapi' else 'image'] = \
+            f"https://stub.example/{slug}.jpg"
+        articles.append(article)
+    return articles
+
+
+def make_app(delay=0.0):
+    stats = {'newsapi': [], 'gnews': []}
+
+    def endpoint(provider, key_param):
+        async def handler(request):
+            query = request.query.get('q', '')
+            stats[provider].append(query)
+            if not request.query.get(key_param):
+                return web.json_response({'status': 'error', 'message': 'missing key'},
+                                         status=401)
+            await asyncio.sleep(delay)
+            articles = make_articles(provider, query)
+            return web.json_response({'totalArticles': len(articles), 'articles': articles})
+        return handler
+
+    async def report(request):
+        return web.json_response({provider: {'requests': len(queries), 'queries': queries}
+                                  for provider, queries in stats.items()})
+
+    app = web.Application()
+    app['stats'] = stats
+    app.router.add_get('/newsapi/everything', endpoint('newsapi', 'apiKey'))
+    app.router.add_get('/gnews/search', endpoint('gnews', 'apikey'))
+    app.router.add_get('/stats', report)
+    return app
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8090
+    delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    web.run_app(make_app(delay), host='127.0.0.1', port=port)
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Binary Snapshot
+Compact file of a NewsSnapshot that servers open with mmap: a fixed header,
+a section table, a deduplicated UTF-8 string pool with its offset table,
+fixed-size article records, and the snapshot's indexes (posting lists and
+column arrays) as raw arrays. Opening reads the header and wraps the
+sections in place, articles are decoded only when served, and processes
+mapping the same file share its pages.
+"""
+
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from collections import abc
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from article_store import CATEGORICAL_FIELDS, COLUMNS
+from news_export import atomic_write
+
+logger = logging.getLogger(__name__)
+
+BINARY_SNAPSHOT_FILE = os.getenv('NEWS_BINARY_SNAPSHOT_FILE', 'news_snapshot.bin')
+
+MAGIC = b'NBSNAP\r\n'
+FORMAT_VERSION = 1
+
+# magic, format version, article count, snapshot version, export sequence,
+# built at, section count
+HEADER = struct.Struct('<8sIIQQdI')
+# name, NumPy dtype, offset, length in bytes
+SECTION = struct.Struct('<24s8sQQ')
+
+# String fields of a record, each an index into the string pool
+STRING_FIELDS = ('id', 'title', 'description', 'content', 'url', 'thumbnail',
+                 'source', 'category', 'language', 'country_focus', 'published_at')
+# Short, repetitive fields whose decoded values are cached per file
+SHARED_FIELDS = ('source', 'category', 'language', 'country_focus')
+# String indexes, engagement, credibility, flags
+RECORD = struct.Struct(f"<{len(STRING_FIELDS)}IddB")
+
+NO_STRING = 0xFFFFFFFF
+FLAG_BREAKING = 1
+FLAG_TRENDING = 2
+# Separator of country_focus values inside their pooled string
+COUNTRY_SEPARATOR = ','
+# Filter fields whose posting keys are booleans
+FLAG_FIELDS = ('is_breaking', 'is_trending')
+
+
+def _align(offset: int) -> int:
+    """Sections start 8-byte aligned so arrays can be viewed in place"""
+    return (offset + 7) & ~7
+
+
+def write_binary_snapshot(snapshot, path: str = BINARY_SNAPSHOT_FILE,
+                          sequence: int = 0) -> int:
+    """Write a NewsSnapshot and its indexes through an atomic rename"""
+    articles = snapshot.articles
+    pool: Dict[str, int] = {}
+    encoded: List[bytes] = []
+
+    def intern(value) -> int:
+        if value is None:
+            return NO_STRING
+        value = str(value)
+        index = pool.get(value)
+        if index is None:
+            index = pool[value] = len(encoded)
+            encoded.append(value.encode('utf-8'))
+        return index
+
+    records = bytearray(RECORD.size * len(articles))
+    for position, article in enumerate(articles):
+        strings = [intern(article.get(field)) for field in STRING_FIELDS[:9]]
+        strings.append(intern(COUNTRY_SEPARATOR.join(article.get('country_focus') or [])))
+        strings.append(intern(article.get('published_at')))
+        flags = ((FLAG_BREAKING if article.get('is_breaking') else 0)
+                 | (FLAG_TRENDING if article.get('is_trending') else 0))
+        RECORD.pack_into(records, position * RECORD.size, *strings,
+                         float(article.get('engagement_score') or 0.0),
+                         float(article.get('credibility_score') or 0.0), flags)
+
+    # Posting lists back to back; keys are (field, key, start, length)
+    posting_keys = []
+    posting_values = []
+    start = 0
+    for field, values in snapshot.postings.items():
+        for key, posting in values.items():
+            posting_keys.extend((intern(field), intern(key), start, len(posting)))
+            posting_values.append(np.asarray(posting, dtype='<u4'))
+            start += len(posting)
+
+    sections: List[Tuple[str, np.ndarray]] = [
+        ('records', np.frombuffer(bytes(records), dtype='u1')),
+        ('posting_keys', np.array(posting_keys, dtype='<u4')),
+        ('postings', np.concatenate(posting_values) if posting_values
+         else np.zeros(0, dtype='<u4')),
+        ('trending', np.asarray(snapshot.trending.positions, dtype='<u4')),
+        ('topics', np.frombuffer(json.dumps(snapshot.topics).encode('utf-8'), dtype='u1')),
+    ]
+    store = snapshot.store
+    for name in COLUMNS:
+        column = getattr(store, name)
+        sections.append((f"column:{name}", column.astype(column.dtype.newbyteorder('<'))))
+    for field in CATEGORICAL_FIELDS:
+        values = store.vocabularies[field].values
+        sections.append((f"vocabulary:{field}",
+                         np.array([intern(value) for value in values], dtype='<u4')))
+
+    # The pool is complete only once every section has interned its strings
+    offsets = [0]
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    if offsets[-1] >= NO_STRING:
+        raise ValueError("String pool too large for a binary snapshot")
+    sections.append(('string_offsets', np.array(offsets, dtype='<u4')))
+    sections.append(('strings', np.frombuffer(b''.join(encoded), dtype='u1')))
+
+    table = []
+    offset = _align(HEADER.size + SECTION.size * len(sections))
+    for name, data in sections:
+        table.append(SECTION.pack(name.encode('ascii'), data.dtype.str.encode('ascii'),
+                                  offset, data.nbytes))
+        offset = _align(offset + data.nbytes)
+
+    with atomic_write(path, binary=True) as f:
+        # The snapshot's own build time, so every process serving this file
+        # tags its responses like the one that wrote it
+        f.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(articles), snapshot.version,
+                            sequence, snapshot.built_at.timestamp(), len(sections)))
+        f.write(b''.join(table))
+        written = HEADER.size + SECTION.size * len(sections)
+        for (_, data), entry in zip(sections, table):
+            data_offset = SECTION.unpack(entry)[2]
+            f.write(b'\0' * (data_offset - written))
+            f.write(data.tobytes())
+            written = data_offset + data.nbytes
+    return len(articles)
+
+
+class MappedArticles(abc.Sequence):
+    """Articles of a binary snapshot, decoded from the mapping on access"""
+
+    def __init__(self, path: str = BINARY_SNAPSHOT_FILE):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if sys.byteorder != 'little':
+                raise ValueError("Binary snapshots are little-endian only")
+            (magic, format_version, self.size, self.version, self.sequence,
+             self.built_at, section_count) = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or format_version != FORMAT_VERSION:
+                raise ValueError(f"{path} is not a version {FORMAT_VERSION} binary snapshot")
+
+            self._sections: Dict[str, Tuple[str, int, int]] = {}
+            for i in range(section_count):
+                name, dtype, offset, length = SECTION.unpack_from(
+                    self._map, HEADER.size + i * SECTION.size)
+                if offset + length > len(self._map):
+                    raise ValueError(f"{path} is truncated")
+                self._sections[name.rstrip(b'\0').decode('ascii')] = (
+                    dtype.rstrip(b'\0').decode('ascii'), offset, length)
+            if self._sections['records'][2] != self.size * RECORD.size:
+                raise ValueError(f"{path} has mismatched records")
+
+            self._records = self._sections['records'][1]
+            self._pool = self._sections['strings'][1]
+            self._offsets = self._view('string_offsets')
+        except Exception:
+            self._map.close()
+            raise
+        self._shared: Dict[int, object] = {}
+
+    def _view(self, name: str) -> memoryview:
+        """A section as a memoryview of Python ints"""
+        _, offset, length = self._sections[name]
+        return memoryview(self._map)[offset:offset + length].cast('I')
+
+    def _array(self, name: str) -> np.ndarray:
+        """A section as a read-only NumPy array over the mapping"""
+        dtype, offset, length = self._sections[name]
+        dtype = np.dtype(dtype)
+        return np.frombuffer(self._map, dtype=dtype, count=length // dtype.itemsize,
+                             offset=offset)
+
+    def close(self):
+        """Unmap the file; only once no snapshot uses these articles"""
+        self._offsets.release()
+        self._map.close()
+
+    def __len__(self):
+        return self.size
+
+    def _string(self, index: int) -> Optional[str]:
+        if index == NO_STRING:
+            return None
+        start = self._pool + self._offsets[index]
+        end = self._pool + self._offsets[index + 1]
+        return self._map[start:end].decode('utf-8')
+
+    def _shared_string(self, index: int):
+        value = self._shared.get(index)
+        if value is None:
+            value = self._shared[index] = self._string(index)
+        return value
+
+    def _article(self, position: int) -> Dict:
+        record = RECORD.unpack_from(self._map, self._records + position * RECORD.size)
+        article = {}
+        for field, index in zip(STRING_FIELDS, record):
+            if field == 'country_focus':
+                countries = self._shared_string(index)
+                article[field] = countries.split(COUNTRY_SEPARATOR) if countries else []
+            elif field in SHARED_FIELDS:
+                article[field] = self._shared_string(index)
+            else:
+                article[field] = self._string(index)
+        article['is_breaking'] = bool(record[-1] & FLAG_BREAKING)
+        article['is_trending'] = bool(record[-1] & FLAG_TRENDING)
+        article['engagement_score'] = record[-3]
+        article['credibility_score'] = record[-2]
+        return article
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self._article(i) for i in range(*position.indices(self.size))]
+        if position < 0:
+            position += self.size
+        if not 0 <= position < self.size:
+            raise IndexError(position)
+        return self._article(position)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for position in range(self.size):
+            yield self._article(position)
+
+    def postings(self) -> Dict[str, Dict[object, memoryview]]:
+        """Posting lists per filter field and key, viewed in place"""
+        keys = self._view('posting_keys')
+        values = self._view('postings')
+        postings: Dict[str, Dict[object, memoryview]] = {}
+        for i in range(0, len(keys), 4):
+            field = self._shared_string(keys[i])
+            key = self._shared_string(keys[i + 1])
+            if field in FLAG_FIELDS:
+                key = key == 'True'
+            start = keys[i + 2]
+            postings.setdefault(field, {})[key] = values[start:start + keys[i + 3]]
+        return postings
+
+    def trending_positions(self) -> memoryview:
+        """Positions of the snapshot's trending articles"""
+        return self._view('trending')
+
+    def topics(self) -> Dict[str, List[Dict]]:
+        """Ranked trending topics per window, as published with the snapshot"""
+        if 'topics' not in self._sections:
+            return {}
+        _, offset, length = self._sections['topics']
+        return json.loads(self._map[offset:offset + length].decode('utf-8'))
+
+    def columns(self) -> Dict[str, np.ndarray]:
+        """The ArticleStore column arrays, viewed in place"""
+        return {name: self._array(f"column:{name}") for name in COLUMNS}
+
+    def vocabularies(self) -> Dict[str, List[str]]:
+        """Values of each categorical column, in code order"""
+        return {field: [self._shared_string(index)
+                        for index in self._view(f"vocabulary:{field}")]
+                for field in CATEGORICAL_FIELDS}
+
+
+def open_binary_snapshot(path: str = BINARY_SNAPSHOT_FILE) -> Optional[MappedArticles]:
+    """Map a binary snapshot, or None if it is missing or unreadable"""
+    try:
+        return MappedArticles(path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.error(f"Error opening binary snapshot {path}: {e}")
+        return None
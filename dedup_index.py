@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Title Index
+MinHash signatures with locality-sensitive hashing (LSH) so each new title is
+compared only against titles that share a band bucket, not every title seen
+"""
+
+import json
+import logging
+import os
+import random
+import re
+import tempfile
+import zlib
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Mersenne prime used for the universal hash family (a * x + b) mod p;
+# 2**31 - 1 keeps every value a small int that packs into array('I')
+_MERSENNE_PRIME = (1 << 31) - 1
+
+DEFAULT_MAX_ENTRIES = int(os.getenv('NEWS_DEDUP_MAX_ENTRIES', 50000))
+# Where the aggregators keep their index between restarts
+DEDUP_INDEX_FILE = os.getenv('NEWS_DEDUP_INDEX_FILE', 'dedup_index.json')
+
+
+def title_words(title: str) -> Set[str]:
+    """Normalize a title into the word set used for similarity"""
+    return set(re.sub(r'[^\w\s]', '', title.lower()).split())
+
+
+def jaccard_similarity(words1: Set[str], words2: Set[str]) -> float:
+    """Shared words over all words"""
+    if not words1 or not words2:
+        return 0
+    return len(words1 & words2) / len(words1 | words2)
+
+
+def overlap_similarity(words1: Set[str], words2: Set[str]) -> float:
+    """Shared words over the size of the larger title"""
+    if not words1 or not words2:
+        return 0
+    return len(words1 & words2) / max(len(words1), len(words2))
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH index answering "is this title a near-duplicate?" queries
+
+    Candidates from the LSH buckets are confirmed with the exact similarity
+    function, so results use the same threshold semantics as a full scan.
+    Entries are kept in insertion order and the oldest are evicted once
+    max_entries is reached, which lets one index be reused across runs.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 80, bands: int = 16,
+                 similarity: Callable[[Set[str], Set[str]], float] = jaccard_similarity,
+                 max_entries: Optional[int] = DEFAULT_MAX_ENTRIES, seed: int = 1,
+                 word_cache_size: int = 50000):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.similarity = similarity
+        self.max_entries = max_entries
+        self.seed = seed
+        self.word_cache_size = word_cache_size
+
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, _MERSENNE_PRIME), rng.randrange(0, _MERSENNE_PRIME))
+                       for _ in range(num_perm)]
+        self._buckets: List[Dict[Tuple[int, ...], Set[str]]] = [
+            {} for _ in range(bands)]
+        self._entries: 'OrderedDict[str, Tuple[Set[str], Tuple[int, ...]]]' = OrderedDict()
+        # Per-word hash rows; headlines reuse a small vocabulary heavily
+        self._word_hashes: Dict[str, array] = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def _hash_row(self, word: str) -> array:
+        """All num_perm hash values of one word"""
+        row = self._word_hashes.get(word)
+        if row is None:
+            h = zlib.crc32(word.encode('utf-8')) % _MERSENNE_PRIME
+            row = array('I', [(a * h + b) % _MERSENNE_PRIME
+                              for a, b in self._perms])
+            if len(self._word_hashes) >= self.word_cache_size:
+                self._word_hashes.clear()
+            self._word_hashes[word] = row
+        return row
+
+    def signature(self, words: Iterable[str]) -> Tuple[int, ...]:
+        """MinHash signature of a word set"""
+        return tuple(map(min, zip(*[self._hash_row(word) for word in words])))
+
+    def _band_keys(self, signature: Tuple[int, ...]):
+        rows = self.rows
+        for band in range(self.bands):
+            yield band, signature[band * rows:(band + 1) * rows]
+
+    def candidates(self, signature: Tuple[int, ...]) -> Set[str]:
+        """Keys sharing at least one band bucket with the signature"""
+        found = set()
+        for band, band_key in self._band_keys(signature):
+            bucket = self._buckets[band].get(band_key)
+            if bucket:
+                found.update(bucket)
+        return found
+
+    def find_duplicate(self, words: Set[str], key: Optional[str] = None,
+                       signature: Optional[Tuple[int, ...]] = None) -> Optional[str]:
+        """Return the key of an indexed near-duplicate, ignoring `key` itself"""
+        if not words or not self._entries:
+            return None
+
+        if signature is None:
+            signature = self.signature(words)
+
+        for candidate in self.candidates(signature):
+            if candidate == key:
+                continue
+            if self.similarity(words, self._entries[candidate][0]) > self.threshold:
+                return candidate
+        return None
+
+    def add(self, key: str, words: Set[str],
+            signature: Optional[Tuple[int, ...]] = None):
+        """Index a title under key, replacing any previous entry for it"""
+        if not words:
+            return
+
+        if key in self._entries:
+            self.remove(key)
+
+        if signature is None:
+            signature = self.signature(words)
+
+        for band, band_key in self._band_keys(signature):
+            self._buckets[band].setdefault(band_key, set()).add(key)
+        self._entries[key] = (words, signature)
+
+        if self.max_entries is not None:
+            while len(self._entries) > self.max_entries:
+                self.remove(next(iter(self._entries)))
+
+    def remove(self, key: str):
+        """Drop a key from the index"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+
+        for band, band_key in self._band_keys(entry[1]):
+            bucket = self._buckets[band].get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band][band_key]
+
+    def check_and_add(self, key: str, title: str) -> Optional[str]:
+        """Add title unless it duplicates another key; return that key"""
+        words = title_words(title)
+        signature = self.signature(words) if words else None
+        duplicate = self.find_duplicate(words, key=key, signature=signature)
+        if duplicate is None:
+            self.add(key, words, signature=signature)
+        return duplicate
+
+    def save(self, path: str):
+        """Write the index to a JSON file, renamed into place when complete"""
+        data = {
+            'threshold': self.threshold,
+            'num_perm': self.num_perm,
+            'bands': self.bands,
+            'seed': self.seed,
+            'entries': [[key, sorted(words), list(signature)]
+                        for key, (words, signature) in self._entries.items()]
+        }
+        fd, temp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> 'NearDuplicateIndex':
+        """Read an index written by save"""
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        index = cls(threshold=data['threshold'], num_perm=data['num_perm'],
+                    bands=data['bands'], seed=data['seed'], **kwargs)
+        for key, words, signature in data['entries']:
+            index.add(key, set(words), signature=tuple(signature))
+        return index
+
+    @classmethod
+    def load_or_create(cls, path: str, **kwargs) -> 'NearDuplicateIndex':
+        """Read the index saved at path, or start an empty one"""
+        if os.path.exists(path):
+            try:
+                index = cls.load(path, **kwargs)
+                logger.info(f"Loaded {len(index)} dedup entries from {path}")
+                return index
+            except Exception as e:
+                logger.error(f"Error loading dedup index from {path}: {e}")
+        return cls(**kwargs)
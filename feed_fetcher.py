@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Feed Fetcher
+One long-lived aiohttp session shared by every aggregation run, so keep-alive
+connections, resolved addresses and TLS sessions carry over between polls,
+with a global connection limit and a per-host limit, and the conditional
+feed request and parse executor both aggregators use
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Connections open at once across all hosts, and to any single host
+FETCH_CONCURRENCY = int(os.getenv('NEWS_FETCH_CONCURRENCY', 32))
+FETCH_LIMIT_PER_HOST = int(os.getenv('NEWS_FETCH_LIMIT_PER_HOST', 4))
+# Seconds a resolved address is reused
+DNS_CACHE_TTL = int(os.getenv('NEWS_DNS_CACHE_TTL', 600))
+# Seconds an idle connection stays in the pool; polls are minutes apart
+KEEPALIVE_TIMEOUT = float(os.getenv('NEWS_KEEPALIVE_TIMEOUT', 300))
+FETCH_TIMEOUT = float(os.getenv('NEWS_FETCH_TIMEOUT', 60))
+
+USER_AGENT = 'Nairobell News Aggregator 1.0'
+
+# Feed parsing runs off the event loop: 'process' (default) or 'thread'
+PARSE_EXECUTOR = os.getenv('NEWS_PARSE_EXECUTOR', 'process')
+PARSE_WORKERS = int(os.getenv('NEWS_PARSE_WORKERS', os.cpu_count() or 4))
+
+
+def create_parse_executor(kind=PARSE_EXECUTOR, max_workers=PARSE_WORKERS):
+    """Create the executor used for CPU-bound feed parsing"""
+    if kind == 'thread':
+        return ThreadPoolExecutor(max_workers=max_workers,
+                                  thread_name_prefix='feed-parser')
+    return ProcessPoolExecutor(max_workers=max_workers)
+
+
+class FeedFetcher:
+    """Shared HTTP session for feed and API requests
+
+    The session is created on first use and bound to that event loop; if a
+    caller later runs on a different loop a new session replaces it.
+    """
+
+    def __init__(self, concurrency: int = FETCH_CONCURRENCY,
+                 limit_per_host: int = FETCH_LIMIT_PER_HOST,
+                 dns_cache_ttl: int = DNS_CACHE_TTL,
+                 keepalive_timeout: float = KEEPALIVE_TIMEOUT,
+                 timeout: float = FETCH_TIMEOUT):
+        self.concurrency = concurrency
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def session(self) -> aiohttp.ClientSession:
+        """The shared session, created on the running loop if needed"""
+        loop = asyncio.get_running_loop()
+        if self._session is not None and not self._session.closed and self._loop is loop:
+            return self._session
+
+        if self._session is not None and not self._session.closed:
+            # Its connections belong to another loop and cannot be reused here
+            logger.warning("Event loop changed; replacing the feed session")
+
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=self.limit_per_host,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl,
+            keepalive_timeout=self.keepalive_timeout,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            headers={'User-Agent': USER_AGENT},
+        )
+        self._loop = loop
+        logger.info(f"Opened feed session (concurrency {self.concurrency}, "
+                    f"{self.limit_per_host} per host)")
+        return self._session
+
+    async def close(self):
+        """Close the session and its pooled connections"""
+        session, self._session = self._session, None
+        if session is not None and not session.closed:
+            if self._loop is asyncio.get_running_loop():
+                await session.close()
+            else:
+                logger.warning("Feed session belongs to another loop; not closed")
+        self._loop = None
+
+    async def fetch_feed(self, source: str, url: str, validators,
+                         conditional: bool = True,
+                         health=None) -> Optional[Tuple[bool, Optional[str]]]:
+        """Conditional GET of a feed: (changed, body text), or None on failure
+
+        validators is a FeedValidatorStore. With conditional set (the caller
+        can serve its previous copy) the stored ETag/Last-Modified are sent,
+        and a 304 or a body hashing the same as last time return
+        (False, None) without reading or decoding it again. With a
+        SourceHealthStore as health, latency and failures are recorded there
+        and its per-source timeout applies.
+        """
+        timeout = health.timeout_for(source) if health is not None else self.timeout
+        headers = validators.request_headers(source) if conditional else {}
+        start = time.monotonic()
+        try:
+            async with self.session().get(
+                    url, headers=headers,
+                    timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                if response.status == 304:
+                    if health is not None:
+                        health.record_success(source, time.monotonic() - start)
+                    logger.info(f"Not modified: {source}")
+                    return False, None
+
+                if response.status != 200:
+                    if health is not None:
+                        health.record_failure(source, time.monotonic() - start,
+                                              f"HTTP {response.status}")
+                    logger.warning(f"HTTP {response.status} for {source}")
+                    return None
+
+                body = await response.read()
+                if health is not None:
+                    health.record_success(source, time.monotonic() - start)
+
+                unchanged = validators.update(
+                    source, response.headers.get('ETag'),
+                    response.headers.get('Last-Modified'),
+                    hashlib.sha1(body).hexdigest())
+                # Servers without validators: skip parsing an identical body
+                if conditional and unchanged:
+                    logger.info(f"Unchanged content: {source}")
+                    return False, None
+
+                return True, await response.text()
+
+        except asyncio.TimeoutError:
+            if health is not None:
+                health.record_failure(source, time.monotonic() - start, "timeout")
+            logger.error(f"Timeout fetching {source}")
+            return None
+        except Exception as e:
+            if health is not None:
+                health.record_failure(source, time.monotonic() - start,
+                                      str(e) or type(e).__name__)
+            logger.error(f"Error fetching {source}: {e}")
+            return None
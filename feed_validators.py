@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Feed Validators
+ETag, Last-Modified and body hash of each source's last feed response,
+persisted in SQLite so conditional requests keep working across restarts
+"""
+
+import logging
+import sqlite3
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class FeedValidatorStore:
+    """Validators for every source, kept in memory and flushed to SQLite
+
+    Not thread-safe; the aggregation that updates it runs one poll at a time.
+    """
+
+    def __init__(self, db_path: str, writer=None):
+        self.db_path = db_path
+        # Optional SQLiteWriter; without one, flush() opens its own connection
+        self.writer = writer
+
+        self._validators: Dict[str, Dict[str, Optional[str]]] = {}
+        self._dirty = set()
+
+        self.init_table()
+        self.load()
+
+    def init_table(self):
+        """Create the feed validator table if needed"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS feed_validators (
+                    source TEXT PRIMARY KEY,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_hash TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            logger.error(f"Feed validator table initialization error: {e}")
+
+    def load(self):
+        """Load the stored validators of every source"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            rows = conn.execute('''
+                SELECT source, etag, last_modified, content_hash FROM feed_validators
+            ''').fetchall()
+            conn.close()
+            for source, etag, last_modified, content_hash in rows:
+                self._validators[source] = {
+                    'etag': etag,
+                    'last_modified': last_modified,
+                    'content_hash': content_hash
+                }
+        except Exception as e:
+            logger.error(f"Error loading feed validators: {e}")
+
+    def get(self, source: str) -> Dict[str, Optional[str]]:
+        return self._validators.get(source, {})
+
+    def request_headers(self, source: str) -> Dict[str, str]:
+        """Conditional request headers for a source's next fetch"""
+        validator = self.get(source)
+        headers = {}
+        if validator.get('etag'):
+            headers['If-None-Match'] = validator['etag']
+        if validator.get('last_modified'):
+            headers['If-Modified-Since'] = validator['last_modified']
+        return headers
+
+    def update(self, source: str, etag: Optional[str],
+               last_modified: Optional[str], content_hash: str) -> bool:
+        """Store a full response's validators; True if the body is unchanged"""
+        unchanged = self.get(source).get('content_hash') == content_hash
+        self._validators[source] = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'content_hash': content_hash
+        }
+        self._dirty.add(source)
+        return unchanged
+
+    def flush(self):
+        """Write validators that changed since the last flush"""
+        if not self._dirty:
+            return
+
+        sql = '''
+            INSERT OR REPLACE INTO feed_validators
+                (source, etag, last_modified, content_hash, updated_at)
+            VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+        '''
+        rows = [(source, self._validators[source]['etag'],
+                 self._validators[source]['last_modified'],
+                 self._validators[source]['content_hash'])
+                for source in self._dirty]
+        try:
+            if self.writer is not None:
+                self.writer.submit(sql, rows)
+            else:
+                conn = sqlite3.connect(self.db_path)
+                conn.executemany(sql, rows)
+                conn.commit()
+                conn.close()
+            self._dirty.clear()
+        except Exception as e:
+            logger.error(f"Error saving feed validators: {e}")
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Article Fingerprint Store
+Persistent cross-run record of stories already processed, keyed by canonical
+URL and a 64-bit title SimHash, so aggregators can skip known stories before
+enrichment and database writes
+"""
+
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+# Days a fingerprint is remembered after it was last seen
+DEFAULT_RETENTION_DAYS = int(os.getenv('NEWS_FINGERPRINT_RETENTION_DAYS', 14))
+# Seconds between two prunes; aggregators call prune() on every poll
+PRUNE_INTERVAL = float(os.getenv('NEWS_FINGERPRINT_PRUNE_INTERVAL', 3600))
+
+# Query parameters that only track campaigns and never change the story
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'igshid', 'mc_cid', 'mc_eid',
+    'ocid', 'cmpid', 'cmp', 'ref', 'ref_src', 'src', 'source', 'rss',
+    'at_medium', 'at_campaign', 'at_custom1', 'at_custom2', '_ga', 'ito',
+    'spm', 'share', 'via'
+}
+
+MATCH_URL = 'url'
+MATCH_TITLE = 'title'
+
+
+def canonicalize_url(url: str) -> str:
+    """Reduce a URL to the form shared by every link to the same story"""
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+             if not key.lower().startswith('utm_') and key.lower() not in TRACKING_PARAMS]
+    query.sort()
+
+    path = re.sub(r'/{2,}', '/', parts.path)
+    if len(path) > 1:
+        path = path.rstrip('/')
+
+    # Scheme and fragment are dropped: http/https and #anchors are one story
+    return urlunsplit(('', host, path, urlencode(query), '')).lstrip('/')
+
+
+def title_simhash(title: str) -> int:
+    """64-bit SimHash of the words in a title"""
+    words = re.sub(r'[^\w\s]', '', title.lower()).split()
+    if not words:
+        return 0
+
+    weights = [0] * 64
+    for word in words:
+        h = int.from_bytes(hashlib.blake2b(
+            word.encode('utf-8'), digest_size=8).digest(), 'big')
+        for bit in range(64):
+            weights[bit] += 1 if h >> bit & 1 else -1
+
+    fingerprint = 0
+    for bit in range(64):
+        if weights[bit] > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two fingerprints"""
+    return bin(a ^ b).count('1')
+
+
+def _blocks(fingerprint: int) -> Tuple[int, int, int, int]:
+    """Split a fingerprint into four 16-bit blocks"""
+    return tuple((fingerprint >> shift) & 0xFFFF for shift in (0, 16, 32, 48))
+
+
+def _to_signed(value: int) -> int:
+    """Store unsigned 64-bit values in SQLite's signed INTEGER"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class ArticleFingerprintStore:
+    """Canonical URL and title SimHash fingerprints persisted in SQLite
+
+    Fingerprints seen within the retention window are loaded into memory, so
+    lookups never touch the database; new fingerprints and last-seen updates
+    are written in one transaction by flush().
+    """
+
+    def __init__(self, db_path: str, max_distance: int = 3,
+                 retention_days: int = DEFAULT_RETENTION_DAYS, writer=None):
+        # Four 16-bit blocks: any two hashes within 3 bits share a block
+        if max_distance > 3:
+            raise ValueError("max_distance must be at most 3")
+
+        self.db_path = db_path
+        self.max_distance = max_distance
+        self.retention_days = retention_days
+        # Optional SQLiteWriter; without one, flush() opens its own connection
+        self.writer = writer
+
+        self._by_url: Dict[str, str] = {}
+        self._simhashes: Dict[str, int] = {}
+        self._blocks: List[Dict[int, Set[str]]] = [{} for _ in range(4)]
+        self._pending: Dict[str, Tuple[str, int]] = {}
+        self._touched: Set[str] = set()
+        # Last time each fingerprint was seen by this process (epoch seconds)
+        self._last_seen: Dict[str, float] = {}
+        self._last_pruned: Optional[float] = None
+
+        self.init_table()
+        self.load()
+
+    def init_table(self):
+        """Create the fingerprint table if needed"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS article_fingerprints (
+                    canonical_url TEXT PRIMARY KEY,
+                    article_id TEXT NOT NULL,
+                    title_simhash INTEGER NOT NULL,
+                    first_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_fingerprints_last_seen
+                ON article_fingerprints(last_seen)
+            ''')
+
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            logger.error(f"Fingerprint table initialization error: {e}")
+
+    def load(self):
+        """Load fingerprints seen within the retention window"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+
+            cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+            cursor.execute('''
+                SELECT canonical_url, article_id, title_simhash
+                FROM article_fingerprints
+                WHERE last_seen > ?
+            ''', (cutoff.strftime('%Y-%m-%d %H:%M:%S'),))
+
+            for canonical_url, article_id, simhash in cursor.fetchall():
+                self._remember(canonical_url, article_id, _to_unsigned(simhash))
+
+            conn.close()
+            logger.info(f"Loaded {len(self._by_url)} article fingerprints")
+        except Exception as e:
+            logger.error(f"Error loading article fingerprints: {e}")
+
+    def __len__(self):
+        return len(self._by_url)
+
+    def _remember(self, canonical_url: str, article_id: str, simhash: int):
+        self._by_url[canonical_url] = article_id
+        # Loaded fingerprints count as seen now, so they outlive their
+        # stored last_seen by at most one process lifetime
+        self._last_seen[canonical_url] = time.time()
+        if simhash:
+            self._simhashes[canonical_url] = simhash
+            for i, block in enumerate(_blocks(simhash)):
+                self._blocks[i].setdefault(block, set()).add(canonical_url)
+
+    def _touch(self, canonical_url: str):
+        self._touched.add(canonical_url)
+        self._last_seen[canonical_url] = time.time()
+
+    def _forget(self, canonical_url: str):
+        self._by_url.pop(canonical_url, None)
+        self._last_seen.pop(canonical_url, None)
+        simhash = self._simhashes.pop(canonical_url, None)
+        if simhash:
+            for i, block in enumerate(_blocks(simhash)):
+                urls = self._blocks[i].get(block)
+                if urls is not None:
+                    urls.discard(canonical_url)
+                    if not urls:
+                        del self._blocks[i][block]
+
+    def _find_similar_title(self, simhash: int, canonical_url: str) -> Optional[str]:
+        """URL of a stored story whose title hash is within max_distance"""
+        for i, block in enumerate(_blocks(simhash)):
+            for other_url in self._blocks[i].get(block, ()):
+                if other_url == canonical_url:
+                    continue
+                if hamming_distance(simhash, self._simhashes[other_url]) <= self.max_distance:
+                    return other_url
+        return None
+
+    def lookup(self, url: str, title: str) -> Optional[Tuple[str, str]]:
+        """Return (match type, article id) if the story is already known"""
+        canonical_url = canonicalize_url(url)
+
+        article_id = self._by_url.get(canonical_url)
+        if article_id is not None:
+            self._touch(canonical_url)
+            return MATCH_URL, article_id
+
+        simhash = title_simhash(title)
+        if simhash:
+            other_url = self._find_similar_title(simhash, canonical_url)
+            if other_url is not None:
+                self._touch(other_url)
+                return MATCH_TITLE, self._by_url[other_url]
+
+        return None
+
+    def add(self, article_id: str, url: str, title: str):
+        """Remember a newly processed story"""
+        canonical_url = canonicalize_url(url)
+        if self._by_url.get(canonical_url) == article_id:
+            self._touch(canonical_url)
+            return
+
+        simhash = title_simhash(title)
+        self._remember(canonical_url, article_id, simhash)
+        self._pending[canonical_url] = (article_id, simhash)
+
+    def add_articles(self, articles: Iterable):
+        """Remember every article in an iterable of NewsArticle objects"""
+        for article in articles:
+            self.add(article.id, article.url, article.title)
+
+    def flush(self):
+        """Write new fingerprints and last-seen updates in one transaction"""
+        if not self._pending and not self._touched:
+            return
+
+        statements = [
+            ('''
+                INSERT OR REPLACE INTO article_fingerprints
+                    (canonical_url, article_id, title_simhash)
+                VALUES (?, ?, ?)
+            ''', [(canonical_url, article_id, _to_signed(simhash))
+                  for canonical_url, (article_id, simhash) in self._pending.items()]),
+            ('''
+                UPDATE article_fingerprints SET last_seen = CURRENT_TIMESTAMP
+                WHERE canonical_url = ?
+            ''', [(canonical_url,) for canonical_url in self._touched
+                  if canonical_url not in self._pending]),
+        ]
+
+        try:
+            if self.writer is not None:
+                for sql, rows in statements:
+                    self.writer.submit(sql, rows)
+            else:
+                conn = sqlite3.connect(self.db_path)
+                cursor = conn.cursor()
+                for sql, rows in statements:
+                    cursor.executemany(sql, rows)
+                conn.commit()
+                conn.close()
+
+            self._pending.clear()
+            self._touched.clear()
+        except Exception as e:
+            logger.error(f"Error saving article fingerprints: {e}")
+
+    def prune(self, force: bool = False):
+        """Forget fingerprints not seen within the retention window
+
+        Expired fingerprints are dropped from memory and deleted from the
+        database. Runs at most once per PRUNE_INTERVAL unless forced, so it
+        can be called on every poll.
+        """
+        now = time.time()
+        if (not force and self._last_pruned is not None and
+                now - self._last_pruned < PRUNE_INTERVAL):
+            return
+        self._last_pruned = now
+
+        expired = [canonical_url for canonical_url, seen in self._last_seen.items()
+                   if seen <= now - self.retention_days * 86400
+                   and canonical_url not in self._pending]
+        for canonical_url in expired:
+            self._forget(canonical_url)
+        self._touched.difference_update(expired)
+
+        cutoff = datetime.utcnow() - timedelta(days=self.retention_days)
+        sql = 'DELETE FROM article_fingerprints WHERE last_seen <= ?'
+        rows = [(cutoff.strftime('%Y-%m-%d %H:%M:%S'),)]
+        try:
+            if self.writer is not None:
+                self.writer.submit(sql, rows)
+            else:
+                conn = sqlite3.connect(self.db_path)
+                conn.executemany(sql, rows)
+                conn.commit()
+                conn.close()
+            if expired:
+                logger.info(f"Pruned {len(expired)} expired article fingerprints")
+        except Exception as e:
+            logger.error(f"Error pruning article fingerprints: {e}")
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Keyword Matcher
+Aho-Corasick automaton over word tokens, compiled once from the country and
+category gazetteer, that finds every keyword in a text in one linear pass
+"""
+
+import json
+import logging
+import os
+import re
+import unicodedata
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GAZETTEER_PATH = os.getenv(
+    'NEWS_GAZETTEER_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gazetteer.json'))
+
+# Words with inner apostrophes (d'ivoire, n'djamena) stay whole; hyphens
+# and everything else separate words
+_TOKEN_PATTERN = re.compile(r"\w+(?:'\w+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased, accent-folded word tokens with possessive 's removed"""
+    text = text.lower().replace('’', "'")
+    if not text.isascii():
+        # Côte d'Ivoire and Lomé match their unaccented keywords
+        text = ''.join(c for c in unicodedata.normalize('NFKD', text)
+                       if not unicodedata.combining(c))
+    tokens = _TOKEN_PATTERN.findall(text)
+    if "'s" not in text:
+        return tokens
+    return [token[:-2] if token.endswith("'s") else token for token in tokens]
+
+
+class AhoCorasick:
+    """Multi-pattern matcher whose alphabet is word tokens, not characters
+
+    Patterns are sequences of words, so every match starts and ends on a
+    word boundary: 'niger' never matches inside 'nigeria'. A text token
+    that is not a pattern word but whose singular ('banks' -> 'bank') is
+    gets matched as the singular.
+    """
+
+    def __init__(self, patterns: Iterable[Sequence[str]]):
+        # State 0 is the root; _goto[state] maps a word to the next state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # (pattern index, pattern length in words) ending at each state
+        self._outputs: List[Tuple[Tuple[int, int], ...]] = [()]
+        self.vocabulary: Set[str] = set()
+        self.size = 0
+
+        outputs: List[List[Tuple[int, int]]] = [[]]
+        for index, words in enumerate(patterns):
+            words = tuple(words)
+            if not words:
+                continue
+            state = 0
+            for word in words:
+                next_state = self._goto[state].get(word)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][word] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    outputs.append([])
+                state = next_state
+            outputs[state].append((index, len(words)))
+            self.vocabulary.update(words)
+            self.size += 1
+
+        # Text token -> pattern word; plurals first so real words win
+        self._words: Dict[str, str] = {word + 's': word for word in self.vocabulary}
+        self._words.update((word, word) for word in self.vocabulary)
+
+        # Breadth-first failure links; outputs inherit along them
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for word, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and word not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(word, 0)
+                outputs[next_state].extend(outputs[self._fail[next_state]])
+
+        self._outputs = [tuple(output) for output in outputs]
+
+    def iter_matches(self, tokens: Sequence[str]):
+        """Yield (start, end, pattern index) for every match, overlaps included"""
+        goto = self._goto
+        fail = self._fail
+        outputs = self._outputs
+        words = self._words
+        state = 0
+
+        for position, token in enumerate(tokens):
+            token = words.get(token)
+            if token is None:
+                # No pattern contains this word: every match restarts
+                state = 0
+                continue
+
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+
+            for index, length in outputs[state]:
+                yield position - length + 1, position + 1, index
+
+    def find_all(self, tokens: Sequence[str]) -> List[Tuple[int, int, int]]:
+        """Leftmost-longest, non-overlapping matches as (start, end, index)
+
+        'south sudan' is reported instead of 'sudan', and 'equatorial
+        guinea' instead of 'guinea'.
+        """
+        matches = sorted(self.iter_matches(tokens), key=lambda m: (m[0], m[0] - m[1]))
+        selected = []
+        covered = 0
+        for start, end, index in matches:
+            if start >= covered:
+                selected.append((start, end, index))
+                covered = end
+        return selected
+
+
+class GazetteerMatcher:
+    """Country and category keyword lookup compiled from a gazetteer
+
+    The gazetteer maps each country to its keywords (names, demonyms,
+    cities) and lists categories in priority order with their keywords.
+    """
+
+    def __init__(self, gazetteer: Dict):
+        self.countries: List[str] = list(gazetteer.get('countries', {}))
+        self.categories: List[str] = [
+            entry['name'] for entry in gazetteer.get('categories', [])]
+
+        patterns = []
+        # Label of each pattern: ('country', index) or ('category', index)
+        self._labels: List[Tuple[str, int]] = []
+        for index, keywords in enumerate(gazetteer.get('countries', {}).values()):
+            for keyword in keywords:
+                patterns.append(tokenize(keyword))
+                self._labels.append(('country', index))
+        for index, entry in enumerate(gazetteer.get('categories', [])):
+            for keyword in entry['keywords']:
+                patterns.append(tokenize(keyword))
+                self._labels.append(('category', index))
+
+        self.automaton = AhoCorasick(patterns)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_GAZETTEER_PATH) -> 'GazetteerMatcher':
+        """Compile the matcher from a gazetteer JSON file"""
+        with open(path, 'r', encoding='utf-8') as f:
+            gazetteer = json.load(f)
+        matcher = cls(gazetteer)
+        logger.info(f"Compiled {matcher.automaton.size} gazetteer keywords from {path}")
+        return matcher
+
+    def match(self, text: str) -> Tuple[List[str], Optional[str]]:
+        """Countries mentioned in the text (gazetteer order) and its category"""
+        country_hits = set()
+        category_hits = set()
+        for _, _, index in self.automaton.find_all(tokenize(text)):
+            kind, label = self._labels[index]
+            if kind == 'country':
+                country_hits.add(label)
+            else:
+                category_hits.add(label)
+
+        countries = [self.countries[i] for i in sorted(country_hits)]
+        category = self.categories[min(category_hits)] if category_hits else None
+        return countries, category
+
+    def countries_in(self, text: str) -> List[str]:
+        """Countries mentioned in the text, in gazetteer order"""
+        return self.match(text)[0]
+
+    def category_of(self, text: str) -> Optional[str]:
+        """Highest-priority category with a keyword in the text"""
+        return self.match(text)[1]
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Leader Lease
+Elects the one worker process that aggregates news when several serve the
+API: a lease row in SQLite that its holder renews and any worker may take
+once it expires
+"""
+
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Run several API workers on one host, one of them aggregating and the rest
+# serving the binary snapshot it writes
+SHARED_WORKERS = os.getenv('NEWS_SHARED_WORKERS', 'False').lower() == 'true'
+# Seconds a lease lasts without renewal; a dead leader is replaced within it
+LEASE_SECONDS = float(os.getenv('NEWS_LEADER_LEASE_SECONDS', 30))
+# Seconds between follower checks of the shared snapshot file
+FOLLOW_INTERVAL = float(os.getenv('NEWS_FOLLOW_INTERVAL', 2))
+# Seconds to wait for another worker's lease transaction
+LOCK_TIMEOUT = 5
+
+
+class LeaderLease:
+    """A named lease in the leader_lease table
+
+    Every worker calls acquire() periodically (start() does so on a
+    background thread): the holder renews its lease, the others take it
+    only after it has expired. A holder counts itself leader only until its
+    own lease would expire, so it steps down before anyone can take over
+    even if renewing fails. Workers must share the database file, so all
+    run on one host.
+    """
+
+    def __init__(self, db_path: str, name: str = 'aggregator',
+                 lease_seconds: float = LEASE_SECONDS, holder: Optional[str] = None):
+        self.db_path = db_path
+        self.name = name
+        self.lease_seconds = lease_seconds
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        # Monotonic time the lease we hold runs out
+        self._valid_until = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.init_table()
+
+    def init_table(self):
+        """Create the lease table if needed"""
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=LOCK_TIMEOUT)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS leader_lease (
+                    name TEXT PRIMARY KEY,
+                    holder TEXT NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            logger.error(f"Leader lease table initialization error: {e}")
+
+    @property
+    def is_leader(self) -> bool:
+        """Whether this process holds an unexpired lease"""
+        return time.monotonic() < self._valid_until
+
+    @property
+    def renew_interval(self) -> float:
+        """Seconds between renewals, leaving room for two to fail"""
+        return self.lease_seconds / 3
+
+    def acquire(self) -> bool:
+        """Renew the lease, or take it if it is free or expired"""
+        was_leader = self.is_leader
+        started = time.monotonic()
+        now = time.time()
+        acquired = False
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=LOCK_TIMEOUT, isolation_level=None)
+            try:
+                # Write lock first, so two workers cannot both see it expired
+                conn.execute('BEGIN IMMEDIATE')
+                row = conn.execute(
+                    'SELECT holder, expires_at FROM leader_lease WHERE name = ?',
+                    (self.name,)).fetchone()
+                if row is None or row[0] == self.holder or row[1] <= now:
+                    conn.execute(
+                        'INSERT OR REPLACE INTO leader_lease (name, holder, expires_at) '
+                        'VALUES (?, ?, ?)', (self.name, self.holder, now + self.lease_seconds))
+                    acquired = True
+                conn.execute('COMMIT')
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.error(f"Error renewing leader lease: {e}")
+            acquired = False
+
+        if acquired:
+            self._valid_until = started + self.lease_seconds
+            if not was_leader:
+                logger.info(f"{self.holder} is now the {self.name} leader")
+        elif was_leader and not self.is_leader:
+            logger.warning(f"{self.holder} lost the {self.name} lease")
+        return self.is_leader
+
+    def release(self):
+        """Give up the lease so another worker can take it straight away"""
+        was_leader = self.is_leader
+        self._valid_until = 0.0
+        if not was_leader:
+            return
+        try:
+            conn = sqlite3.connect(self.db_path, timeout=LOCK_TIMEOUT)
+            conn.execute('DELETE FROM leader_lease WHERE name = ? AND holder = ?',
+                         (self.name, self.holder))
+            conn.commit()
+            conn.close()
+            logger.info(f"{self.holder} released the {self.name} lease")
+        except Exception as e:
+            logger.error(f"Error releasing leader lease: {e}")
+
+    def _run(self):
+        while not self._stop.wait(self.renew_interval):
+            self.acquire()
+
+    def start(self):
+        """Acquire now, then keep renewing or retrying on a daemon thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self.acquire()
+            self._thread = threading.Thread(
+                target=self._run, name=f"{self.name}-lease", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop renewing and release the lease"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=LOCK_TIMEOUT + 1)
+            self._thread = None
+        self.release()
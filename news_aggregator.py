@@ -12,18 +12,35 @@ import json
 import asyncio
 import aiohttp
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import hashlib
 import re
-from typing import List, Dict, Optional
-from dataclasses import dataclass, asdict
+from typing import List, Dict, Optional, Tuple
 from urllib.parse import urljoin, urlparse
 import os
 from dotenv import load_dotenv
 import time
 from concurrent.futures import ThreadPoolExecutor
+import signal
 import sqlite3
-import schedule
+from dedup_index import DEDUP_INDEX_FILE, NearDuplicateIndex, overlap_similarity
+from fingerprint_store import ArticleFingerprintStore, MATCH_TITLE, MATCH_URL
+from news_article import NewsArticle
+from sqlite_writer import SQLiteWriter
+from keyword_matcher import GazetteerMatcher
+from enrichment import BREAKING_INDICATORS, ENGAGEMENT_WORDS, BatchEnricher
+from article_db import (init_article_schema, article_write_statements,
+                        query_articles, count_articles, search_articles,
+                        count_search_results)
+from feed_fetcher import FeedFetcher, create_parse_executor
+from feed_validators import FeedValidatorStore
+from source_health import SourceHealthStore
+from poll_scheduler import PollScheduler
+from api_quota import (ApiQuotaManager, API_BURST, GNEWS_DAILY_LIMIT,
+                       NEWSAPI_DAILY_LIMIT)
+from trending import TrendingEngine
+from news_snapshot import StagedPublisher
+from news_export import EXPORT_FORMAT, JSON_EXPORT_FILE, NewsExporter, write_json
 
 load_dotenv()
 
@@ -38,79 +55,113 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# API endpoints; point them at a local stub server for testing
+NEWSAPI_BASE_URL = os.getenv('NEWSAPI_BASE_URL', 'https://newsapi.org/v2')
+GNEWS_BASE_URL = os.getenv('GNEWS_BASE_URL', 'https://gnews.io/api/v4')
+AFRICA_QUERY = 'Africa OR Nigeria OR Kenya OR "South Africa" OR Ghana OR Ethiopia'
 
-@dataclass
-class NewsArticle:
-    """Data class for news articles"""
-    id: str
-    title: str
-    description: str
-    content: str
-    url: str
-    thumbnail: Optional[str]
-    source: str
-    category: str
-    country_focus: List[str]
-    language: str
-    published_at: datetime
-    is_breaking: bool = False
-    is_trending: bool = False
-    engagement_score: float = 0.0
-    credibility_score: float = 5.0
-
-    def to_dict(self):
-        """Convert to dictionary for JSON serialization"""
-        data = asdict(self)
-        data['published_at'] = self.published_at.isoformat()
-        return data
-
-    @classmethod
-    def from_feed_entry(cls, entry, source_config):
-        """Create NewsArticle from RSS feed entry"""
-        # Generate unique ID
-        article_id = hashlib.md5(
-            f"{entry.link}{entry.title}".encode()).hexdigest()
-
-        # Extract published date
-        published_at = datetime.now()
-        if hasattr(entry, 'published_parsed') and entry.published_parsed:
-            published_at = datetime(*entry.published_parsed[:6])
-        elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
-            published_at = datetime(*entry.updated_parsed[:6])
-
-        # Extract thumbnail
-        thumbnail = None
-        if hasattr(entry, 'media_thumbnail') and entry.media_thumbnail:
-            thumbnail = entry.media_thumbnail[0]['url']
-        elif hasattr(entry, 'enclosures') and entry.enclosures:
-            for enclosure in entry.enclosures:
-                if enclosure.type.startswith('image/'):
-                    thumbnail = enclosure.href
-                    break
-
-        # Clean description
-        description = getattr(entry, 'summary', '')
-        if description:
-            # Remove HTML tags
-            description = re.sub(r'<[^>]+>', '', description)
-            description = description.strip(
-            )[:300] + ('...' if len(description) > 300 else '')
-
-        return cls(
-            id=article_id,
-            title=entry.title,
-            description=description,
-            content=getattr(entry, 'content', [{}])[0].get(
-                'value', description) if hasattr(entry, 'content') else description,
-            url=entry.link,
-            thumbnail=thumbnail,
-            source=source_config['name'],
-            category=source_config.get('category', 'general'),
-            country_focus=[source_config.get('country', 'africa')],
-            language=source_config.get('language', 'en'),
-            published_at=published_at,
-            credibility_score=source_config.get('credibility', 5.0)
-        )
+# Entries kept from each feed body
+MAX_FEED_ENTRIES = 10
+
+# Hours enriched articles are kept for reuse when a known link comes back
+KNOWN_ARTICLE_HOURS = int(os.getenv('NEWS_KNOWN_ARTICLE_HOURS', 48))
+
+
+def parse_api_timestamp(value: Optional[str]) -> datetime:
+    """Naive UTC datetime of an API publishedAt, like RSS published_parsed
+
+    Aware and naive datetimes cannot be compared, so API articles must not
+    carry a timezone when sorted with feed articles. Missing or malformed
+    values count as published now.
+    """
+    if value:
+        try:
+            published_at = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            if published_at.tzinfo is not None:
+                published_at = published_at.astimezone(timezone.utc).replace(tzinfo=None)
+            return published_at
+        except ValueError:
+            pass
+    return datetime.utcnow()
+
+
+def extract_image_from_content(content: str, entry_links: list) -> Optional[str]:
+    """Extract image URL from article content or links"""
+    # Try to find image in content
+    img_pattern = r'<img[^>]+src=["\']([^"\']+)["\'][^>]*>'
+    img_match = re.search(img_pattern, content, re.IGNORECASE)
+    if img_match:
+        return img_match.group(1)
+
+    # Try to find image in entry links
+    for link in entry_links:
+        if hasattr(link, 'type') and link.type and 'image' in link.type:
+            return link.href
+
+    return None
+
+
+def parse_feed_items(content: str, source_name: str,
+                     max_entries: int = MAX_FEED_ENTRIES) -> List[Dict]:
+    """Parse a feed body into plain entry dicts (runs in the parse executor)
+
+    Only what the feed itself says is extracted here; known-story checks
+    and enrichment need the aggregator's state and run on the loop.
+    """
+    feed = feedparser.parse(content)
+    items = []
+
+    for entry in feed.entries[:max_entries]:
+        try:
+            # Extract basic info
+            title = entry.get('title', '').strip()
+            description = entry.get('description', '').strip()
+            url = entry.get('link', '')
+
+            if not title or not url:
+                continue
+
+            # Parse published date
+            published_at = datetime.utcnow()
+            if hasattr(entry, 'published_parsed') and entry.published_parsed:
+                try:
+                    published_at = datetime(
+                        *entry.published_parsed[:6])
+                except:
+                    pass
+
+            # Extract thumbnail
+            thumbnail = None
+            if hasattr(entry, 'media_thumbnail') and entry.media_thumbnail:
+                thumbnail = entry.media_thumbnail[0]['url']
+            elif hasattr(entry, 'enclosures') and entry.enclosures:
+                for enclosure in entry.enclosures:
+                    if 'image' in enclosure.get('type', ''):
+                        thumbnail = enclosure.get('href')
+                        break
+
+            if not thumbnail:
+                thumbnail = extract_image_from_content(
+                    entry.get('content', [{}])[0].get(
+                        'value', '') if entry.get('content') else '',
+                    entry.get('links', [])
+                )
+
+            items.append({
+                'title': title,
+                'description': description,
+                'content': entry.get('content', [{}])[0].get(
+                    'value', description) if entry.get('content') else description,
+                'url': url,
+                'thumbnail': thumbnail,
+                'published_at': published_at,
+            })
+
+        except Exception as e:
+            logger.error(f"Error processing entry from {source_name}: {e}")
+            continue
+
+    return items
 
 
 class AfricanNewsAggregator:
@@ -120,7 +171,7 @@ class AfricanNewsAggregator:
         # GNews API configuration
         self.gnews_api_key = os.getenv(
             'GNEWS_API_KEY', 'bab8859f3225f004320365ab98bb7076')
-        self.gnews_base_url = 'https://gnews.io/api/v4'
+        self.gnews_base_url = GNEWS_BASE_URL
 
         # African countries for GNews API
         self.african_countries = {
@@ -286,204 +337,206 @@ class AfricanNewsAggregator:
             }
         }
 
-        # Cache for storing articles
+        # Articles of each source's last successful fetch
         self.article_cache = {}
+        # Articles each feed and API query contributed when last polled
+        self.source_articles = {}
         self.last_update = None
         self.db_path = 'news_cache.db'
         self.init_database()
 
-    def init_database(self):
-        """Initialize SQLite database for caching"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS articles (
-                    id TEXT PRIMARY KEY,
-                    data TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    source TEXT,
-                    category TEXT
-                )
-            ''')
+        # All cache writes go through one long-lived WAL connection
+        self.writer = SQLiteWriter(self.db_path)
 
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_articles_source ON articles(source)
-            ''')
+        # Near-duplicate title index, kept across aggregation runs and
+        # saved on close so restarts keep it too
+        self.dedup_index_path = DEDUP_INDEX_FILE
+        self.dedup_index = NearDuplicateIndex.load_or_create(
+            self.dedup_index_path, similarity=overlap_similarity)
 
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_articles_category ON articles(category)
-            ''')
+        # Stories processed by earlier runs, persisted in the database
+        self.fingerprints = ArticleFingerprintStore(
+            self.db_path, writer=self.writer)
+        # Enriched copies of recent stories, seeded from the database so
+        # known links are not rebuilt after a restart
+        self.known_articles = self.load_known_articles()
 
-            conn.commit()
-            conn.close()
-            logger.info("Database initialized successfully")
-        except Exception as e:
-            logger.error(f"Database initialization error: {e}")
+        # HTTP validators per source for conditional feed requests
+        self.feed_validators = FeedValidatorStore(self.db_path, writer=self.writer)
 
-    async def fetch_rss_feed(self, session, source_name, source_config):
-        """Fetch and parse RSS feed from a single source"""
-        try:
-            timeout = aiohttp.ClientTimeout(total=30)
-            async with session.get(source_config['rss_url'], timeout=timeout) as response:
-                if response.status != 200:
-                    logger.warning(f"HTTP {response.status} for {source_name}")
-                    return []
+        # Success rate, latency and circuit state per source
+        self.source_health = SourceHealthStore(self.db_path, writer=self.writer)
 
-                content = await response.text()
-                feed = feedparser.parse(content)
+        # Each feed is polled on its own schedule, learned from its feed
+        self.poll_scheduler = PollScheduler(
+            self.news_sources, db_path=self.db_path, writer=self.writer)
 
-                if feed.bozo:
-                    logger.warning(
-                        f"Malformed feed from {source_name}: {feed.bozo_exception}")
+        # Country and category keywords, compiled once from gazetteer.json
+        self.keyword_matcher = GazetteerMatcher.load()
+        self.enricher = BatchEnricher(self.keyword_matcher)
 
-                articles = []
-                for entry in feed.entries[:10]:  # Limit to 10 most recent
-                    try:
-                        article = NewsArticle.from_feed_entry(
-                            entry, source_config)
-                        articles.append(article)
-                    except Exception as e:
-                        logger.error(
-                            f"Error processing entry from {source_name}: {e}")
-                        continue
+        # Topic counts over sliding windows, updated as articles arrive
+        self.trending = TrendingEngine()
 
-                logger.info(
-                    f"Fetched {len(articles)} articles from {source_name}")
-                return articles
-
-        except asyncio.TimeoutError:
-            logger.error(f"Timeout fetching {source_name}")
-            return []
-        except Exception as e:
-            logger.error(f"Error fetching {source_name}: {e}")
-            return []
-
-    async def aggregate_all_sources(self):
-        """Aggregate news from all configured sources"""
-        start_time = time.time()
-        logger.info("Starting news aggregation...")
-
-        all_articles = []
-
-        connector = aiohttp.TCPConnector(limit=10)
-        timeout = aiohttp.ClientTimeout(total=60)
-
-        async with aiohttp.ClientSession(
-            connector=connector,
-            timeout=timeout,
-            headers={'User-Agent': 'Nairobell News Aggregator 1.0'}
-        ) as session:
-            tasks = [
-                self.fetch_rss_feed(session, name, config)
-                for name, config in self.news_sources.items()
-            ]
+        # News APIs, fetched alongside the feeds within their daily quotas
+        self.news_apis = {
+            'newsapi': {
+                'key': os.getenv('NEWS_API_KEY'),
+                'url': f"{NEWSAPI_BASE_URL}/everything"
+            },
+            'gnews': {
+                'key': self.gnews_api_key,
+                'url': f"{self.gnews_base_url}/search"
+            }
+        }
+        self.api_quota = ApiQuotaManager(self.db_path, writer=self.writer)
+        self.api_quota.configure('newsapi', NEWSAPI_DAILY_LIMIT, API_BURST)
+        self.api_quota.configure('gnews', GNEWS_DAILY_LIMIT, API_BURST)
+        # Country GNews queries resume where the last cycle's budget ran out
+        self.gnews_rotation = 0
 
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+        # One HTTP session shared by feeds and APIs across runs
+        self.fetcher = FeedFetcher()
 
-            for i, result in enumerate(results):
-                if isinstance(result, Exception):
-                    source_name = list(self.news_sources.keys())[i]
-                    logger.error(f"Failed to fetch {source_name}: {result}")
-                else:
-                    all_articles.extend(result)
+        # Created on first use so importing the module stays cheap
+        self.parse_executor = None
 
-        # Remove duplicates and sort by recency
-        unique_articles = self.deduplicate_articles(all_articles)
-        unique_articles.sort(key=lambda x: x.published_at, reverse=True)
+        # NDJSON snapshot plus delta log, created on first export
+        self._exporter = None
 
-        # Cache articles
-        self.cache_articles(unique_articles)
+    @property
+    def exporter(self):
+        """NDJSON exporter, or None when exporting the single JSON file"""
+        if self._exporter is None and EXPORT_FORMAT == 'ndjson':
+            self._exporter = NewsExporter()
+        return self._exporter
 
-        elapsed = time.time() - start_time
-        logger.info(
-            f"Aggregation completed: {len(unique_articles)} unique articles in {elapsed:.2f}s")
+    @property
+    def session(self):
+        """Shared HTTP session, bound to the running event loop"""
+        return self.fetcher.session()
 
-        return unique_articles
+    async def __aenter__(self):
+        return self
 
-    def deduplicate_articles(self, articles):
-        """Remove duplicate articles based on title similarity"""
-        unique_articles = []
-        seen_titles = set()
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.fetcher.close()
+        self.close()
 
-        for article in articles:
-            # Create a normalized title for comparison
-            normalized_title = re.sub(
-                r'[^\w\s]', '', article.title.lower()).strip()
-
-            # Check for similarity with existing titles
-            is_duplicate = False
-            for seen_title in seen_titles:
-                similarity = self.calculate_similarity(
-                    normalized_title, seen_title)
-                if similarity > 0.8:  # 80% similarity threshold
-                    is_duplicate = True
-                    break
-
-            if not is_duplicate:
-                unique_articles.append(article)
-                seen_titles.add(normalized_title)
-
-        return unique_articles
-
-    def calculate_similarity(self, text1, text2):
-        """Calculate similarity between two texts"""
-        words1 = set(text1.split())
-        words2 = set(text2.split())
+    def init_database(self):
+        """Initialize SQLite database for caching"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
 
-        if not words1 or not words2:
-            return 0
+            # Column schema with a country join table (migrates JSON blobs)
+            init_article_schema(conn)
 
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
+            conn.commit()
+            conn.close()
+            logger.info("Database initialized successfully")
+        except Exception as e:
+            logger.error(f"Database initialization error: {e}")
 
-        return len(intersection) / len(union)
+    def get_parse_executor(self):
+        """Return the feed parsing executor, creating it if needed"""
+        if self.parse_executor is None:
+            self.parse_executor = create_parse_executor()
+        return self.parse_executor
+
+    def close(self):
+        """Stop the feed parsing workers, save the dedup index and flush writes"""
+        if self.parse_executor is not None:
+            self.parse_executor.shutdown(wait=False)
+            self.parse_executor = None
+        self.save_dedup_index()
+        self.writer.close()
+
+    def save_dedup_index(self):
+        """Save the near-duplicate index for the next start"""
+        try:
+            self.dedup_index.save(self.dedup_index_path)
+        except Exception as e:
+            logger.error(f"Error saving dedup index: {e}")
 
     def cache_articles(self, articles):
         """Cache articles in database"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            for article in articles:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO articles (id, data, source, category)
-                    VALUES (?, ?, ?, ?)
-                ''', (
-                    article.id,
-                    json.dumps(article.to_dict()),
-                    article.source,
-                    article.category
-                ))
+            # Queued for the writer thread; committed as executemany batches
+            for sql, rows in article_write_statements(articles):
+                self.writer.submit(sql, rows)
 
-            conn.commit()
-            conn.close()
-            logger.info(f"Cached {len(articles)} articles to database")
+            logger.info(f"Queued {len(articles)} articles for caching")
         except Exception as e:
             logger.error(f"Error caching articles: {e}")
 
-    def get_cached_articles(self, max_age_hours=6):
-        """Get cached articles from database"""
+    def load_known_articles(self, max_age_hours: int = KNOWN_ARTICLE_HOURS) -> Dict[str, NewsArticle]:
+        """Recently cached articles, keyed by id"""
         try:
             conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            rows = query_articles(conn, max_age_hours=max_age_hours)
+            conn.close()
+        except Exception as e:
+            logger.error(f"Error loading known articles: {e}")
+            return {}
+
+        known_articles = {}
+        for data in rows:
+            try:
+                known_articles[data['id']] = NewsArticle.from_dict(data)
+            except Exception as e:
+                # Rebuilt from its feed entry if the link comes back
+                logger.error(f"Skipping unreadable cached article {data.get('id')}: {e}")
+        logger.info(f"Loaded {len(known_articles)} known articles")
+        return known_articles
+
+    def prune_known_state(self, max_age_hours: int = KNOWN_ARTICLE_HOURS):
+        """Forget known articles and fingerprints past their retention"""
+        current_ids = {article.id for articles in self.source_articles.values()
+                       for article in articles}
+        cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
+        self.known_articles = {
+            article_id: article for article_id, article in self.known_articles.items()
+            if article_id in current_ids or article.published_at >= cutoff}
+        self.fingerprints.prune()
+
+    def get_source_articles(self, source_id: str, source_info: Dict) -> Optional[List[NewsArticle]]:
+        """Articles from the last successful fetch of a source, if known"""
+        if source_id in self.article_cache:
+            return self.article_cache[source_id]
+
+        # After a restart, fall back to what was cached in the database
+        try:
+            conn = sqlite3.connect(self.db_path)
+            articles = [NewsArticle.from_dict(data) for data in query_articles(
+                conn, source=source_info['name'], limit=10,
+                order_by='a.created_at DESC')]
+            conn.close()
+        except Exception as e:
+            logger.error(f"Error loading cached articles for {source_id}: {e}")
+            return None
 
-            cutoff_time = datetime.now() - timedelta(hours=max_age_hours)
+        if not articles:
+            return None
+
+        self.article_cache[source_id] = articles
+        return articles
 
-            cursor.execute('''
-                SELECT data FROM articles
-                WHERE created_at > ?
-                ORDER BY created_at DESC
-            ''', (cutoff_time.isoformat(),))
+    def get_cached_articles(self, max_age_hours=6, category=None, country=None,
+                            language=None, limit=None, offset=0, after=None):
+        """Get cached articles from database
 
-            articles = []
-            for row in cursor.fetchall():
-                try:
-                    article_data = json.loads(row[0])
-                    articles.append(article_data)
-                except Exception as e:
-                    logger.error(f"Error parsing cached article: {e}")
+        after is a decoded (published_at, id) cursor; pages continue from it
+        instead of skipping offset rows.
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+
+            # Served from the category/country/created_at indexes
+            articles = query_articles(
+                conn, max_age_hours=max_age_hours, category=category,
+                country=country, language=language, limit=limit, offset=offset,
+                after=after)
 
             conn.close()
             logger.info(f"Retrieved {len(articles)} cached articles")
@@ -492,298 +545,101 @@ class AfricanNewsAggregator:
             logger.error(f"Error retrieving cached articles: {e}")
             return []
 
-    def export_to_json(self, articles, filename="latest_news.json"):
-        """Export articles to JSON file"""
+    def count_cached_articles(self, max_age_hours=6, category=None, country=None,
+                              language=None):
+        """Count cached articles matching the filters"""
         try:
-            output_data = {
-                'timestamp': datetime.now().isoformat(),
-                'total_articles': len(articles),
-                'sources': list(set(article.source for article in articles)),
-                'articles': [article.to_dict() for article in articles]
-            }
-
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(output_data, f, indent=2, ensure_ascii=False)
-
-            logger.info(f"Exported {len(articles)} articles to {filename}")
+            conn = sqlite3.connect(self.db_path)
+            total = count_articles(
+                conn, max_age_hours=max_age_hours, category=category,
+                country=country, language=language)
+            conn.close()
+            return total
         except Exception as e:
-            logger.error(f"Error exporting to JSON: {e}")
-
-    def get_trending_topics(self, articles, top_n=10):
-        """Extract trending topics from articles"""
-        topic_counts = {}
-
-        for article in articles:
-            # Extract keywords from title and description
-            text = f"{article.title} {article.description}".lower()
-            words = re.findall(r'\b[a-z]{4,}\b', text)  # Words with 4+ letters
-
-            # Common stop words to ignore
-            stop_words = {'news', 'said', 'says', 'after', 'will', 'also', 'been', 'have', 'were', 'this', 'that',
-                          'with', 'from', 'they', 'more', 'would', 'could', 'than', 'what', 'when', 'where', 'while', 'about'}
-
-            for word in words:
-                if word not in stop_words and len(word) > 3:
-                    topic_counts[word] = topic_counts.get(word, 0) + 1
-
-        # Sort by frequency and return top topics
-        trending = sorted(topic_counts.items(),
-                          key=lambda x: x[1], reverse=True) return trending[:top_n]
-
-    def generate_article_id(self, title: str, url: str) -> str:
-        """Generate unique ID for article"""
-        content = f"{title}_{url}"
-        return hashlib.md5(content.encode()).hexdigest()
-
-    def extract_image_from_content(self, content: str, entry_links: list) -> Optional[str]:
-        """Extract image URL from article content or links"""
-        # Try to find image in content
-        img_pattern = r'<img[^>]+src=["\']([^"\']+)["\'][^>]*>'
-        img_match = re.search(img_pattern, content, re.IGNORECASE)
-        if img_match:
-            return img_match.group(1)
-
-        # Try to find image in entry links
-        for link in entry_links:
-            if hasattr(link, 'type') and link.type and 'image' in link.type:
-                return link.href
-
-        return None
-
-    def categorize_article(self, title: str, description: str, source_category: str) -> str:
-        """Categorize article based on content"""
-        content = f"{title} {description}".lower()
-
-        # Technology keywords
-        tech_keywords = ['technology', 'tech', 'digital', 'ai', 'artificial intelligence',
-                         'startup', 'fintech', 'mobile', 'internet', 'software', 'app']
-
-        # Business keywords
-        business_keywords = ['business', 'economy', 'economic', 'market', 'trade', 'investment',
-                             'finance', 'bank', 'money', 'gdp', 'inflation', 'currency']
-
-        # Politics keywords
-        politics_keywords = ['politics', 'political', 'government', 'president', 'minister',
-                             'election', 'vote', 'parliament', 'policy', 'law', 'constitution']
-
-        # Sports keywords
-        sports_keywords = ['sports', 'sport', 'football', 'soccer', 'athletics', 'olympics',
-                           'world cup', 'match', 'player', 'team', 'coach', 'tournament']
-
-        # Health keywords
-        health_keywords = ['health', 'medical', 'hospital', 'disease', 'vaccine', 'covid',
-                           'doctor', 'medicine', 'healthcare', 'pandemic', 'virus']
-
-        # Check categories
-        if any(keyword in content for keyword in tech_keywords):
-            return 'technology'
-        elif any(keyword in content for keyword in business_keywords):
-            return 'business'
-        elif any(keyword in content for keyword in politics_keywords):
-            return 'politics'
-        elif any(keyword in content for keyword in sports_keywords):
-            return 'sports'
-        elif any(keyword in content for keyword in health_keywords):
-            return 'health'
-
-        return source_category
-
-
-async def main():
-    """Main aggregation function"""
-    aggregator = AfricanNewsAggregator()
-
-    try:
-        # Try to get fresh articles
-        articles = await aggregator.aggregate_all_sources()
-
-        if not articles:
-            logger.warning("No fresh articles found, using cached articles")
-            cached_data = aggregator.get_cached_articles()
-            if cached_data:
-                # Convert cached data back to NewsArticle objects if needed
-                articles = cached_data
-
-        if articles:
-            # Export to JSON for web app consumption
-            aggregator.export_to_json(articles if isinstance(
-                articles[0], NewsArticle) else [])
-
-            # Print summary
-            if isinstance(articles[0], NewsArticle):
-                trending = aggregator.get_trending_topics(articles)
-                logger.info("Top trending topics:")
-                for topic, count in trending[:5]:
-                    logger.info(f"  {topic}: {count} mentions")
+            logger.error(f"Error counting cached articles: {e}")
+            return 0
 
+    def search_cached_articles(self, text, category=None, country=None,
+                               language=None, limit=20, offset=0):
+        """Full-text search over every cached article, best match first"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            articles = search_articles(
+                conn, text, category=category, country=country,
+                language=language, limit=limit, offset=offset)
+            conn.close()
             return articles
-        else:
-            logger.error("No articles available")
+        except Exception as e:
+            logger.error(f"Error searching cached articles: {e}")
             return []
 
-    except Exception as e:
-        logger.error(f"Aggregation failed: {e}")
-        return []
-
-
-def run_scheduled_aggregation():
-    """Run aggregation on schedule"""
-    logger.info("Starting scheduled aggregation...")
-
-    # Schedule aggregation every 30 minutes
-    schedule.every(30).minutes.do(lambda: asyncio.run(main()))
-
-    # Initial run
-    asyncio.run(main())
-
-    # Keep running scheduled tasks
-    while True:
-        schedule.run_pending()
-        time.sleep(60)  # Check every minute
+    def count_search_results(self, text, category=None, country=None,
+                             language=None):
+        """Count cached articles matching a full-text search"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            total = count_search_results(
+                conn, text, category=category, country=country,
+                language=language)
+            conn.close()
+            return total
+        except Exception as e:
+            logger.error(f"Error counting search results: {e}")
+            return 0
 
+    def get_trending_topics(self, articles, top_n=10):
+        """Most mentioned topics of the last day as (topic, mentions) pairs
 
-if __name__ == "__main__":
-    import sys
+        Articles already counted are skipped, so passing the full list
+        again only counts the new ones.
+        """
+        self.trending.add(articles)
+        return self.trending.top_pairs(limit=top_n)
 
-    if len(sys.argv) > 1 and sys.argv[1] == "--daemon":
-        run_scheduled_aggregation()
-    else:
-        # Run once
-        articles = asyncio.run(main())
-        print(f"Fetched {len(articles)} articles")
+    def generate_article_id(self, title: str, url: str) -> str:
         """Generate unique ID for article"""
         content = f"{title}_{url}"
         return hashlib.md5(content.encode()).hexdigest()
 
     def extract_image_from_content(self, content: str, entry_links: list) -> Optional[str]:
         """Extract image URL from article content or links"""
-        # Try to find image in content
-        img_pattern = r'<img[^>]+src=["\']([^"\']+)["\'][^>]*>'
-        img_match = re.search(img_pattern, content, re.IGNORECASE)
-        if img_match:
-            return img_match.group(1)
-
-        # Try to find image in entry links
-        for link in entry_links:
-            if hasattr(link, 'type') and link.type and 'image' in link.type:
-                return link.href
-
-        return None
+        return extract_image_from_content(content, entry_links)
 
     def categorize_article(self, title: str, description: str, source_category: str) -> str:
         """Categorize article based on content"""
-        content = f"{title} {description}".lower()
-
-        # Technology keywords
-        tech_keywords = ['technology', 'tech', 'digital', 'ai', 'artificial intelligence',
-                         'startup', 'fintech', 'mobile', 'internet', 'software', 'app']
-
-        # Business keywords
-        business_keywords = ['business', 'economy', 'economic', 'market', 'trade', 'investment',
-                             'finance', 'bank', 'money', 'gdp', 'inflation', 'currency']
-
-        # Politics keywords
-        politics_keywords = ['politics', 'political', 'government', 'president', 'minister',
-                             'election', 'vote', 'parliament', 'policy', 'law', 'constitution']
-
-        # Sports keywords
-        sports_keywords = ['sports', 'sport', 'football', 'soccer', 'athletics', 'olympics',
-                           'world cup', 'match', 'player', 'team', 'coach', 'tournament']
-
-        # Health keywords
-        health_keywords = ['health', 'medical', 'hospital', 'disease', 'vaccine', 'covid',
-                           'doctor', 'medicine', 'healthcare', 'pandemic', 'virus']
-
-        # Check categories
-        if any(keyword in content for keyword in tech_keywords):
-            return 'technology'
-        elif any(keyword in content for keyword in business_keywords):
-            return 'business'
-        elif any(keyword in content for keyword in politics_keywords):
-            return 'politics'
-        elif any(keyword in content for keyword in sports_keywords):
-            return 'sports'
-        elif any(keyword in content for keyword in health_keywords):
-            return 'health'
-
-        return source_category
+        category = self.keyword_matcher.category_of(f"{title} {description}")
+        return category or source_category
 
     def determine_country_focus(self, title: str, description: str, source_country: str) -> List[str]:
         """Determine which countries this article focuses on"""
-        content = f"{title} {description}".lower()
-        countries = []
-
-        # African countries mapping
-        country_keywords = {
-            'nigeria': ['nigeria', 'nigerian', 'lagos', 'abuja', 'kano'],
-            'kenya': ['kenya', 'kenyan', 'nairobi', 'mombasa', 'kisumu'],
-            'south-africa': ['south africa', 'south african', 'johannesburg', 'cape town', 'durban', 'pretoria'],
-            'ghana': ['ghana', 'ghanaian', 'accra', 'kumasi', 'tamale'],
-            'ethiopia': ['ethiopia', 'ethiopian', 'addis ababa', 'dire dawa'],
-            'uganda': ['uganda', 'ugandan', 'kampala', 'entebbe'],
-            'tanzania': ['tanzania', 'tanzanian', 'dar es salaam', 'dodoma'],
-            'egypt': ['egypt', 'egyptian', 'cairo', 'alexandria'],
-            'morocco': ['morocco', 'moroccan', 'casablanca', 'rabat', 'marrakech'],
-            'tunisia': ['tunisia', 'tunisian', 'tunis'],
-            'algeria': ['algeria', 'algerian', 'algiers'],
-            'zimbabwe': ['zimbabwe', 'zimbabwean', 'harare', 'bulawayo'],
-            'zambia': ['zambia', 'zambian', 'lusaka'],
-            'botswana': ['botswana', 'gaborone'],
-            'rwanda': ['rwanda', 'rwandan', 'kigali'],
-            'senegal': ['senegal', 'senegalese', 'dakar'],
-            'ivory-coast': ['ivory coast', 'cote d\'ivoire', 'abidjan', 'yamoussoukro'],
-            'cameroon': ['cameroon', 'cameroonian', 'yaounde', 'douala'],
-            'mali': ['mali', 'malian', 'bamako'],
-            'burkina-faso': ['burkina faso', 'ouagadougou'],
-            'niger': ['niger', 'niamey'],
-            'chad': ['chad', 'chadian', 'n\'djamena'],
-            'sudan': ['sudan', 'sudanese', 'khartoum'],
-            'south-sudan': ['south sudan', 'juba'],
-            'somalia': ['somalia', 'somali', 'mogadishu'],
-            'djibouti': ['djibouti'],
-            'eritrea': ['eritrea', 'eritrean', 'asmara'],
-            'libya': ['libya', 'libyan', 'tripoli', 'benghazi'],
-            'madagascar': ['madagascar', 'antananarivo'],
-            'mauritius': ['mauritius', 'port louis'],
-            'seychelles': ['seychelles', 'victoria'],
-            'comoros': ['comoros', 'moroni'],
-            'cape-verde': ['cape verde', 'praia'],
-            'sao-tome': ['sao tome', 'principe'],
-            'equatorial-guinea': ['equatorial guinea', 'malabo'],
-            'gabon': ['gabon', 'libreville'],
-            'republic-congo': ['republic of congo', 'brazzaville'],
-            'drc': ['democratic republic', 'drc', 'congo', 'kinshasa'],
-            'car': ['central african republic', 'bangui'],
-            'angola': ['angola', 'angolan', 'luanda'],
-            'namibia': ['namibia', 'namibian', 'windhoek'],
-            'lesotho': ['lesotho', 'maseru'],
-            'swaziland': ['swaziland', 'eswatini', 'mbabane'],
-            'malawi': ['malawi', 'malawian', 'lilongwe', 'blantyre'],
-            'mozambique': ['mozambique', 'mozambican', 'maputo'],
-            'liberia': ['liberia', 'liberian', 'monrovia'],
-            'sierra-leone': ['sierra leone', 'freetown'],
-            'guinea': ['guinea', 'conakry'],
-            'guinea-bissau': ['guinea-bissau', 'bissau'],
-            'gambia': ['gambia', 'banjul'],
-            'benin': ['benin', 'porto-novo', 'cotonou'],
-            'togo': ['togo', 'lome']
-        }
+        countries = self.keyword_matcher.countries_in(f"{title} {description}")
+        return BatchEnricher.country_focus(countries, source_country)
 
-        # Check for country mentions
-        for country, keywords in country_keywords.items():
-            if any(keyword in content for keyword in keywords):
-                countries.append(country)
+    def classify_article(self, title: str, description: str, source_category: str,
+                         source_country: str) -> Tuple[str, List[str]]:
+        """Category and country focus from a single keyword scan"""
+        countries, category = self.keyword_matcher.match(f"{title} {description}")
+        return (category or source_category,
+                BatchEnricher.country_focus(countries, source_country))
 
-        # If no specific countries found, use source country
-        if not countries and source_country != 'international':
-            countries.append(source_country)
+    def build_articles(self, entries: List[Dict]) -> List[NewsArticle]:
+        """Enrich raw entries as one batch and create their articles
 
-        # If still no countries and it's international, add major African countries
-        if not countries and source_country == 'international':
-            countries = ['nigeria', 'kenya',
-                         'south-africa', 'ghana', 'ethiopia']
-
-        return countries
+        A bad entry is logged and left out; the rest of the batch is kept.
+        """
+        articles = []
+        for entry, derived in zip(entries, self.enricher.enrich(entries)):
+            if derived is None:
+                continue
+            try:
+                fields = {key: value for key, value in entry.items()
+                          if key not in ('source_category', 'source_country')}
+                articles.append(NewsArticle(
+                    id=self.generate_article_id(entry['title'], entry['url']),
+                    **fields, **derived))
+            except Exception as e:
+                logger.error(f"Error building article from {entry.get('source')}: {e}")
+        return articles
 
     def calculate_engagement_score(self, title: str, description: str, is_breaking: bool) -> float:
         """Calculate engagement score based on content analysis"""
@@ -794,11 +650,8 @@ if __name__ == "__main__":
             score += 2.0
 
         # Check for engagement indicators
-        engagement_words = ['breaking', 'urgent', 'exclusive', 'major', 'significant',
-                            'important', 'crisis', 'emergency', 'historic', 'unprecedented']
-
         content = f"{title} {description}".lower()
-        for word in engagement_words:
+        for word in ENGAGEMENT_WORDS:
             if word in content:
                 score += 0.5
 
@@ -812,104 +665,82 @@ if __name__ == "__main__":
     def is_breaking_news(self, title: str, description: str) -> bool:
         """Determine if article is breaking news"""
         content = f"{title} {description}".lower()
-        breaking_indicators = ['breaking', 'urgent', 'just in', 'developing', 'live',
-                               'emergency', 'crisis', 'attack', 'explosion', 'death']
-
-        return any(indicator in content for indicator in breaking_indicators)
-
-    async def fetch_rss_feed(self, source_id: str, source_info: Dict) -> List[NewsArticle]:
-        """Fetch and parse RSS feed from a source"""
+        return any(indicator in content for indicator in BREAKING_INDICATORS)
+
+    def find_known_article(self, title: str, url: str):
+        """Check the fingerprint store before an entry is enriched
+
+        Returns (skip, article): skip is True for stories processed by an
+        earlier run, and article is the enriched copy to reuse for a known
+        link. A known link with no copy held, as after a restart, is rebuilt.
+        """
+        match = self.fingerprints.lookup(url, title)
+        if match is None:
+            return False, None
+
+        match_type, article_id = match
+        if match_type == MATCH_URL and article_id == self.generate_article_id(title, url):
+            known_article = self.known_articles.get(article_id)
+            if known_article is None:
+                return False, None
+            return True, known_article
+        if match_type == MATCH_TITLE:
+            return True, None
+
+        # Same link with an edited headline is treated as new
+        return False, None
+
+    async def fetch_rss_feed(self, source_id: str, source_info: Dict) -> Optional[List[NewsArticle]]:
+        """Fetch and parse RSS feed from a source (None on failure)"""
         articles = []
 
         try:
             logger.info(f"Fetching RSS feed from {source_info['name']}")
-
-            async with self.session.get(source_info['rss_url']) as response:
-                if response.status == 200:
-                    content = await response.text()
-                    feed = feedparser.parse(content)
-
-                    # Limit to 10 articles per source
-                    for entry in feed.entries[:10]:
-                        try:
-                            # Extract basic info
-                            title = entry.get('title', '').strip()
-                            description = entry.get('description', '').strip()
-                            url = entry.get('link', '')
-
-                            if not title or not url:
-                                continue
-
-                            # Parse published date
-                            published_at = datetime.now()
-                            if hasattr(entry, 'published_parsed') and entry.published_parsed:
-                                try:
-                                    published_at = datetime(
-                                        *entry.published_parsed[:6])
-                                except:
-                                    pass
-
-                            # Extract thumbnail
-                            thumbnail = None
-                            if hasattr(entry, 'media_thumbnail') and entry.media_thumbnail:
-                                thumbnail = entry.media_thumbnail[0]['url']
-                            elif hasattr(entry, 'enclosures') and entry.enclosures:
-                                for enclosure in entry.enclosures:
-                                    if 'image' in enclosure.get('type', ''):
-                                        thumbnail = enclosure.get('href')
-                                        break
-
-                            if not thumbnail:
-                                thumbnail = self.extract_image_from_content(
-                                    entry.get('content', [{}])[0].get(
-                                        'value', '') if entry.get('content') else '',
-                                    entry.get('links', [])
-                                )
-
-                            # Determine article properties
-                            category = self.categorize_article(
-                                title, description, source_info['category'])
-                            country_focus = self.determine_country_focus(
-                                title, description, source_info['country'])
-                            is_breaking = self.is_breaking_news(
-                                title, description)
-                            engagement_score = self.calculate_engagement_score(
-                                title, description, is_breaking)
-
-                            # Create article
-                            article = NewsArticle(
-                                id=self.generate_article_id(title, url),
-                                title=title,
-                                description=description,
-                                content=entry.get('content', [{}])[0].get(
-                                    'value', description) if entry.get('content') else description,
-                                url=url,
-                                thumbnail=thumbnail,
-                                source=source_info['name'],
-                                category=category,
-                                country_focus=country_focus,
-                                language=source_info['language'],
-                                published_at=published_at,
-                                is_breaking=is_breaking,
-                                is_trending=engagement_score > 7.0,
-                                engagement_score=engagement_score,
-                                credibility_score=source_info['credibility']
-                            )
-
-                            articles.append(article)
-
-                        except Exception as e:
-                            logger.error(
-                                f"Error processing entry from {source_info['name']}: {e}")
-                            continue
-
-                else:
-                    logger.warning(
-                        f"Failed to fetch {source_info['name']}: HTTP {response.status}")
+            previous_articles = self.get_source_articles(source_id, source_info)
+
+            # Only ask for a conditional response if we can serve the old copy;
+            # slow and probing sources get a short timeout
+            result = await self.fetcher.fetch_feed(
+                source_id, source_info['rss_url'], self.feed_validators,
+                conditional=previous_articles is not None,
+                health=self.source_health)
+            if result is None:
+                return None
+            changed, content = result
+            if not changed:
+                return previous_articles
+
+            # Parse in the executor so other downloads keep progressing
+            items = await asyncio.get_running_loop().run_in_executor(
+                self.get_parse_executor(), parse_feed_items,
+                content, source_info['name'])
+
+            entries = []
+            for item in items:
+                skip, known_article = self.find_known_article(
+                    item['title'], item['url'])
+                if skip:
+                    if known_article is not None:
+                        articles.append(known_article)
+                    continue
+
+                entries.append({
+                    **item,
+                    'source': source_info['name'],
+                    'language': source_info['language'],
+                    'credibility_score': source_info['credibility'],
+                    'source_category': source_info['category'],
+                    'source_country': source_info['country']
+                })
+
+            # Score every new entry of the feed in one batch
+            articles.extend(self.build_articles(entries))
+            self.article_cache[source_id] = articles
 
         except Exception as e:
             logger.error(
                 f"Error fetching RSS feed from {source_info['name']}: {e}")
+            return None
 
         return articles
 
@@ -921,9 +752,13 @@ if __name__ == "__main__":
             logger.warning("NewsAPI key not provided")
             return articles
 
+        if not self.api_quota.acquire('newsapi'):
+            logger.info("NewsAPI quota spent; skipping this cycle")
+            return articles
+
         try:
             params = {
-                'q': 'Africa OR Nigeria OR Kenya OR "South Africa" OR Ghana OR Ethiopia',
+                'q': AFRICA_QUERY,
                 'sortBy': 'publishedAt',
                 'language': 'en',
                 'pageSize': 50,
@@ -933,6 +768,7 @@ if __name__ == "__main__":
             async with self.session.get(self.news_apis['newsapi']['url'], params=params) as response:
                 if response.status == 200:
                     data = await response.json()
+                    entries = []
 
                     for item in data.get('articles', []):
                         try:
@@ -943,59 +779,66 @@ if __name__ == "__main__":
                             if not title or not url or title == '[Removed]':
                                 continue
 
-                            # Parse published date
-                            published_at = datetime.now()
-                            if item.get('publishedAt'):
-                                try:
-                                    published_at = datetime.fromisoformat(
-                                        item['publishedAt'].replace(
-                                            'Z', '+00:00')
-                                    )
-                                except:
-                                    pass
-
-                            # Determine article properties
-                            category = self.categorize_article(
-                                title, description, 'general')
-                            country_focus = self.determine_country_focus(
-                                title, description, 'international')
-                            is_breaking = self.is_breaking_news(
-                                title, description)
-                            engagement_score = self.calculate_engagement_score(
-                                title, description, is_breaking)
-
-                            article = NewsArticle(
-                                id=self.generate_article_id(title, url),
-                                title=title,
-                                description=description,
-                                content=item.get('content', description),
-                                url=url,
-                                thumbnail=item.get('urlToImage'),
-                                source=item.get('source', {}).get(
+                            skip, known_article = self.find_known_article(
+                                title, url)
+                            if skip:
+                                if known_article is not None:
+                                    articles.append(known_article)
+                                continue
+
+                            published_at = parse_api_timestamp(item.get('publishedAt'))
+
+                            entries.append({
+                                'title': title,
+                                'description': description,
+                                'content': item.get('content', description),
+                                'url': url,
+                                'thumbnail': item.get('urlToImage'),
+                                'source': item.get('source', {}).get(
                                     'name', 'NewsAPI'),
-                                category=category,
-                                country_focus=country_focus,
-                                language='en',
-                                published_at=published_at,
-                                is_breaking=is_breaking,
-                                is_trending=engagement_score > 7.0,
-                                engagement_score=engagement_score,
-                                credibility_score=7.0
-                            )
-
-                            articles.append(article)
+                                'language': 'en',
+                                'published_at': published_at,
+                                'credibility_score': 7.0,
+                                'source_category': 'general',
+                                'source_country': 'international'
+                            })
 
                         except Exception as e:
                             logger.error(
                                 f"Error processing NewsAPI article: {e}")
                             continue
 
+                    articles.extend(self.build_articles(entries))
+
         except Exception as e:
             logger.error(f"Error fetching from NewsAPI: {e}")
 
         return articles
 
-    async def fetch_gnews_api(self) -> List[NewsArticle]:
+    def plan_gnews_queries(self) -> List[Tuple[str, str]]:
+        """(query, source country) pairs this cycle's GNews quota allows
+
+        The all-Africa query goes first, then one query per country; the
+        countries rotate so a small budget still reaches each of them over
+        successive cycles.
+        """
+        if not self.news_apis['gnews']['key']:
+            logger.warning("GNews API key not provided")
+            return []
+
+        countries = list(self.african_countries)
+        start = self.gnews_rotation % len(countries)
+        queries = [(AFRICA_QUERY, 'international')] + [
+            (f'"{country.replace("-", " ").title()}"', country)
+            for country in countries[start:] + countries[:start]
+        ]
+
+        granted = self.api_quota.acquire('gnews', len(queries))
+        self.gnews_rotation = start + max(granted - 1, 0)
+        return queries[:granted]
+
+    async def fetch_gnews_api(self, query: str = AFRICA_QUERY,
+                              source_country: str = 'international') -> List[NewsArticle]:
         """Fetch news from GNews API"""
         articles = []
 
@@ -1005,7 +848,7 @@ if __name__ == "__main__":
 
         try:
             params = {
-                'q': 'Africa OR Nigeria OR Kenya OR "South Africa" OR Ghana OR Ethiopia',
+                'q': query,
                 'sort': 'publishedAt',
                 'lang': 'en',
                 'limit': 50,
@@ -1015,6 +858,7 @@ if __name__ == "__main__":
             async with self.session.get(self.news_apis['gnews']['url'], params=params) as response:
                 if response.status == 200:
                     data = await response.json()
+                    entries = []
 
                     for item in data.get('articles', []):
                         try:
@@ -1025,212 +869,324 @@ if __name__ == "__main__":
                             if not title or not url:
                                 continue
 
-                            # Parse published date
-                            published_at = datetime.now()
-                            if item.get('publishedAt'):
-                                try:
-                                    published_at = datetime.fromisoformat(
-                                        item['publishedAt'].replace(
-                                            'Z', '+00:00')
-                                    )
-                                except:
-                                    pass
+                            skip, known_article = self.find_known_article(
+                                title, url)
+                            if skip:
+                                if known_article is not None:
+                                    articles.append(known_article)
+                                continue
+
+                            published_at = parse_api_timestamp(item.get('publishedAt'))
 
                             # Extract thumbnail from image
                             thumbnail = item.get('image', None)
 
-                            # Determine article properties
-                            category = self.categorize_article(
-                                title, description, 'general')
-                            country_focus = self.determine_country_focus(
-                                title, description, 'international')
-                            is_breaking = self.is_breaking_news(
-                                title, description)
-                            engagement_score = self.calculate_engagement_score(
-                                title, description, is_breaking)
-
-                            article = NewsArticle(
-                                id=self.generate_article_id(title, url),
-                                title=title,
-                                description=description,
-                                content=item.get('content', description),
-                                url=url,
-                                thumbnail=thumbnail,
-                                source=item.get('source', {}).get(
+                            entries.append({
+                                'title': title,
+                                'description': description,
+                                'content': item.get('content', description),
+                                'url': url,
+                                'thumbnail': thumbnail,
+                                'source': item.get('source', {}).get(
                                     'name', 'GNews'),
-                                category=category,
-                                country_focus=country_focus,
-                                language='en',
-                                published_at=published_at,
-                                is_breaking=is_breaking,
-                                is_trending=engagement_score > 7.0,
-                                engagement_score=engagement_score,
-                                credibility_score=7.0
-                            )
-
-                            articles.append(article)
+                                'language': 'en',
+                                'published_at': published_at,
+                                'credibility_score': 7.0,
+                                'source_category': 'general',
+                                'source_country': source_country
+                            })
 
                         except Exception as e:
                             logger.error(
                                 f"Error processing GNews article: {e}")
                             continue
 
+                    articles.extend(self.build_articles(entries))
+
         except Exception as e:
             logger.error(f"Error fetching from GNews API: {e}")
 
         return articles
 
-    async def aggregate_all_news(self) -> List[NewsArticle]:
-        """Aggregate news from all sources"""
-        all_articles = []
-
-        # Fetch from RSS feeds
-        tasks = []
-        for source_id, source_info in self.news_sources.items():
-            task = self.fetch_rss_feed(source_id, source_info)
-            tasks.append(task)
-
-        rss_results = await asyncio.gather(*tasks, return_exceptions=True)
-
-        for result in rss_results:
-            if isinstance(result, list):
-                all_articles.extend(result)
+    async def aggregate_due_sources(self, on_articles=None) -> List[NewsArticle]:
+        """Poll the feeds whose adaptive schedule says they are due"""
+        return await self.aggregate_all_news(
+            self.poll_scheduler.due(), on_articles=on_articles)
+
+    async def aggregate_all_news(self, source_ids=None, on_articles=None) -> List[NewsArticle]:
+        """Aggregate news from the given feeds (all by default) and the APIs
+
+        Each feed and API is deduplicated and handed to on_articles as soon
+        as it arrives, so the slowest source no longer delays the others.
+        Returns every source's latest articles, so feeds that were not
+        polled this time keep contributing what they had.
+        """
+        if source_ids is None:
+            source_ids = list(self.news_sources)
+
+        # Sources with an open circuit wait for their next probe
+        now = time.time()
+        allowed = []
+        for source_id in source_ids:
+            if self.source_health.allow(source_id, now):
+                allowed.append(source_id)
             else:
-                logger.error(f"RSS fetch failed: {result}")
-
-        # Fetch from NewsAPI as fallback
-        try:
-            api_articles = await self.fetch_news_api()
-            all_articles.extend(api_articles)
-        except Exception as e:
-            logger.error(f"NewsAPI fetch failed: {e}")
+                self.poll_scheduler.defer(
+                    source_id, self.source_health.retry_at(source_id))
+        if len(allowed) < len(source_ids):
+            logger.info(f"Skipping {len(source_ids) - len(allowed)} sources "
+                        f"with an open circuit")
+
+        fetches = {
+            asyncio.ensure_future(self.fetch_rss_feed(
+                source_id, self.news_sources[source_id])): source_id
+            for source_id in allowed
+        }
+        # NewsAPI as fallback, GNews API as additional source, with one
+        # GNews query per country the quota allows
+        fetches[asyncio.ensure_future(self.fetch_news_api())] = 'newsapi'
+        for query, source_country in self.plan_gnews_queries():
+            task = asyncio.ensure_future(self.fetch_gnews_api(query, source_country))
+            fetches[task] = f"gnews:{source_country}"
+
+        seen_ids = set()
+        pending = set(fetches)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                source_key = fetches[task]
+                if task.exception() is not None:
+                    logger.error(f"{source_key} fetch failed: {task.exception()}")
+                    result = None
+                else:
+                    result = task.result()
 
-        # Fetch from GNews API as additional source
-        try:
-            gnews_articles = await self.fetch_gnews_api()
-            all_articles.extend(gnews_articles)
-        except Exception as e:
-            logger.error(f"GNews API fetch failed: {e}")
+                if result is None:
+                    self.record_source_failure(source_key)
+                    continue
 
-        # Remove duplicates based on title similarity
-        unique_articles = self.remove_duplicates(all_articles)
+                fresh = self.process_source_articles(source_key, result, seen_ids)
+                if on_articles is not None and fresh:
+                    try:
+                        on_articles(fresh)
+                    except Exception as e:
+                        logger.error(f"Error publishing {source_key}: {e}")
 
-        # Sort by engagement score and recency
-        unique_articles.sort(
-            key=lambda x: (x.engagement_score, x.published_at),
-            reverse=True
-        )
+        unique_articles = self.current_articles()
 
         logger.info(
-            f"Aggregated {len(unique_articles)} unique articles from {len(self.news_sources)} sources")
+            f"Aggregated {len(unique_articles)} unique articles after polling "
+            f"{len(allowed)} of {len(self.news_sources)} sources; next poll in "
+            f"{self.poll_scheduler.seconds_until_next():.0f}s")
+
+        self.fingerprints.flush()
+        self.feed_validators.flush()
+        self.source_health.flush()
+        self.poll_scheduler.flush()
+        self.api_quota.flush()
+        # Known copies accumulate across passes until they age out
+        self.known_articles.update(
+            (article.id, article) for article in unique_articles)
+        self.prune_known_state()
 
         self.articles_cache = unique_articles
         return unique_articles
 
+    def record_source_failure(self, source_key: str):
+        """Back off from a feed whose fetch failed"""
+        self.poll_scheduler.record_failure(source_key)
+        self.poll_scheduler.defer(
+            source_key, self.source_health.retry_at(source_key))
+
+    def process_source_articles(self, source_key: str, articles: List[NewsArticle],
+                                seen_ids: set) -> List[NewsArticle]:
+        """Dedup and cache one feed or API fetch; returns the articles it adds"""
+        # Publish rates are learned from entries no earlier run had seen
+        new_count = sum(1 for article in articles
+                        if self.fingerprints.lookup(article.url, article.title) is None)
+        self.poll_scheduler.record_success(
+            source_key, new_count,
+            saturated=(len(articles) >= MAX_FEED_ENTRIES and
+                       new_count == len(articles)))
+
+        # Remove duplicates based on title similarity
+        fresh = [article for article in self.remove_duplicates(articles)
+                 if article.id not in seen_ids]
+        seen_ids.update(article.id for article in fresh)
+        self.cache_articles(fresh)
+
+        # Remember processed stories so later sources and runs can skip
+        # enriching them
+        self.fingerprints.add_articles(fresh)
+
+        self.source_articles[source_key] = fresh
+        return fresh
+
+    def current_articles(self) -> List[NewsArticle]:
+        """Latest articles of every source, by engagement score and recency"""
+        combined = {}
+        for articles in self.source_articles.values():
+            for article in articles:
+                combined.setdefault(article.id, article)
+        return sorted(combined.values(),
+                      key=lambda x: (x.engagement_score, x.published_at),
+                      reverse=True)
+
     def remove_duplicates(self, articles: List[NewsArticle]) -> List[NewsArticle]:
         """Remove duplicate articles based on title similarity"""
         unique_articles = []
-        seen_titles = set()
+        seen_ids = set()
 
         for article in articles:
-            # Create a normalized title for comparison
-            normalized_title = re.sub(
-                r'[^\w\s]', '', article.title.lower()).strip()
-            normalized_title = ' '.join(normalized_title.split())
-
-            # Check if we've seen a similar title
-            is_duplicate = False
-            for seen_title in seen_titles:
-                # Calculate similarity (simple word overlap)
-                words1 = set(normalized_title.split())
-                words2 = set(seen_title.split())
-
-                if len(words1) > 0 and len(words2) > 0:
-                    overlap = len(words1.intersection(words2))
-                    similarity = overlap / max(len(words1), len(words2))
-
-                    if similarity > 0.8:  # 80% similarity threshold
-                        is_duplicate = True
-                        break
+            if article.id in seen_ids:
+                continue
 
-            if not is_duplicate:
+            # Word overlap against candidates from the LSH buckets only
+            # (80% threshold); a re-fetched article is not its own duplicate
+            duplicate_of = self.dedup_index.check_and_add(
+                article.id, article.title)
+
+            if duplicate_of is None:
                 unique_articles.append(article)
-                seen_titles.add(normalized_title)
+                seen_ids.add(article.id)
 
         return unique_articles
 
     def export_to_json(self, articles: List[NewsArticle], filename: str = None) -> str:
-        """Export articles to JSON format"""
+        """Export articles to JSON format
+
+        Without a filename this writes the shared export the API server
+        follows: the NDJSON snapshot and delta log, or latest_news.json in
+        JSON export mode.
+        """
         if filename is None:
-            filename = f"african_news_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            if self.exporter is not None:
+                self.exporter.export(articles, force=True)
+                return self.exporter.snapshot_path
+            filename = JSON_EXPORT_FILE
+
+        write_json(articles, filename)
+        return filename
+
+    def publish_articles(self, articles: List[NewsArticle]):
+        """Export articles that just arrived from their sources
+
+        In NDJSON mode they are appended to the delta log; otherwise
+        latest_news.json is rewritten with every source's latest articles.
+        """
+        try:
+            if self.exporter is None:
+                self.export_to_json(self.current_articles())
+                return
+            logged = self.exporter.append(articles)
+            logger.info(f"Logged {logged} new articles to the delta log")
+        except Exception as e:
+            logger.error(f"Error publishing articles: {e}")
 
-        articles_data = []
+
+async def aggregate_and_report(aggregator: AfricanNewsAggregator) -> List[NewsArticle]:
+    """Aggregate once, export the articles and print a summary"""
+    # Export shortly after each source arrives, not once at the end
+    publisher = StagedPublisher(aggregator.publish_articles)
+    try:
+        articles = await aggregator.aggregate_all_news(on_articles=publisher.stage)
+    finally:
+        publisher.flush()
+
+    if articles:
+        filename = aggregator.export_to_json(articles)
+        print(f"Exported {len(articles)} articles to {filename}")
+
+        # Print summary
+        print(f"\nSummary:")
+        print(f"Total articles: {len(articles)}")
+        print(
+            f"Breaking news: {len([a for a in articles if a.is_breaking])}")
+        print(f"Trending: {len([a for a in articles if a.is_trending])}")
+
+        # Category breakdown
+        categories = {}
         for article in articles:
-            articles_data.append({
-                'id': article.id,
-                'title': article.title,
-                'description': article.description,
-                'content': article.content,
-                'url': article.url,
-                'thumbnail': article.thumbnail,
-                'source': article.source,
-                'category': article.category,
-                'country_focus': article.country_focus,
-                'language': article.language,
-                'published_at': article.published_at.isoformat(),
-                'is_breaking': article.is_breaking,
-                'is_trending': article.is_trending,
-                'engagement_score': article.engagement_score,
-                'credibility_score': article.credibility_score
-            })
+            categories[article.category] = categories.get(
+                article.category, 0) + 1
 
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump({
-                'timestamp': datetime.now().isoformat(),
-                'total_articles': len(articles_data),
-                'articles': articles_data
-            }, f, indent=2, ensure_ascii=False)
+        print(f"\nCategories:")
+        for category, count in sorted(categories.items()):
+            print(f"  {category}: {count}")
 
-        return filename
+        # Country breakdown
+        countries = {}
+        for article in articles:
+            for country in article.country_focus:
+                countries[country] = countries.get(country, 0) + 1
+
+        print(f"\nTop countries:")
+        for country, count in sorted(countries.items(), key=lambda x: x[1], reverse=True)[:10]:
+            print(f"  {country}: {count}")
+    else:
+        print("No articles fetched")
+
+    return articles
 
 
 async def main():
     """Main function for testing the aggregator"""
     async with AfricanNewsAggregator() as aggregator:
-        articles = await aggregator.aggregate_all_news()
+        await aggregate_and_report(aggregator)
 
-        if articles:
-            filename = aggregator.export_to_json(articles)
-            print(f"Exported {len(articles)} articles to {filename}")
 
-            # Print summary
-            print(f"\nSummary:")
-            print(f"Total articles: {len(articles)}")
-            print(
-                f"Breaking news: {len([a for a in articles if a.is_breaking])}")
-            print(f"Trending: {len([a for a in articles if a.is_trending])}")
+async def poll_sources_forever():
+    """Poll each feed when its adaptive schedule says it is due
 
-            # Category breakdown
-            categories = {}
-            for article in articles:
-                categories[article.category] = categories.get(
-                    article.category, 0) + 1
+    One long-lived aggregator keeps the HTTP session, parse workers,
+    database writer and in-memory state across polls, and is closed once
+    on shutdown.
+    """
+    # Stop on SIGTERM the way Ctrl+C does, so everything is closed
+    try:
+        asyncio.get_running_loop().add_signal_handler(
+            signal.SIGTERM, asyncio.current_task().cancel)
+    except (NotImplementedError, RuntimeError):
+        pass
 
-            print(f"\nCategories:")
-            for category, count in sorted(categories.items()):
-                print(f"  {category}: {count}")
+    async with AfricanNewsAggregator() as aggregator:
+        while True:
+            # Export shortly after each source arrives, not once at the end
+            publisher = StagedPublisher(aggregator.publish_articles)
+            try:
+                # Every feed is due on the first pass
+                await aggregator.aggregate_due_sources(on_articles=publisher.stage)
+            except Exception as e:
+                logger.error(f"Aggregation failed: {e}")
+            finally:
+                publisher.flush()
+
+            # Deltas carry the new articles; the full snapshot is rewritten
+            # only when due
+            if aggregator.exporter is not None and aggregator.exporter.snapshot_due():
+                aggregator.export_to_json(aggregator.current_articles())
+
+            delay = aggregator.poll_scheduler.seconds_until_next()
+            logger.info(f"Next source due in {delay:.0f}s")
+            await asyncio.sleep(max(delay, 1))
 
-            # Country breakdown
-            countries = {}
-            for article in articles:
-                for country in article.country_focus:
-                    countries[country] = countries.get(country, 0) + 1
 
-            print(f"\nTop countries:")
-            for country, count in sorted(countries.items(), key=lambda x: x[1], reverse=True)[:10]:
-                print(f"  {country}: {count}")
-        else:
-            print("No articles fetched")
+def run_scheduled_aggregation():
+    """Run aggregation on schedule"""
+    logger.info("Starting scheduled aggregation...")
+    try:
+        asyncio.run(poll_sources_forever())
+    except (KeyboardInterrupt, asyncio.CancelledError):
+        logger.info("Scheduled aggregation stopped")
+
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == "--daemon":
+        run_scheduled_aggregation()
+    else:
+        # Run once
+        asyncio.run(main())
@@ -15,14 +15,26 @@ from datetime import datetime, timedelta
 import hashlib
 import re
 from typing import List, Dict, Optional
-from dataclasses import dataclass, asdict
 from urllib.parse import urljoin, urlparse
 import os
 from dotenv import load_dotenv
 import time
 from concurrent.futures import ThreadPoolExecutor
 import sqlite3
-import schedule
+from dedup_index import DEDUP_INDEX_FILE, NearDuplicateIndex
+from fingerprint_store import ArticleFingerprintStore, MATCH_URL
+from news_article import NewsArticle
+from sqlite_writer import SQLiteWriter
+from poll_scheduler import PollScheduler
+from feed_fetcher import FeedFetcher, create_parse_executor
+from feed_validators import FeedValidatorStore
+from source_health import SourceHealthStore
+from news_snapshot import NewsSnapshot, StagedPublisher
+from trending import TrendingEngine
+from news_export import EXPORT_FORMAT, JSON_EXPORT_FILE, NewsExporter, write_json
+from article_db import (init_article_schema, article_write_statements,
+                        query_articles, count_articles, search_articles,
+                        count_search_results)
 
 load_dotenv()
 
@@ -37,79 +49,32 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Seconds an aggregation waits for its slowest sources before moving on
+AGGREGATION_DEADLINE = float(os.getenv('NEWS_AGGREGATION_DEADLINE', 25))
 
-@dataclass
-class NewsArticle:
-    """Data class for news articles"""
-    id: str
-    title: str
-    description: str
-    content: str
-    url: str
-    thumbnail: Optional[str]
-    source: str
-    category: str
-    country_focus: List[str]
-    language: str
-    published_at: datetime
-    is_breaking: bool = False
-    is_trending: bool = False
-    engagement_score: float = 0.0
-    credibility_score: float = 5.0
-
-    def to_dict(self):
-        """Convert to dictionary for JSON serialization"""
-        data = asdict(self)
-        data['published_at'] = self.published_at.isoformat()
-        return data
-
-    @classmethod
-    def from_feed_entry(cls, entry, source_config):
-        """Create NewsArticle from RSS feed entry"""
-        # Generate unique ID
-        article_id = hashlib.md5(
-            f"{entry.link}{entry.title}".encode()).hexdigest()
-
-        # Extract published date
-        published_at = datetime.now()
-        if hasattr(entry, 'published_parsed') and entry.published_parsed:
-            published_at = datetime(*entry.published_parsed[:6])
-        elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
-            published_at = datetime(*entry.updated_parsed[:6])
-
-        # Extract thumbnail
-        thumbnail = None
-        if hasattr(entry, 'media_thumbnail') and entry.media_thumbnail:
-            thumbnail = entry.media_thumbnail[0]['url']
-        elif hasattr(entry, 'enclosures') and entry.enclosures:
-            for enclosure in entry.enclosures:
-                if enclosure.type.startswith('image/'):
-                    thumbnail = enclosure.href
-                    break
-
-        # Clean description
-        description = getattr(entry, 'summary', '')
-        if description:
-            # Remove HTML tags
-            description = re.sub(r'<[^>]+>', '', description)
-            description = description.strip(
-            )[:300] + ('...' if len(description) > 300 else '')
-
-        return cls(
-            id=article_id,
-            title=entry.title,
-            description=description,
-            content=getattr(entry, 'content', [{}])[0].get(
-                'value', description) if hasattr(entry, 'content') else description,
-            url=entry.link,
-            thumbnail=thumbnail,
-            source=source_config['name'],
-            category=source_config.get('category', 'general'),
-            country_focus=[source_config.get('country', 'africa')],
-            language=source_config.get('language', 'en'),
-            published_at=published_at,
-            credibility_score=source_config.get('credibility', 5.0)
-        )
+# Entries kept from each feed body
+MAX_FEED_ENTRIES = 10
+
+
+def parse_feed_entries(content, source_name, source_config,
+                       max_entries=MAX_FEED_ENTRIES):
+    """Parse a feed body into article tuples (runs in the parse executor)"""
+    feed = feedparser.parse(content)
+
+    if feed.bozo:
+        logger.warning(
+            f"Malformed feed from {source_name}: {feed.bozo_exception}")
+
+    articles = []
+    for entry in feed.entries[:max_entries]:  # Limit to most recent
+        try:
+            article = NewsArticle.from_feed_entry(entry, source_config)
+            articles.append(article.to_tuple())
+        except Exception as e:
+            logger.error(f"Error processing entry from {source_name}: {e}")
+            continue
+
+    return articles
 
 
 class AfricanNewsAggregator:
@@ -566,33 +531,80 @@ class AfricanNewsAggregator:
 
         # Cache for storing articles
         self.article_cache = {}
+        # Articles each source contributed to the last aggregation it was in
+        self.source_articles = {}
         self.last_update = None
         self.db_path = 'news_cache.db'
         self.init_database()
 
+        # All cache writes go through one long-lived WAL connection
+        self.writer = SQLiteWriter(self.db_path)
+
+        # Near-duplicate title index, kept across aggregation runs and
+        # saved on close so restarts keep it too
+        self.dedup_index_path = DEDUP_INDEX_FILE
+        self.dedup_index = NearDuplicateIndex.load_or_create(self.dedup_index_path)
+
+        # Stories processed by earlier runs, persisted in the database
+        self.fingerprints = ArticleFingerprintStore(
+            self.db_path, writer=self.writer)
+
+        # HTTP validators per source for conditional feed requests
+        self.feed_validators = FeedValidatorStore(self.db_path, writer=self.writer)
+
+        # Created on first use so importing the module stays cheap
+        self.parse_executor = None
+
+        # Each source is polled on its own schedule, learned from its feed
+        self.poll_scheduler = PollScheduler(
+            self.news_sources, db_path=self.db_path, writer=self.writer)
+
+        # Keep-alive connections and cached DNS shared by every run
+        self.fetcher = FeedFetcher()
+
+        # Success rate, latency and circuit state per source
+        self.source_health = SourceHealthStore(self.db_path, writer=self.writer)
+
+        # Topic counts over sliding windows, updated as articles arrive
+        self.trending = TrendingEngine()
+
+        # NDJSON snapshot plus delta log, created on first export
+        self._exporter = None
+
+    def get_parse_executor(self):
+        """Return the feed parsing executor, creating it if needed"""
+        if self.parse_executor is None:
+            self.parse_executor = create_parse_executor()
+        return self.parse_executor
+
+    def close(self):
+        """Shut down the feed parsing workers and flush pending writes"""
+        if self.parse_executor is not None:
+            self.parse_executor.shutdown(wait=False)
+            self.parse_executor = None
+        self.save_dedup_index()
+        self.writer.close()
+
+    def save_dedup_index(self):
+        """Save the near-duplicate index for the next start"""
+        try:
+            self.dedup_index.save(self.dedup_index_path)
+        except Exception as e:
+            logger.error(f"Error saving dedup index: {e}")
+
+    async def aclose(self):
+        """Close the shared HTTP session, then everything close() does"""
+        await self.fetcher.close()
+        self.close()
+
     def init_database(self):
         """Initialize SQLite database for caching"""
         try:
             conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
 
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS articles (
-                    id TEXT PRIMARY KEY,
-                    data TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    source TEXT,
-                    category TEXT
-                )
-            ''')
-
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_articles_source ON articles(source)
-            ''')
-
-            cursor.execute('''
-                CREATE INDEX IF NOT EXISTS idx_articles_category ON articles(category)
-            ''')
+            # Column schema with a country join table (migrates JSON blobs)
+            init_article_schema(conn)
 
             conn.commit()
             conn.close()
@@ -600,168 +612,267 @@ class AfricanNewsAggregator:
         except Exception as e:
             logger.error(f"Database initialization error: {e}")
 
-    async def fetch_rss_feed(self, session, source_name, source_config):
-        """Fetch and parse RSS feed from a single source"""
-        try:
-            timeout = aiohttp.ClientTimeout(total=30)
-            async with session.get(source_config['rss_url'], timeout=timeout) as response:
-                if response.status != 200:
-                    logger.warning(f"HTTP {response.status} for {source_name}")
-                    return []
-
-                content = await response.text()
-                feed = feedparser.parse(content)
+    def get_source_articles(self, source_name, source_config):
+        """Articles from the last successful fetch of a source, if known"""
+        if source_name in self.article_cache:
+            return self.article_cache[source_name]
 
-                if feed.bozo:
-                    logger.warning(
-                        f"Malformed feed from {source_name}: {feed.bozo_exception}")
-
-                articles = []
-                for entry in feed.entries[:10]:  # Limit to 10 most recent
-                    try:
-                        article = NewsArticle.from_feed_entry(
-                            entry, source_config)
-                        articles.append(article)
-                    except Exception as e:
-                        logger.error(
-                            f"Error processing entry from {source_name}: {e}")
-                        continue
+        # After a restart, fall back to what was cached in the database
+        try:
+            conn = sqlite3.connect(self.db_path)
+            articles = [NewsArticle.from_dict(data) for data in query_articles(
+                conn, source=source_config['name'], limit=10,
+                order_by='a.created_at DESC')]
+            conn.close()
+        except Exception as e:
+            logger.error(f"Error loading cached articles for {source_name}: {e}")
+            return None
 
-                logger.info(
-                    f"Fetched {len(articles)} articles from {source_name}")
-                return articles
+        if not articles:
+            return None
+
+        self.article_cache[source_name] = articles
+        return articles
+
+    async def fetch_rss_feed(self, source_name, source_config):
+        """Fetch and parse RSS feed from a single source (None on failure)"""
+        previous_articles = self.get_source_articles(source_name, source_config)
+
+        # Only ask for a conditional response if we can serve the old copy;
+        # slow and probing sources get a short timeout
+        result = await self.fetcher.fetch_feed(
+            source_name, source_config['rss_url'], self.feed_validators,
+            conditional=previous_articles is not None, health=self.source_health)
+        if result is None:
+            return None
+        changed, content = result
+        if not changed:
+            return previous_articles
 
-        except asyncio.TimeoutError:
-            logger.error(f"Timeout fetching {source_name}")
-            return []
+        try:
+            # Parse in the executor so other downloads keep progressing
+            loop = asyncio.get_running_loop()
+            article_tuples = await loop.run_in_executor(
+                self.get_parse_executor(), parse_feed_entries,
+                content, source_name, source_config)
+            articles = [NewsArticle.from_tuple(values)
+                        for values in article_tuples]
         except Exception as e:
-            logger.error(f"Error fetching {source_name}: {e}")
-            return []
+            logger.error(f"Error parsing feed from {source_name}: {e}")
+            return None
 
-    async def aggregate_all_sources(self):
-        """Aggregate news from all configured sources"""
+        self.article_cache[source_name] = articles
+        logger.info(
+            f"Fetched {len(articles)} articles from {source_name}")
+        return articles
+
+    async def aggregate_due_sources(self, on_articles=None):
+        """Poll the sources whose adaptive schedule says they are due"""
+        return await self.aggregate_all_sources(
+            self.poll_scheduler.due(), on_articles=on_articles)
+
+    async def aggregate_all_sources(self, source_names=None, on_articles=None):
+        """Aggregate news from the given sources (all by default)
+
+        Each source is deduplicated, cached and handed to on_articles as
+        soon as it arrives, so slow sources do not hold back fast ones.
+        Returns every source's latest articles, so sources that were not
+        polled this time keep contributing what they had.
+        """
         start_time = time.time()
-        logger.info("Starting news aggregation...")
-
-        all_articles = []
-
-        connector = aiohttp.TCPConnector(limit=10)
-        timeout = aiohttp.ClientTimeout(total=60)
-
-        async with aiohttp.ClientSession(
-            connector=connector,
-            timeout=timeout,
-            headers={'User-Agent': 'Nairobell News Aggregator 1.0'}
-        ) as session:
-            tasks = [
-                self.fetch_rss_feed(session, name, config)
-                for name, config in self.news_sources.items()
-            ]
-
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+        if source_names is None:
+            source_names = list(self.news_sources)
+        logger.info(f"Starting news aggregation for {len(source_names)} sources...")
+
+        # Sources with an open circuit wait for their next probe
+        now = time.time()
+        allowed = []
+        for name in source_names:
+            if self.source_health.allow(name, now):
+                allowed.append(name)
+            else:
+                self.poll_scheduler.defer(name, self.source_health.retry_at(name))
+        if len(allowed) < len(source_names):
+            logger.info(f"Skipping {len(source_names) - len(allowed)} sources "
+                        f"with an open circuit")
+
+        # The fetcher's long-lived session reuses connections across runs
+        tasks = {
+            asyncio.ensure_future(
+                self.fetch_rss_feed(name, self.news_sources[name])): name
+            for name in allowed
+        }
 
-            for i, result in enumerate(results):
-                if isinstance(result, Exception):
-                    source_name = list(self.news_sources.keys())[i]
-                    logger.error(f"Failed to fetch {source_name}: {result}")
+        polled = 0
+        new_count = 0
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + AGGREGATION_DEADLINE
+        pending = set(tasks)
+        while pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                source_name = tasks[task]
+                if task.exception() is not None:
+                    logger.error(f"Failed to fetch {source_name}: {task.exception()}")
+                    result = None
                 else:
-                    all_articles.extend(result)
+                    result = task.result()
 
-        # Remove duplicates and sort by recency
-        unique_articles = self.deduplicate_articles(all_articles)
-        unique_articles.sort(key=lambda x: x.published_at, reverse=True)
+                if result is None:
+                    self.record_source_failure(source_name)
+                    continue
 
-        # Cache articles
-        self.cache_articles(unique_articles)
+                polled += 1
+                articles, source_new = self.process_source_articles(source_name, result)
+                new_count += source_new
+                if on_articles is not None and articles:
+                    try:
+                        on_articles(articles)
+                    except Exception as e:
+                        logger.error(f"Error publishing {source_name}: {e}")
+
+        # A source still running at the deadline is dropped from this run
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        for task in pending:
+            source_name = tasks[task]
+            logger.warning(f"{source_name} missed the aggregation deadline")
+            self.source_health.record_failure(
+                source_name, AGGREGATION_DEADLINE, "deadline")
+            self.record_source_failure(source_name)
+
+        self.feed_validators.flush()
+        self.source_health.flush()
+        self.poll_scheduler.flush()
+        self.fingerprints.flush()
+        # Throttled by the store; expired fingerprints leave memory too
+        self.fingerprints.prune()
+
+        combined_articles = self.current_articles()
 
         elapsed = time.time() - start_time
         logger.info(
-            f"Aggregation completed: {len(unique_articles)} unique articles in {elapsed:.2f}s")
+            f"Aggregation completed: polled {polled}/{len(allowed)} sources, "
+            f"{new_count} new articles, {len(combined_articles)} "
+            f"in total in {elapsed:.2f}s; next poll in "
+            f"{self.poll_scheduler.seconds_until_next():.0f}s")
+
+        return combined_articles
+
+    def record_source_failure(self, source_name):
+        """Back off from a source whose fetch failed"""
+        self.poll_scheduler.record_failure(source_name)
+        self.poll_scheduler.defer(
+            source_name, self.source_health.retry_at(source_name))
+
+    def process_source_articles(self, source_name, articles):
+        """Dedup and cache one source's fetch; returns (kept, new count)"""
+        # Stories already processed by earlier runs skip dedup and caching
+        new_articles, known_articles = self.partition_known_articles(articles)
+
+        # Remove duplicates and cache only what is new
+        unique_articles = self.deduplicate_articles(new_articles)
+        self.cache_articles(unique_articles)
+        self.fingerprints.add_articles(unique_articles)
+
+        # Publish rates are learned from entries no earlier run had seen
+        self.poll_scheduler.record_success(
+            source_name, len(new_articles),
+            saturated=(len(articles) >= MAX_FEED_ENTRIES and
+                       len(new_articles) == len(articles)))
+
+        kept_ids = set(article.id for article in unique_articles)
+        kept_ids.update(article.id for article in known_articles)
+        kept = [article for article in articles if article.id in kept_ids]
+        self.source_articles[source_name] = kept
+        self.trending.add(kept)
+        return kept, len(unique_articles)
+
+    def current_articles(self):
+        """Latest articles of every source, newest first"""
+        combined = {}
+        for articles in self.source_articles.values():
+            for article in articles:
+                combined.setdefault(article.id, article)
+        return sorted(combined.values(), key=lambda x: x.published_at, reverse=True)
 
-        return unique_articles
+    def partition_known_articles(self, articles):
+        """Split articles into new ones and ones seen in earlier runs"""
+        new_articles = []
+        known_articles = []
+        skipped = 0
+
+        for article in articles:
+            match = self.fingerprints.lookup(article.url, article.title)
+
+            if match is None:
+                new_articles.append(article)
+            elif match[0] == MATCH_URL and match[1] == article.id:
+                # Same story from the same link: already cached
+                known_articles.append(article)
+            elif match[0] == MATCH_URL:
+                # Same link with an edited headline
+                new_articles.append(article)
+            else:
+                # Same story republished under another link
+                skipped += 1
+
+        if skipped:
+            logger.info(f"Skipped {skipped} stories already seen elsewhere")
+        return new_articles, known_articles
 
     def deduplicate_articles(self, articles):
         """Remove duplicate articles based on title similarity"""
         unique_articles = []
-        seen_titles = set()
+        seen_ids = set()
 
         for article in articles:
-            # Create a normalized title for comparison
-            normalized_title = re.sub(
-                r'[^\w\s]', '', article.title.lower()).strip()
-
-            # Check for similarity with existing titles
-            is_duplicate = False
-            for seen_title in seen_titles:
-                similarity = self.calculate_similarity(
-                    normalized_title, seen_title)
-                if similarity > 0.8:  # 80% similarity threshold
-                    is_duplicate = True
-                    break
-
-            if not is_duplicate:
-                unique_articles.append(article)
-                seen_titles.add(normalized_title)
+            if article.id in seen_ids:
+                continue
 
-        return unique_articles
-
-    def calculate_similarity(self, text1, text2):
-        """Calculate similarity between two texts"""
-        words1 = set(text1.split())
-        words2 = set(text2.split())
-
-        if not words1 or not words2:
-            return 0
+            # Only titles sharing an LSH bucket are compared (80% threshold);
+            # a re-fetched article never counts as a duplicate of itself
+            duplicate_of = self.dedup_index.check_and_add(
+                article.id, article.title)
 
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
+            if duplicate_of is None:
+                unique_articles.append(article)
+                seen_ids.add(article.id)
 
-        return len(intersection) / len(union)
+        return unique_articles
 
     def cache_articles(self, articles):
         """Cache articles in database"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            for article in articles:
-                cursor.execute('''
-                    INSERT OR REPLACE INTO articles (id, data, source, category)
-                    VALUES (?, ?, ?, ?)
-                ''', (
-                    article.id,
-                    json.dumps(article.to_dict()),
-                    article.source,
-                    article.category
-                ))
+            # Queued for the writer thread; committed as executemany batches
+            for sql, rows in article_write_statements(articles):
+                self.writer.submit(sql, rows)
 
-            conn.commit()
-            conn.close()
-            logger.info(f"Cached {len(articles)} articles to database")
+            logger.info(f"Queued {len(articles)} articles for caching")
         except Exception as e:
             logger.error(f"Error caching articles: {e}")
 
-    def get_cached_articles(self, max_age_hours=6):
-        """Get cached articles from database"""
+    def get_cached_articles(self, max_age_hours=6, category=None, country=None,
+                            language=None, limit=None, offset=0, after=None):
+        """Get cached articles from database
+
+        after is a decoded (published_at, id) cursor; pages continue from it
+        instead of skipping offset rows.
+        """
         try:
             conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-
-            cutoff_time = datetime.now() - timedelta(hours=max_age_hours)
 
-            cursor.execute('''
-                SELECT data FROM articles 
-                WHERE created_at > ? 
-                ORDER BY created_at DESC
-            ''', (cutoff_time.isoformat(),))
-
-            articles = []
-            for row in cursor.fetchall():
-                try:
-                    article_data = json.loads(row[0])
-                    articles.append(article_data)
-                except Exception as e:
-                    logger.error(f"Error parsing cached article: {e}")
+            # Served from the category/country/created_at indexes
+            articles = query_articles(
+                conn, max_age_hours=max_age_hours, category=category,
+                country=country, language=language, limit=limit, offset=offset,
+                after=after)
 
             conn.close()
             logger.info(f"Retrieved {len(articles)} cached articles")
@@ -770,44 +881,99 @@ class AfricanNewsAggregator:
             logger.error(f"Error retrieving cached articles: {e}")
             return []
 
-    def export_to_json(self, articles, filename="latest_news.json"):
-        """Export articles to JSON file"""
+    def count_cached_articles(self, max_age_hours=6, category=None, country=None,
+                              language=None):
+        """Count cached articles matching the filters"""
         try:
-            output_data = {
-                'timestamp': datetime.now().isoformat(),
-                'total_articles': len(articles),
-                'sources': list(set(article.source for article in articles)),
-                'articles': [article.to_dict() for article in articles]
-            }
+            conn = sqlite3.connect(self.db_path)
+            total = count_articles(
+                conn, max_age_hours=max_age_hours, category=category,
+                country=country, language=language)
+            conn.close()
+            return total
+        except Exception as e:
+            logger.error(f"Error counting cached articles: {e}")
+            return 0
+
+    def search_cached_articles(self, text, category=None, country=None,
+                               language=None, limit=20, offset=0):
+        """Full-text search over every cached article, best match first"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            articles = search_articles(
+                conn, text, category=category, country=country,
+                language=language, limit=limit, offset=offset)
+            conn.close()
+            return articles
+        except Exception as e:
+            logger.error(f"Error searching cached articles: {e}")
+            return []
 
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(output_data, f, indent=2, ensure_ascii=False)
+    def count_search_results(self, text, category=None, country=None,
+                             language=None):
+        """Count cached articles matching a full-text search"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            total = count_search_results(
+                conn, text, category=category, country=country,
+                language=language)
+            conn.close()
+            return total
+        except Exception as e:
+            logger.error(f"Error counting search results: {e}")
+            return 0
+
+    @property
+    def exporter(self):
+        """NDJSON exporter, or None when exporting the single JSON file"""
+        if self._exporter is None and EXPORT_FORMAT == 'ndjson':
+            self._exporter = NewsExporter()
+        return self._exporter
 
-            logger.info(f"Exported {len(articles)} articles to {filename}")
+    def export_to_json(self, articles, filename=JSON_EXPORT_FILE):
+        """Export articles to JSON file"""
+        try:
+            # Compact, and renamed into place so readers never see half a file
+            count = write_json(articles, filename)
+            logger.info(f"Exported {count} articles to {filename}")
         except Exception as e:
             logger.error(f"Error exporting to JSON: {e}")
 
-    def get_trending_topics(self, articles, top_n=10):
-        """Extract trending topics from articles"""
-        topic_counts = {}
+    def export_articles(self, articles, force=False):
+        """Export the full article set
 
-        for article in articles:
-            # Extract keywords from title and description
-            text = f"{article.title} {article.description}".lower()
-            words = re.findall(r'\b[a-z]{4,}\b', text)  # Words with 4+ letters
+        In NDJSON mode new articles go to the delta log and the snapshot is
+        rewritten only when due, unless force is set. Each snapshot is also
+        written in binary form for API servers to map at startup.
+        """
+        if self.exporter is None:
+            self.export_to_json(articles)
+            return
+        try:
+            if self.exporter.export(articles, force=force):
+                NewsSnapshot.build(articles).save(sequence=self.exporter.deltas.sequence)
+        except Exception as e:
+            logger.error(f"Error exporting articles: {e}")
 
-            # Common stop words to ignore
-            stop_words = {'news', 'said', 'says', 'after', 'will', 'also', 'been', 'have', 'were', 'this', 'that',
-                          'with', 'from', 'they', 'more', 'would', 'could', 'than', 'what', 'when', 'where', 'while', 'about'}
+    def publish_articles(self, articles):
+        """Export articles that just arrived from their sources"""
+        if self.exporter is None:
+            self.export_to_json(self.current_articles())
+            return
+        try:
+            logged = self.exporter.append(articles)
+            logger.info(f"Logged {logged} new articles to the delta log")
+        except Exception as e:
+            logger.error(f"Error logging delta articles: {e}")
 
-            for word in words:
-                if word not in stop_words and len(word) > 3:
-                    topic_counts[word] = topic_counts.get(word, 0) + 1
+    def get_trending_topics(self, articles, top_n=10):
+        """Most mentioned topics of the last day as (topic, mentions) pairs
 
-        # Sort by frequency and return top topics
-        trending = sorted(topic_counts.items(),
-                          key=lambda x: x[1], reverse=True)
-        return trending[:top_n]
+        Articles already counted are skipped, so passing the full list
+        again only counts the new ones.
+        """
+        self.trending.add(articles)
+        return self.trending.top_pairs(limit=top_n)
 
 
 async def main():
@@ -826,9 +992,8 @@ async def main():
                 articles = cached_data
 
         if articles:
-            # Export to JSON for web app consumption
-            aggregator.export_to_json(articles if isinstance(
-                articles[0], NewsArticle) else [])
+            # Export for web app consumption (NewsArticles or cached dicts)
+            aggregator.export_articles(articles, force=True)
 
             # Print summary
             if articles and isinstance(articles[0], NewsArticle):
@@ -845,22 +1010,40 @@ async def main():
     except Exception as e:
         logger.error(f"Aggregation failed: {e}")
         return []
+    finally:
+        await aggregator.aclose()
 
 
-def run_scheduled_aggregation():
-    """Run aggregation on schedule"""
-    logger.info("Starting scheduled aggregation...")
+async def poll_sources_forever():
+    """Poll each source when its adaptive schedule says it is due"""
+    aggregator = AfricanNewsAggregator()
 
-    # Schedule aggregation every 30 minutes
-    schedule.every(30).minutes.do(lambda: asyncio.run(main()))
+    try:
+        while True:
+            # Export shortly after each source arrives, not once at the end
+            publisher = StagedPublisher(aggregator.publish_articles)
+            try:
+                # Every source is due on the first pass
+                await aggregator.aggregate_due_sources(on_articles=publisher.stage)
+            except Exception as e:
+                logger.error(f"Aggregation failed: {e}")
+            finally:
+                publisher.flush()
+
+            if aggregator.exporter is not None and aggregator.exporter.snapshot_due():
+                aggregator.export_articles(aggregator.current_articles(), force=True)
+
+            delay = aggregator.poll_scheduler.seconds_until_next()
+            logger.info(f"Next source due in {delay:.0f}s")
+            await asyncio.sleep(max(delay, 1))
+    finally:
+        await aggregator.aclose()
 
-    # Initial run
-    asyncio.run(main())
 
-    # Keep running scheduled tasks
-    while True:
-        schedule.run_pending()
-        time.sleep(60)  # Check every minute
+def run_scheduled_aggregation():
+    """Run aggregation on schedule"""
+    logger.info("Starting scheduled aggregation...")
+    asyncio.run(poll_sources_forever())
 
 
 if __name__ == "__main__":
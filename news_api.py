@@ -4,18 +4,29 @@ News API Server
 FastAPI server to serve aggregated news data to the React frontend
 """
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 import json
+import logging
 import os
 from datetime import datetime, timedelta
 from typing import List, Optional
 import sqlite3
 import asyncio
 from news_aggregator_clean import AfricanNewsAggregator
+from news_snapshot import SnapshotEngine
+from leader_lease import SHARED_WORKERS, LeaderLease
+from poll_scheduler import load_poll_stats
+from article_store import SORT_ORDERS
+from pagination import cursor_sort_key, decode_cursor, next_cursor
+from trending import DEFAULT_WINDOW, WINDOWS
+from response_cache import (CACHE_CONTROL, ResponseCache, dynamic_etag,
+                            not_modified, snapshot_tag)
 import uvicorn
 
+logger = logging.getLogger(__name__)
+
 app = FastAPI(
     title="Nairobell News API",
     description="African News Aggregation API",
@@ -32,21 +43,37 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global aggregator instance
+# Global aggregator and snapshot engine instances
 aggregator = None
+snapshot_engine = None
 
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize the news aggregator on startup"""
-    global aggregator
+    """Initialize the news aggregator and start background refreshes"""
+    global aggregator, snapshot_engine
     aggregator = AfricanNewsAggregator()
+    # With several uvicorn workers, the lease holder aggregates for all
+    lease = LeaderLease(aggregator.db_path) if SHARED_WORKERS else None
+    snapshot_engine = SnapshotEngine(
+        aggregator, render_responses=render_responses, lease=lease)
 
-    # Run initial aggregation
+    # Serve cached articles straight away, then aggregate in the background
     try:
-        await aggregator.aggregate_all_sources()
+        snapshot_engine.seed_from_cache()
     except Exception as e:
-        print(f"Initial aggregation failed: {e}")
+        print(f"Loading cached articles failed: {e}")
+
+    snapshot_engine.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background refreshes"""
+    if snapshot_engine is not None:
+        await snapshot_engine.stop()
+    if aggregator is not None:
+        await aggregator.aclose()
 
 
 @app.get("/")
@@ -57,9 +84,11 @@ async def root():
         "version": "1.0.0",
         "endpoints": [
             "/news/latest",
+            "/news/search",
             "/news/by-country/{country}",
             "/news/by-category/{category}",
             "/news/trending",
+            "/news/sources/health",
             "/health"
         ]
     }
@@ -71,58 +100,243 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "service": "news-api"
+        "service": "news-api",
+        "snapshot_version": snapshot_engine.current.version if snapshot_engine else 0,
+        "articles_cached": len(snapshot_engine.current) if snapshot_engine else 0
     }
 
 
-@app.get("/news/latest")
-async def get_latest_news(
-    limit: int = Query(20, ge=1, le=100),
-    offset: int = Query(0, ge=0),
-    category: Optional[str] = Query(None),
-    country: Optional[str] = Query(None),
-    language: Optional[str] = Query("en")
-):
-    """Get latest news articles"""
-    try:
-        # Try to get fresh articles first
-        articles = await aggregator.aggregate_all_sources()
+def latest_news_payload(snapshot, limit=20, offset=0, sort="recent", cursor=None,
+                        **filters):
+    """Body of /news/latest for one snapshot, an empty page if nothing matches"""
+    if cursor is not None:
+        # Keyset page: continues after the cursor even if the snapshot changed
+        total, article_data, has_more = snapshot.page_after(
+            cursor_sort_key(cursor), limit, **filters)
+    else:
+        # Posting lists for newest first, the column store otherwise
+        total, article_data = snapshot.page(offset, limit, sort=sort, **filters)
+        has_more = offset + limit < total
 
-        # If no fresh articles, get cached ones
-        if not articles:
-            cached_articles = aggregator.get_cached_articles()
-            if cached_articles:
-                articles = cached_articles
+    return {
+        "articles": article_data,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+        # Cursors follow the newest-first order only
+        "next_cursor": next_cursor(article_data, has_more) if sort == "recent" else None,
+        "timestamp": snapshot.built_at.isoformat()
+    }
+
+
+def trending_payload(snapshot, limit=10, window=DEFAULT_WINDOW):
+    """Body of /news/trending for one snapshot"""
+    # Trending or high engagement articles, precomputed per snapshot
+    trending_articles = snapshot.trending[:limit]
+
+    # If no specific trending articles, get most recent
+    if not trending_articles:
+        trending_articles = snapshot.articles[:limit]
+
+    article_data = list(trending_articles)
 
-        if not articles:
+    return {
+        "articles": article_data,
+        "total": len(article_data),
+        # Topics ranked when the snapshot was published
+        "topics": list(snapshot.topics.get(window, ())[:limit]),
+        "window": window,
+        "timestamp": snapshot.built_at.isoformat()
+    }
+
+
+def sources_payload():
+    """Body of /news/sources"""
+    sources = []
+    for source_id, source_info in aggregator.news_sources.items():
+        sources.append({
+            "id": source_id,
+            "name": source_info["name"],
+            "country": source_info["country"],
+            "language": source_info["language"],
+            "category": source_info["category"],
+            "credibility": source_info["credibility"],
+            "website": source_info.get("website", "")
+        })
+
+    return {
+        "sources": sources,
+        "total": len(sources)
+    }
+
+
+def latest_key(category=None, country=None):
+    """Response cache key for a first page of /news/latest"""
+    return f"latest:{(category or '').lower()}:{(country or '').lower()}"
+
+
+def render_responses(snapshot) -> ResponseCache:
+    """Pre-render the common responses of a snapshot before it is published"""
+    cache = ResponseCache(snapshot_tag(snapshot))
+    if not snapshot.articles:
+        return cache
+
+    # Default first pages: unfiltered, per category and per country
+    cache.add(latest_key(), latest_news_payload(snapshot))
+    for category in snapshot.postings['category']:
+        cache.add(latest_key(category=category),
+                  latest_news_payload(snapshot, category=category))
+    for country in snapshot.postings['country']:
+        cache.add(latest_key(country=country),
+                  latest_news_payload(snapshot, country=country))
+
+    cache.add("trending", trending_payload(snapshot))
+    cache.add("sources", sources_payload())
+
+    logger.info(f"Pre-rendered {len(cache)} responses ({cache.size()} bytes) "
+                f"for snapshot v{snapshot.version}")
+    return cache
+
+
+def cached_response(request: Request, key: str) -> Optional[Response]:
+    """Pre-rendered response for key from the current snapshot, if any"""
+    responses = snapshot_engine.current.responses
+    rendered = responses.get(key) if responses is not None else None
+    if rendered is None:
+        return None
+
+    body, encoding = rendered.select(request.headers.get("accept-encoding"))
+    headers = rendered.headers(encoding)
+    if rendered.is_not_modified(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def snapshot_response(request: Request, snapshot, payload) -> Response:
+    """JSON response computed from a snapshot, validated by a snapshot ETag"""
+    etag = dynamic_etag(snapshot_tag(snapshot), f"{request.url.path}?{request.url.query}")
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if not_modified(request.headers.get("if-none-match"), (etag,)):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=payload, headers=headers)
+
+
+async def latest_news_response(request: Request, limit=20, offset=0, category=None,
+                               country=None, language=None, source=None,
+                               breaking=None, trending=None, sort="recent",
+                               cursor=None):
+    """Shared implementation of /news/latest and its by-country/category forms"""
+    if sort not in SORT_ORDERS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"sort must be one of: {', '.join(SORT_ORDERS)}")
+    after = None
+    if cursor is not None:
+        if sort != "recent":
+            raise HTTPException(
+                status_code=400, detail="cursor requires sort=recent")
+        try:
+            after = decode_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    try:
+        snapshot = snapshot_engine.current
+
+        if snapshot.articles:
+            # Default first pages are served as pre-rendered bytes
+            if (offset == 0 and limit == 20 and sort == "recent"
+                    and after is None and not (category and country)
+                    and language is None and source is None
+                    and breaking is None and trending is None):
+                response = cached_response(
+                    request, latest_key(category=category, country=country))
+                if response is not None:
+                    return response
+
+            payload = latest_news_payload(
+                snapshot, limit, offset, sort=sort, cursor=after,
+                category=category, country=country, language=language,
+                source=source, is_breaking=breaking, is_trending=trending)
+            return snapshot_response(request, snapshot, payload)
+
+        if not aggregator.count_cached_articles():
+            # Neither a snapshot nor a cached article to serve yet
             return JSONResponse(
                 status_code=404,
                 content={"message": "No articles found"}
             )
 
-        # Filter by category if specified
-        if category:
-            articles = [a for a in articles if a.category.lower() ==
-                        category.lower()]
+        if breaking is None and trending is None and source is None:
+            # Nothing aggregated yet: index-backed query on the cache
+            total = aggregator.count_cached_articles(
+                category=category, country=country, language=language)
+            # One extra row tells whether another page follows
+            article_data = aggregator.get_cached_articles(
+                category=category, country=country, language=language,
+                limit=limit + 1, offset=0 if after else offset, after=after)
+            has_more = len(article_data) > limit
+            article_data = article_data[:limit]
+        else:
+            # The cache has no index for these filters
+            total, article_data, has_more = 0, [], False
 
-        # Filter by country if specified
-        if country:
-            articles = [a for a in articles if country.lower() in [c.lower()
-                                                                   for c in a.country_focus]]
+        return {
+            "articles": article_data,
+            "total": total,
+            "limit": limit,
+            "offset": offset,
+            "next_cursor": next_cursor(article_data, has_more) if sort == "recent" else None,
+            "timestamp": datetime.now().isoformat()
+        }
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error fetching news: {str(e)}")
+
+
+@app.get("/news/latest")
+async def get_latest_news(
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    category: Optional[str] = Query(None),
+    country: Optional[str] = Query(None),
+    language: Optional[str] = Query(None),
+    source: Optional[str] = Query(None),
+    breaking: Optional[bool] = Query(None),
+    trending: Optional[bool] = Query(None),
+    sort: str = Query("recent"),
+    cursor: Optional[str] = Query(None)
+):
+    """Get latest news articles"""
+    return await latest_news_response(
+        request, limit=limit, offset=offset, category=category, country=country,
+        language=language, source=source, breaking=breaking, trending=trending,
+        sort=sort, cursor=cursor)
 
-        # Apply pagination
-        total = len(articles)
-        articles = articles[offset:offset + limit]
 
-        # Convert to dict format if needed
-        article_data = []
-        for article in articles:
-            if hasattr(article, 'to_dict'):
-                article_data.append(article.to_dict())
-            else:
-                article_data.append(article)
+@app.get("/news/search")
+async def search_news(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    category: Optional[str] = Query(None),
+    country: Optional[str] = Query(None)
+):
+    """Full-text search with BM25 ranking and highlighted snippets"""
+    try:
+        # SQLite reads are kept off the event loop
+        loop = asyncio.get_event_loop()
+        article_data = await loop.run_in_executor(
+            None, lambda: aggregator.search_cached_articles(
+                q, category=category, country=country, limit=limit, offset=offset))
+        total = await loop.run_in_executor(
+            None, lambda: aggregator.count_search_results(
+                q, category=category, country=country))
 
         return {
+            "query": q,
             "articles": article_data,
             "total": total,
             "limit": limit,
@@ -132,75 +346,63 @@ async def get_latest_news(
 
     except Exception as e:
         raise HTTPException(
-            status_code=500, detail=f"Error fetching news: {str(e)}")
+            status_code=500, detail=f"Error searching news: {str(e)}")
 
 
 @app.get("/news/by-country/{country}")
 async def get_news_by_country(
+    request: Request,
     country: str,
     limit: int = Query(20, ge=1, le=100),
-    offset: int = Query(0, ge=0)
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None)
 ):
     """Get news articles for a specific country"""
-    return await get_latest_news(limit=limit, offset=offset, country=country)
+    return await latest_news_response(
+        request, limit=limit, offset=offset, country=country, cursor=cursor)
 
 
 @app.get("/news/by-category/{category}")
 async def get_news_by_category(
+    request: Request,
     category: str,
     limit: int = Query(20, ge=1, le=100),
-    offset: int = Query(0, ge=0)
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None)
 ):
     """Get news articles for a specific category"""
-    return await get_latest_news(limit=limit, offset=offset, category=category)
+    return await latest_news_response(
+        request, limit=limit, offset=offset, category=category, cursor=cursor)
 
 
 @app.get("/news/trending")
 async def get_trending_news(
-    limit: int = Query(10, ge=1, le=50)
+    request: Request,
+    limit: int = Query(10, ge=1, le=50),
+    window: str = Query(DEFAULT_WINDOW)
 ):
-    """Get trending news articles"""
-    try:
-        articles = await aggregator.aggregate_all_sources()
+    """Get trending news articles and topics"""
+    if window not in WINDOWS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"window must be one of: {', '.join(WINDOWS)}")
 
-        if not articles:
-            cached_articles = aggregator.get_cached_articles()
-            if cached_articles:
-                articles = cached_articles
+    try:
+        snapshot = snapshot_engine.current
 
-        if not articles:
+        if not snapshot.articles:
             return JSONResponse(
                 status_code=404,
                 content={"message": "No trending articles found"}
             )
 
-        # Filter for trending articles or high engagement
-        trending_articles = []
-        for article in articles:
-            if hasattr(article, 'is_trending') and article.is_trending:
-                trending_articles.append(article)
-            elif hasattr(article, 'engagement_score') and article.engagement_score > 7.0:
-                trending_articles.append(article)
-
-        # If no specific trending articles, get most recent
-        if not trending_articles:
-            trending_articles = articles[:limit]
-        else:
-            trending_articles = trending_articles[:limit]
-
-        # Convert to dict format
-        article_data = []
-        for article in trending_articles:
-            if hasattr(article, 'to_dict'):
-                article_data.append(article.to_dict())
-            else:
-                article_data.append(article)
+        if limit == 10 and window == DEFAULT_WINDOW:
+            response = cached_response(request, "trending")
+            if response is not None:
+                return response
 
-        return {
-            "articles": article_data,
-            "total": len(trending_articles),
-            "timestamp": datetime.now().isoformat()
-        }
+        return snapshot_response(
+            request, snapshot, trending_payload(snapshot, limit, window))
 
     except Exception as e:
         raise HTTPException(
@@ -208,36 +410,72 @@ async def get_trending_news(
 
 
 @app.get("/news/sources")
-async def get_news_sources():
+async def get_news_sources(request: Request):
     """Get available news sources"""
     try:
+        response = cached_response(request, "sources")
+        if response is not None:
+            return response
+
+        return sources_payload()
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=500, detail=f"Error fetching sources: {str(e)}")
+
+
+@app.get("/news/sources/health")
+async def get_sources_health():
+    """Circuit state, success rate, latency and polling interval per source"""
+    try:
+        if snapshot_engine.is_leader:
+            polling = aggregator.poll_scheduler.stats()
+        else:
+            # Only the lease holder polls; report what it last saved
+            aggregator.source_health.reload()
+            polling = load_poll_stats(aggregator.db_path)
+
         sources = []
-        for source_id, source_info in aggregator.news_sources.items():
+        for health in aggregator.source_health.report():
+            source_id = health["source"]
+            schedule = polling.get(source_id, {})
+            next_due = schedule.get("next_due")
             sources.append({
-                "id": source_id,
-                "name": source_info["name"],
-                "country": source_info["country"],
-                "language": source_info["language"],
-                "category": source_info["category"],
-                "credibility": source_info["credibility"],
-                "website": source_info.get("website", "")
+                **health,
+                "name": aggregator.news_sources.get(source_id, {}).get("name", source_id),
+                "poll_interval_seconds": schedule.get("interval_seconds"),
+                "new_per_hour": schedule.get("new_per_hour"),
+                "next_poll": (datetime.fromtimestamp(next_due).isoformat()
+                              if next_due is not None else None)
             })
 
+        states = {}
+        for source in sources:
+            states[source["state"]] = states.get(source["state"], 0) + 1
+
         return {
             "sources": sources,
-            "total": len(sources)
+            "total": len(sources),
+            "states": states,
+            "timestamp": datetime.now().isoformat()
         }
 
     except Exception as e:
         raise HTTPException(
-            status_code=500, detail=f"Error fetching sources: {str(e)}")
+            status_code=500, detail=f"Error fetching source health: {str(e)}")
 
 
 @app.post("/news/refresh")
 async def refresh_news():
     """Manually trigger news refresh"""
+    if not snapshot_engine.is_leader:
+        # Refreshing here would only re-read the leader's snapshot
+        raise HTTPException(
+            status_code=409,
+            detail="Another worker owns news refresh; this worker serves its latest snapshot")
+
     try:
-        articles = await aggregator.aggregate_all_sources()
+        articles = await snapshot_engine.refresh()
 
         return {
             "message": "News refresh completed",
@@ -250,10 +488,15 @@ async def refresh_news():
             status_code=500, detail=f"Error refreshing news: {str(e)}")
 
 if __name__ == "__main__":
+    workers = int(os.getenv('NEWS_API_WORKERS', 1))
+    if workers > 1:
+        # Workers inherit this, so one of them aggregates for all
+        os.environ['NEWS_SHARED_WORKERS'] = 'true'
     uvicorn.run(
         "news_api:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        workers=workers,
+        reload=workers == 1,
         access_log=True
     )
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+News Article Model
+Compact article record shared by the aggregators: fixed __slots__ instead of
+a per-instance __dict__, interned categorical strings, and a hand-written
+serializer
+"""
+
+import hashlib
+import re
+import sys
+from datetime import datetime
+from typing import Dict, Optional, Sequence, Tuple
+
+
+def intern_value(value):
+    """Share one copy of a repeated categorical string between articles"""
+    return sys.intern(value) if type(value) is str else value
+
+
+class NewsArticle:
+    """News article record
+
+    source, category, language and the country codes in country_focus are
+    interned, so tens of thousands of articles share a handful of string
+    objects. country_focus is stored as a tuple.
+    """
+
+    __slots__ = ('id', 'title', 'description', 'content', 'url', 'thumbnail',
+                 'source', 'category', 'country_focus', 'language',
+                 'published_at', 'is_breaking', 'is_trending',
+                 'engagement_score', 'credibility_score')
+
+    def __init__(self, id: str, title: str, description: str, content: str,
+                 url: str, thumbnail: Optional[str], source: str, category: str,
+                 country_focus: Sequence[str], language: str,
+                 published_at: datetime, is_breaking: bool = False,
+                 is_trending: bool = False, engagement_score: float = 0.0,
+                 credibility_score: float = 5.0):
+        self.id = id
+        self.title = title
+        self.description = description
+        self.content = content
+        self.url = url
+        self.thumbnail = thumbnail
+        self.source = intern_value(source)
+        self.category = intern_value(category)
+        self.country_focus: Tuple[str, ...] = tuple(
+            intern_value(country) for country in country_focus or ())
+        self.language = intern_value(language)
+        self.published_at = published_at
+        self.is_breaking = is_breaking
+        self.is_trending = is_trending
+        self.engagement_score = engagement_score
+        self.credibility_score = credibility_score
+
+    def __repr__(self):
+        return (f"NewsArticle(id={self.id!r}, title={self.title!r}, "
+                f"source={self.source!r}, published_at={self.published_at!r})")
+
+    def __eq__(self, other):
+        if not isinstance(other, NewsArticle):
+            return NotImplemented
+        return self.to_tuple() == other.to_tuple()
+
+    __hash__ = None
+
+    def to_dict(self) -> Dict:
+        """Convert to dictionary for JSON serialization"""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'content': self.content,
+            'url': self.url,
+            'thumbnail': self.thumbnail,
+            'source': self.source,
+            'category': self.category,
+            'country_focus': list(self.country_focus),
+            'language': self.language,
+            'published_at': self.published_at.isoformat(),
+            'is_breaking': self.is_breaking,
+            'is_trending': self.is_trending,
+            'engagement_score': self.engagement_score,
+            'credibility_score': self.credibility_score,
+        }
+
+    @classmethod
+    def from_feed_entry(cls, entry, source_config):
+        """Create NewsArticle from RSS feed entry"""
+        # Generate unique ID
+        article_id = hashlib.md5(
+            f"{entry.link}{entry.title}".encode()).hexdigest()
+
+        # Extract published date
+        published_at = datetime.utcnow()
+        if hasattr(entry, 'published_parsed') and entry.published_parsed:
+            published_at = datetime(*entry.published_parsed[:6])
+        elif hasattr(entry, 'updated_parsed') and entry.updated_parsed:
+            published_at = datetime(*entry.updated_parsed[:6])
+
+        # Extract thumbnail
+        thumbnail = None
+        if hasattr(entry, 'media_thumbnail') and entry.media_thumbnail:
+            thumbnail = entry.media_thumbnail[0]['url']
+        elif hasattr(entry, 'enclosures') and entry.enclosures:
+            for enclosure in entry.enclosures:
+                if enclosure.type.startswith('image/'):
+                    thumbnail = enclosure.href
+                    break
+
+        # Clean description
+        description = getattr(entry, 'summary', '')
+        if description:
+            # Remove HTML tags
+            description = re.sub(r'<[^>]+>', '', description)
+            description = description.strip(
+            )[:300] + ('...' if len(description) > 300 else '')
+
+        return cls(
+            id=article_id,
+            title=entry.title,
+            description=description,
+            content=getattr(entry, 'content', [{}])[0].get(
+                'value', description) if hasattr(entry, 'content') else description,
+            url=entry.link,
+            thumbnail=thumbnail,
+            source=source_config['name'],
+            category=source_config.get('category', 'general'),
+            country_focus=[source_config.get('country', 'africa')],
+            language=source_config.get('language', 'en'),
+            published_at=published_at,
+            credibility_score=source_config.get('credibility', 5.0)
+        )
+
+    def to_tuple(self):
+        """Compact positional form used to ship articles between processes"""
+        return (self.id, self.title, self.description, self.content, self.url,
+                self.thumbnail, self.source, self.category, self.country_focus,
+                self.language, self.published_at, self.is_breaking,
+                self.is_trending, self.engagement_score, self.credibility_score)
+
+    @classmethod
+    def from_tuple(cls, values):
+        """Create NewsArticle from the output of to_tuple"""
+        return cls(*values)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Create NewsArticle from a dictionary produced by to_dict"""
+        data = dict(data)
+        data['published_at'] = datetime.fromisoformat(data['published_at'])
+        return cls(**data)
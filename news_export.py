@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+News Export
+Streams article snapshots to NDJSON through a temp file and atomic rename,
+and keeps an append-only delta log of articles added since each snapshot so
+consumers can tail new articles instead of reparsing the whole export
+"""
+
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 'json' for the single latest_news.json document that setup scripts and the
+# API fallback read, 'ndjson' opts in to the streaming snapshot plus delta log
+EXPORT_FORMAT = os.getenv('NEWS_EXPORT_FORMAT', 'json')
+JSON_EXPORT_FILE = 'latest_news.json'
+SNAPSHOT_FILE = os.getenv('NEWS_SNAPSHOT_FILE', 'latest_news.ndjson')
+DELTA_LOG_FILE = os.getenv('NEWS_DELTA_LOG_FILE', 'latest_news.deltas.ndjson')
+# Seconds between full snapshots while deltas are being appended
+SNAPSHOT_INTERVAL = int(os.getenv('NEWS_SNAPSHOT_INTERVAL', 1800))
+# Delta log size that forces the next snapshot and compacts the log
+DELTA_LOG_MAX_BYTES = int(os.getenv('NEWS_DELTA_LOG_MAX_BYTES', 8 * 1024 * 1024))
+
+
+def _article_to_dict(article) -> Dict:
+    return article.to_dict() if hasattr(article, 'to_dict') else article
+
+
+def _dumps(data) -> str:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+@contextmanager
+def atomic_write(path: str, binary: bool = False):
+    """Write a file through a temp file renamed over path on success
+
+    Readers see either the old file or the complete new one, never a
+    partial write.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with (os.fdopen(fd, 'wb') if binary else
+              os.fdopen(fd, 'w', encoding='utf-8')) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_json(articles, path: str = JSON_EXPORT_FILE) -> int:
+    """Export articles as one latest_news.json document"""
+    article_dicts = [_article_to_dict(article) for article in articles]
+    with atomic_write(path) as f:
+        json.dump({
+            'timestamp': datetime.now().isoformat(),
+            'total_articles': len(article_dicts),
+            'sources': list(set(article.get('source') for article in article_dicts)),
+            'articles': article_dicts
+        }, f, ensure_ascii=False, separators=(',', ':'))
+    return len(article_dicts)
+
+
+def write_snapshot(articles, path: str = SNAPSHOT_FILE, sequence: int = 0) -> int:
+    """Stream articles to an NDJSON snapshot: a header line, then one per article
+
+    The header's sequence is the last delta already included, so readers
+    apply only later deltas on top of it.
+    """
+    article_dicts = [_article_to_dict(article) for article in articles]
+    with atomic_write(path) as f:
+        f.write(_dumps({
+            'timestamp': datetime.now().isoformat(),
+            'total_articles': len(article_dicts),
+            'sources': sorted(set(article.get('source') or '' for article in article_dicts)),
+            'sequence': sequence
+        }))
+        f.write('\n')
+        for article in article_dicts:
+            f.write(_dumps(article))
+            f.write('\n')
+    return len(article_dicts)
+
+
+def iter_snapshot(path: str = SNAPSHOT_FILE) -> Tuple[Dict, Iterator[Dict]]:
+    """Header of an NDJSON snapshot and an iterator over its articles"""
+    f = open(path, 'r', encoding='utf-8')
+    try:
+        header = json.loads(f.readline() or '{}')
+    except ValueError:
+        f.close()
+        raise
+
+    def articles():
+        with f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+    return header, articles()
+
+
+def read_snapshot(path: str = SNAPSHOT_FILE) -> Tuple[Dict, List[Dict]]:
+    """Header and articles of an NDJSON snapshot"""
+    header, articles = iter_snapshot(path)
+    return header, list(articles)
+
+
+class DeltaLog:
+    """Append-only log of exported articles, one {"seq", "article"} line each
+
+    Sequence numbers keep increasing across restarts and compactions, so a
+    consumer only needs the last number it applied.
+    """
+
+    def __init__(self, path: str = DELTA_LOG_FILE, sequence: int = 0):
+        self.path = path
+        self.sequence = max(sequence, self._last_sequence())
+
+    def _last_sequence(self) -> int:
+        """Sequence of the last complete line in the log, 0 if none"""
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                end = f.tell()
+                f.seek(max(end - 65536, 0))
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return 0
+        for line in reversed(lines):
+            try:
+                return json.loads(line)['seq']
+            except (ValueError, KeyError, TypeError):
+                continue
+        return 0
+
+    def size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+    def append(self, articles) -> int:
+        """Append articles; returns the sequence of the last one"""
+        lines = []
+        for article in articles:
+            self.sequence += 1
+            lines.append(_dumps({'seq': self.sequence, 'article': _article_to_dict(article)}))
+        if lines:
+            # One write per batch, so readers rarely see half a batch
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+        return self.sequence
+
+    def compact(self, through: int):
+        """Drop entries a snapshot already includes (sequence <= through)"""
+        kept = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        if json.loads(line)['seq'] > through:
+                            kept.append(line)
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except FileNotFoundError:
+            return
+        with atomic_write(self.path) as f:
+            f.writelines(kept)
+        logger.info(f"Compacted delta log through sequence {through}, kept {len(kept)}")
+
+
+class DeltaReader:
+    """Tails a delta log, returning only entries not read before
+
+    Remembers the file and offset it stopped at; if the log was compacted
+    (replaced or truncated) it rereads from the start and skips entries by
+    sequence.
+    """
+
+    def __init__(self, path: str = DELTA_LOG_FILE):
+        self.path = path
+        self._inode: Optional[int] = None
+        self._offset = 0
+
+    def reset(self):
+        """Read the log from the start on the next call"""
+        self._inode = None
+        self._offset = 0
+
+    def read_since(self, sequence: int) -> List[Tuple[int, Dict]]:
+        """(sequence, article) entries appended after sequence"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return []
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            self._inode = stat.st_ino
+            self._offset = 0
+        if stat.st_size == self._offset:
+            return []
+
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read(stat.st_size - self._offset)
+        # A batch still being written ends without a newline; leave it
+        complete = data.rfind(b'\n') + 1
+        self._offset += complete
+
+        entries = []
+        for line in data[:complete].splitlines():
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                logger.error(f"Skipping malformed delta line in {self.path}")
+                continue
+            if entry['seq'] > sequence:
+                entries.append((entry['seq'], entry['article']))
+                sequence = entry['seq']
+        return entries
+
+
+class ExportFollower:
+    """Keeps a consumer's articles in step with the aggregator's export
+
+    The snapshot is reloaded only when it is rewritten; in between, each
+    poll applies just the deltas appended since the last one. Deltas newer
+    than a reloaded snapshot are carried over onto it.
+    """
+
+    def __init__(self, snapshot_path: str = SNAPSHOT_FILE,
+                 delta_path: str = DELTA_LOG_FILE):
+        self.snapshot_path = snapshot_path
+        self.reader = DeltaReader(delta_path)
+        # Last delta applied, and the sequence the loaded snapshot ends at
+        self.sequence = 0
+        self.snapshot_sequence = 0
+        self.snapshot_mtime: Optional[float] = None
+        self._articles: Dict[str, Dict] = {}
+        self._deltas: List[Tuple[int, Dict]] = []
+
+    def available(self) -> bool:
+        return os.path.exists(self.snapshot_path)
+
+    def poll(self) -> Optional[List[Dict]]:
+        """Current articles if the export changed since the last poll, else None"""
+        mtime = os.path.getmtime(self.snapshot_path)
+        if mtime != self.snapshot_mtime:
+            header, articles = read_snapshot(self.snapshot_path)
+            snapshot_sequence = header.get('sequence', 0)
+            if snapshot_sequence < self.snapshot_sequence:
+                # The export was recreated from scratch; so was its log
+                self.reader.reset()
+                self.sequence = 0
+                self._deltas = []
+
+            self._deltas = [(sequence, article) for sequence, article in self._deltas
+                            if sequence > snapshot_sequence]
+            self._deltas.extend(self.reader.read_since(max(self.sequence, snapshot_sequence)))
+            self._articles = {article['id']: article for article in articles}
+            self._articles.update((article['id'], article) for _, article in self._deltas)
+
+            self.snapshot_mtime = mtime
+            self.snapshot_sequence = snapshot_sequence
+            self.sequence = max([snapshot_sequence] + [sequence for sequence, _ in self._deltas])
+            logger.info(f"Loaded {len(articles)} articles from {self.snapshot_path} "
+                        f"and {len(self._deltas)} deltas (sequence {self.sequence})")
+            return list(self._articles.values())
+
+        entries = self.reader.read_since(self.sequence)
+        if not entries:
+            return None
+        self._deltas.extend(entries)
+        self._articles.update((article['id'], article) for _, article in entries)
+        self.sequence = entries[-1][0]
+        logger.info(f"Applied {len(entries)} delta articles (sequence {self.sequence})")
+        return list(self._articles.values())
+
+
+class NewsExporter:
+    """Snapshot plus delta log export for the aggregator daemon
+
+    New articles go to the delta log as they arrive; the full snapshot is
+    rewritten only every SNAPSHOT_INTERVAL seconds or when the log grows
+    past DELTA_LOG_MAX_BYTES, and the log is then compacted.
+    """
+
+    def __init__(self, snapshot_path: str = SNAPSHOT_FILE,
+                 delta_path: str = DELTA_LOG_FILE,
+                 snapshot_interval: int = SNAPSHOT_INTERVAL,
+                 max_delta_bytes: int = DELTA_LOG_MAX_BYTES):
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self.max_delta_bytes = max_delta_bytes
+        self.last_snapshot = 0.0
+
+        # Ids already exported, so re-fetched articles are not logged again
+        self._exported: Set[str] = set()
+        sequence = 0
+        try:
+            header, articles = iter_snapshot(snapshot_path)
+            sequence = header.get('sequence', 0)
+            self._exported.update(article.get('id') for article in articles)
+            self.last_snapshot = os.path.getmtime(snapshot_path)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Error reading previous snapshot {snapshot_path}: {e}")
+        self.deltas = DeltaLog(delta_path, sequence=sequence)
+
+    def append(self, articles) -> int:
+        """Log articles not exported before; returns how many were logged"""
+        fresh = []
+        for article in articles:
+            article_dict = _article_to_dict(article)
+            if article_dict['id'] not in self._exported:
+                self._exported.add(article_dict['id'])
+                fresh.append(article_dict)
+        if fresh:
+            self.deltas.append(fresh)
+        return len(fresh)
+
+    def snapshot_due(self, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        return (now - self.last_snapshot >= self.snapshot_interval or
+                self.deltas.size() > self.max_delta_bytes)
+
+    def export_snapshot(self, articles) -> int:
+        """Write a full snapshot including every delta so far, then compact"""
+        article_dicts = [_article_to_dict(article) for article in articles]
+        sequence = self.deltas.sequence
+        count = write_snapshot(article_dicts, self.snapshot_path, sequence=sequence)
+        self._exported = set(article['id'] for article in article_dicts)
+        self.last_snapshot = time.time()
+        if self.deltas.size() > self.max_delta_bytes:
+            self.deltas.compact(sequence)
+        logger.info(f"Exported {count} articles to {self.snapshot_path} "
+                    f"at sequence {sequence}")
+        return count
+
+    def export(self, articles, force: bool = False) -> bool:
+        """Log new articles, and write a snapshot if one is due"""
+        self.append(articles)
+        if force or self.snapshot_due():
+            self.export_snapshot(articles)
+            return True
+        return False
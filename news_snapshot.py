@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+"""
+News Snapshot Engine
+Background refresh of aggregated news into immutable in-memory snapshots
+that API request handlers can read without touching upstream feeds
+"""
+
+import asyncio
+import inspect
+import logging
+import os
+import time
+from array import array
+from bisect import bisect_left
+from collections import abc
+from datetime import datetime
+from types import MappingProxyType
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from article_store import (FILTER_FIELDS, ArticleStore, field_keys,
+                           filter_key, published_timestamp)
+from binary_snapshot import (BINARY_SNAPSHOT_FILE, MappedArticles,
+                             open_binary_snapshot, write_binary_snapshot)
+from leader_lease import FOLLOW_INTERVAL, LeaderLease
+from news_article import intern_value
+from refresh_coordinator import AsyncRefreshCoordinator, DEFAULT_MIN_INTERVAL
+from trending import TrendingEngine
+
+logger = logging.getLogger(__name__)
+
+# Longest sleep between refreshes; sources are polled when they are due
+DEFAULT_REFRESH_INTERVAL = int(os.getenv('NEWS_REFRESH_INTERVAL', 1800))
+DEFAULT_MAX_AGE_HOURS = int(os.getenv('NEWS_SNAPSHOT_MAX_AGE_HOURS', 48))
+DEFAULT_MAX_ARTICLES = int(os.getenv('NEWS_SNAPSHOT_MAX_ARTICLES', 5000))
+# Seconds sources arriving close together wait to share one publish
+DEFAULT_PUBLISH_DELAY = float(os.getenv('NEWS_PUBLISH_DELAY', 0.25))
+
+
+# Distinct filter combinations remembered per snapshot
+MAX_CACHED_SELECTIONS = 256
+
+
+def _article_to_dict(article) -> Dict:
+    """Normalize a NewsArticle or cached dict into a plain dict"""
+    if hasattr(article, 'to_dict'):
+        return article.to_dict()
+    article = dict(article)
+    # Dicts loaded from JSON or SQLite carry their own copies of these
+    for field in ('source', 'category', 'language'):
+        article[field] = intern_value(article.get(field))
+    article['country_focus'] = [
+        intern_value(country) for country in article.get('country_focus') or []]
+    return article
+
+
+def sort_key(article: Dict) -> Tuple[float, str]:
+    """Snapshot order, descending: newest first, ties broken by id"""
+    return published_timestamp(article), article.get('id') or ''
+
+
+def _intersect(postings: List[array]) -> array:
+    """Positions present in every posting list (all sorted ascending)"""
+    postings = sorted(postings, key=len)
+    result = postings[0]
+    for other in postings[1:]:
+        if not result:
+            break
+        matched = array('I')
+        lo = 0
+        hi = len(other)
+        for position in result:
+            # Both lists are sorted, so each search starts where the last ended
+            lo = bisect_left(other, position, lo, hi)
+            if lo == hi:
+                break
+            if other[lo] == position:
+                matched.append(position)
+        result = matched
+    return result
+
+
+class _Subset(abc.Sequence):
+    """Articles at some positions of a snapshot, looked up when read"""
+
+    __slots__ = ('articles', 'positions')
+
+    def __init__(self, articles: Sequence[Dict], positions: Sequence[int]):
+        self.articles = articles
+        self.positions = positions
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return tuple(self.articles[position] for position in self.positions[index])
+        return self.articles[self.positions[index]]
+
+
+class NewsSnapshot:
+    """Immutable, pre-indexed view of the articles served by the API
+
+    Articles are stored newest first, and every filterable field has a
+    posting list per value: the ascending positions of the articles holding
+    that value, which is also published_at order. Multi-filter queries
+    intersect postings starting from the shortest, and a page is a slice
+    of the resulting positions.
+
+    articles may also be the MappedArticles of a binary snapshot, whose
+    indexes are viewed in place and articles decoded only when served.
+    """
+
+    __slots__ = ('version', 'built_at', 'articles', 'postings', 'trending',
+                 'topics', 'store', 'responses', '_selections')
+
+    def __init__(self, articles: Sequence[Dict], version: int = 0,
+                 built_at: Optional[datetime] = None):
+        self.version = version
+        self.built_at = built_at or datetime.now()
+        self.articles = articles
+
+        if isinstance(articles, MappedArticles):
+            postings = articles.postings()
+            trending = articles.trending_positions()
+            # Column arrays for rankings other than newest first
+            self.store = ArticleStore.from_columns(
+                articles.columns(), articles.vocabularies())
+        else:
+            postings, trending = self._index(articles)
+            self.store = ArticleStore(articles)
+
+        self.postings = MappingProxyType(
+            {field: MappingProxyType(postings.get(field, {})) for field in FILTER_FIELDS})
+        # Trending or high engagement articles
+        self.trending = _Subset(articles, trending)
+        # Ranked topics per trending window, attached by the publisher
+        self.topics: Dict[str, Sequence[Dict]] = (
+            articles.topics() if isinstance(articles, MappedArticles) else {})
+        # Pre-rendered responses, attached by the server before publishing
+        self.responses = None
+        # Intersections already computed for this snapshot
+        self._selections: Dict[Tuple, array] = {}
+
+    @staticmethod
+    def _index(articles: Sequence[Dict]) -> Tuple[Dict[str, Dict], array]:
+        """Posting lists per filter field and the trending positions"""
+        postings: Dict[str, Dict] = {field: {} for field in FILTER_FIELDS}
+        trending = array('I')
+
+        for position, article in enumerate(articles):
+            for field in FILTER_FIELDS:
+                for key in field_keys(article, field):
+                    posting = postings[field].get(key)
+                    if posting is None:
+                        posting = postings[field][key] = array('I')
+                    posting.append(position)
+
+            if article.get('is_trending') or article.get('engagement_score', 0) > 7.0:
+                trending.append(position)
+        return postings, trending
+
+    @classmethod
+    def build(cls, articles, version: int = 0) -> 'NewsSnapshot':
+        """Build a snapshot from NewsArticle objects or cached dicts"""
+        article_dicts = [_article_to_dict(article) for article in articles]
+        article_dicts.sort(key=sort_key, reverse=True)
+        return cls(tuple(article_dicts), version=version)
+
+    @classmethod
+    def open(cls, path: str = BINARY_SNAPSHOT_FILE) -> Optional['NewsSnapshot']:
+        """Serve a binary snapshot file from its mapping, or None if unreadable"""
+        articles = open_binary_snapshot(path)
+        if articles is None:
+            return None
+        return cls(articles, version=articles.version,
+                   built_at=datetime.fromtimestamp(articles.built_at))
+
+    def save(self, path: str = BINARY_SNAPSHOT_FILE, sequence: int = 0) -> bool:
+        """Write this snapshot as a binary snapshot file for other processes"""
+        if isinstance(self.articles, MappedArticles):
+            return False
+        write_binary_snapshot(self, path, sequence=sequence)
+        return True
+
+    def __len__(self):
+        return len(self.articles)
+
+    def values(self, field: str) -> List:
+        """Indexed values of a filter field"""
+        return sorted(self.postings[field])
+
+    def select(self, **filters) -> Sequence[int]:
+        """Positions of the articles matching every filter, newest first
+
+        Filters are keyword arguments named after FILTER_FIELDS; None or
+        empty values are ignored. With no filters every position matches.
+        """
+        terms = tuple(sorted((field, filter_key(field, value))
+                             for field, value in filters.items()
+                             if value is not None and value != ''))
+        if not terms:
+            return range(len(self.articles))
+
+        selection = self._selections.get(terms)
+        if selection is None:
+            empty = array('I')
+            postings = [self.postings[field].get(key, empty) for field, key in terms]
+            selection = postings[0] if len(postings) == 1 else _intersect(postings)
+            if len(self._selections) >= MAX_CACHED_SELECTIONS:
+                self._selections.clear()
+            self._selections[terms] = selection
+        return selection
+
+    def page(self, offset: int = 0, limit: int = 20, sort: str = 'recent',
+             **filters) -> Tuple[int, List[Dict]]:
+        """Total matches and one page of matching articles
+
+        'recent' pages are slices of posting lists; other sort orders are
+        ranked by the column store.
+        """
+        articles = self.articles
+        if sort == 'recent':
+            selection = self.select(**filters)
+            total = len(selection)
+            positions = selection[offset:offset + limit]
+        else:
+            total, positions = self.store.rank(sort, offset, limit, **filters)
+            positions = positions.tolist()
+        return total, [articles[position] for position in positions]
+
+    def page_after(self, cursor: Tuple[float, str], limit: int = 20,
+                   **filters) -> Tuple[int, List[Dict], bool]:
+        """Total matches, the page after a cursor key, and whether more follow
+
+        cursor is the sort_key of the last article already seen; the
+        position after it is found by binary search, so any page costs
+        O(log n + limit) however deep, and stays correct across snapshots.
+        """
+        selection = self.select(**filters)
+        articles = self.articles
+        published_at = self.store.published_at
+
+        lo, hi = 0, len(selection)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            position = selection[mid]
+            if (published_at[position], articles[position].get('id') or '') < cursor:
+                hi = mid
+            else:
+                lo = mid + 1
+
+        positions = selection[lo:lo + limit]
+        return (len(selection), [articles[position] for position in positions],
+                lo + limit < len(selection))
+
+    def query(self, category: Optional[str] = None, country: Optional[str] = None,
+              **filters) -> Tuple[Dict, ...]:
+        """Return articles matching the given filters, newest first"""
+        selection = self.select(category=category, country=country, **filters)
+        if isinstance(selection, range):
+            return self.articles
+        articles = self.articles
+        return tuple(articles[position] for position in selection)
+
+
+class SnapshotWatcher:
+    """Maps a binary snapshot file again whenever it has been replaced"""
+
+    def __init__(self, path: str = BINARY_SNAPSHOT_FILE):
+        self.path = path
+        self._signature: Optional[Tuple[int, int, int]] = None
+
+    def poll(self) -> Optional[NewsSnapshot]:
+        """The file's snapshot if it changed since the last poll, else None"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        # Writers replace the file by rename, so a new inode is a new snapshot
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return None
+        snapshot = NewsSnapshot.open(self.path)
+        if snapshot is not None:
+            self._signature = signature
+        return snapshot
+
+
+class StagedPublisher:
+    """Publishes articles shortly after their source arrives, in small batches
+
+    The first staged batch starts a timer on the running loop; whatever is
+    staged before it fires goes out in one publish, so a burst of fast
+    sources costs one snapshot rebuild instead of one each. publish may be
+    a coroutine function; aflush waits for the publishes it started.
+    """
+
+    def __init__(self, publish: Callable[[List], object],
+                 delay: float = DEFAULT_PUBLISH_DELAY):
+        self.publish = publish
+        self.delay = delay
+        self._staged: List = []
+        self._handle: Optional[asyncio.TimerHandle] = None
+        self._pending: List[asyncio.Future] = []
+
+    def stage(self, articles):
+        """Queue one source's articles for the next publish"""
+        self._staged.extend(articles)
+        if self._handle is None:
+            self._handle = asyncio.get_running_loop().call_later(
+                self.delay, self.flush)
+
+    def flush(self):
+        """Publish everything staged so far"""
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        staged, self._staged = self._staged, []
+        if staged:
+            try:
+                result = self.publish(staged)
+                if inspect.isawaitable(result):
+                    self._pending.append(asyncio.ensure_future(self._finish(result)))
+            except Exception as e:
+                logger.error(f"Error publishing staged articles: {e}")
+
+    async def _finish(self, result):
+        try:
+            await result
+        except Exception as e:
+            logger.error(f"Error publishing staged articles: {e}")
+
+    async def aflush(self):
+        """Publish everything staged so far and wait for it to be published"""
+        self.flush()
+        pending, self._pending = self._pending, []
+        if pending:
+            await asyncio.gather(*pending)
+
+
+class SnapshotEngine:
+    """Refreshes the news snapshot in the background and swaps it atomically"""
+
+    def __init__(self, aggregator, refresh_interval: int = DEFAULT_REFRESH_INTERVAL,
+                 max_age_hours: int = DEFAULT_MAX_AGE_HOURS,
+                 max_articles: int = DEFAULT_MAX_ARTICLES,
+                 min_refresh_interval: float = DEFAULT_MIN_INTERVAL,
+                 render_responses: Optional[Callable[[NewsSnapshot], object]] = None,
+                 publish_delay: float = DEFAULT_PUBLISH_DELAY,
+                 snapshot_path: Optional[str] = BINARY_SNAPSHOT_FILE,
+                 lease: Optional[LeaderLease] = None):
+        self.aggregator = aggregator
+        self.publish_delay = publish_delay
+        # Binary snapshot seeded from at startup and saved after each pass;
+        # None keeps the engine in memory only
+        self.snapshot_path = snapshot_path
+        self._watcher = SnapshotWatcher(snapshot_path) if snapshot_path else None
+        self._saved_version = 0
+        # With a lease, only its holder aggregates; other workers follow the
+        # snapshot file it saves
+        self.lease = lease
+        # Called with each new snapshot before it is swapped in
+        self.render_responses = render_responses
+        self.refresh_interval = refresh_interval
+        self.max_age_hours = max_age_hours
+        self.max_articles = max_articles
+        self._snapshot = NewsSnapshot(())
+        # One snapshot build at a time, each merging over the last one
+        self._publish_lock = asyncio.Lock()
+        # Topic counts, updated with each batch of published articles
+        self.trending = TrendingEngine()
+        self._coordinator = AsyncRefreshCoordinator(
+            self._aggregate_and_publish, min_interval=min_refresh_interval)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def current(self) -> NewsSnapshot:
+        """The snapshot request handlers should read from"""
+        return self._snapshot
+
+    @property
+    def is_leader(self) -> bool:
+        """Whether this engine aggregates, rather than following the file"""
+        return self.lease is None or self.lease.is_leader
+
+    def publish(self, articles) -> NewsSnapshot:
+        """Merge fresh articles over the current snapshot and swap it in
+
+        Builds on the calling thread; the refresh loop uses publish_async.
+        """
+        snapshot = self.build_snapshot(self._snapshot, articles)
+        self._swap(snapshot)
+        return snapshot
+
+    async def publish_async(self, articles) -> NewsSnapshot:
+        """publish, with the build run in the default executor
+
+        Merging, indexing and pre-rendering compressed responses take long
+        enough to stall request handlers, so only the swap runs on the loop.
+        """
+        async with self._publish_lock:
+            snapshot = await asyncio.get_running_loop().run_in_executor(
+                None, self.build_snapshot, self._snapshot, articles)
+            self._swap(snapshot)
+        return snapshot
+
+    def build_snapshot(self, previous: NewsSnapshot, articles) -> NewsSnapshot:
+        """The snapshot that follows previous once articles are merged in"""
+        merged = {article['id']: article for article in previous.articles}
+        for article in articles:
+            article_data = _article_to_dict(article)
+            merged[article_data['id']] = article_data
+
+        # Drop articles that have aged out of the retention window; naive
+        # published_at values are UTC, so compare epoch seconds
+        cutoff = time.time() - self.max_age_hours * 3600
+        retained = [a for a in merged.values()
+                    if published_timestamp(a) >= cutoff]
+        retained.sort(key=sort_key, reverse=True)
+
+        snapshot = NewsSnapshot(
+            tuple(retained[:self.max_articles]), version=previous.version + 1)
+        try:
+            self.trending.add(articles)
+            snapshot.topics = self.trending.rankings()
+        except Exception as e:
+            logger.error(f"Error updating trending topics: {e}")
+        if self.render_responses is not None:
+            try:
+                snapshot.responses = self.render_responses(snapshot)
+            except Exception as e:
+                logger.error(f"Error pre-rendering snapshot responses: {e}")
+        return snapshot
+
+    def _swap(self, snapshot: NewsSnapshot):
+        # Single reference assignment, so readers see either snapshot whole
+        self._snapshot = snapshot
+        logger.info(
+            f"Published snapshot v{snapshot.version} with {len(snapshot)} articles")
+
+    def seed_from_cache(self) -> NewsSnapshot:
+        """Load the last snapshot so the API can serve immediately
+
+        A binary snapshot is mapped without parsing any articles; the
+        database cache is the fallback.
+        """
+        if self._watcher is not None:
+            snapshot = self._watcher.poll()
+            if snapshot is not None:
+                self._snapshot = snapshot
+                self._saved_version = snapshot.version
+                logger.info(f"Mapped snapshot v{snapshot.version} with "
+                            f"{len(snapshot)} articles from {self.snapshot_path}")
+                return snapshot
+        cached_articles = self.aggregator.get_cached_articles()
+        if cached_articles:
+            return self.publish(cached_articles)
+        return self._snapshot
+
+    def follow(self) -> bool:
+        """Swap in the snapshot file if the leader has saved a new one"""
+        if self._watcher is None:
+            return False
+        snapshot = self._watcher.poll()
+        if snapshot is None:
+            return False
+        if self.render_responses is not None:
+            try:
+                snapshot.responses = self.render_responses(snapshot)
+            except Exception as e:
+                logger.error(f"Error pre-rendering snapshot responses: {e}")
+        self._snapshot = snapshot
+        self._saved_version = snapshot.version
+        logger.info(f"Following snapshot v{snapshot.version} with {len(snapshot)} articles")
+        return True
+
+    async def refresh(self):
+        """Refresh every source now, sharing any aggregation already in flight
+
+        A worker that is not the leader only picks up the leader's latest
+        snapshot. Sources are marked due only if a new run starts, so a
+        refresh skipped as still fresh leaves the poll schedule alone.
+        """
+        if not self.is_leader:
+            self.follow()
+            return []
+        return await self._coordinator.refresh(
+            on_run=self.aggregator.poll_scheduler.mark_due)
+
+    async def _aggregate_and_publish(self):
+        """Poll the sources that are due, publishing each as it arrives"""
+        publisher = StagedPublisher(self.publish_async, self.publish_delay)
+        try:
+            return await self.aggregator.aggregate_due_sources(
+                on_articles=publisher.stage)
+        finally:
+            await publisher.aflush()
+            await self.save()
+
+    async def save(self):
+        """Write the current snapshot to the binary file if it has changed"""
+        snapshot = self._snapshot
+        if not self.snapshot_path or snapshot.version == self._saved_version:
+            return
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, snapshot.save, self.snapshot_path)
+            self._saved_version = snapshot.version
+        except Exception as e:
+            logger.error(f"Error saving binary snapshot: {e}")
+
+    def next_refresh_delay(self) -> float:
+        """Seconds until the next source is due, within sane bounds"""
+        delay = self.aggregator.poll_scheduler.seconds_until_next()
+        # Not sooner than the coordinator would allow another fetch
+        return min(max(delay, self._coordinator.min_interval), self.refresh_interval)
+
+    async def run(self):
+        """Refresh forever, waking whenever a source is due
+
+        Followers check the snapshot file instead, and take over
+        aggregating once their lease makes them leader.
+        """
+        while True:
+            if not self.is_leader:
+                try:
+                    self.follow()
+                except Exception as e:
+                    logger.error(f"Following snapshot failed: {e}")
+                await asyncio.sleep(FOLLOW_INTERVAL)
+                continue
+
+            try:
+                await self._coordinator.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Snapshot refresh failed: {e}")
+
+            if self.lease is None:
+                await asyncio.sleep(self.next_refresh_delay())
+                continue
+            # Wake early on losing the lease, to follow the new leader
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.next_refresh_delay()
+            while self.is_leader and loop.time() < deadline:
+                await asyncio.sleep(min(FOLLOW_INTERVAL, deadline - loop.time()))
+
+    def start(self) -> asyncio.Task:
+        """Start the background refresh task on the running loop"""
+        if self.lease is not None:
+            self.lease.start()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        """Cancel the background refresh task and release any lease"""
+        if self.lease is not None:
+            self.lease.stop()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Cursor Pagination
+Opaque cursors over the (published_at, id) ordering shared by the snapshot
+and the SQLite article table, so a scroll position survives refreshes
+"""
+
+import base64
+import json
+from typing import Dict, Optional, Tuple
+
+from article_store import published_timestamp
+
+
+def encode_cursor(article: Dict) -> str:
+    """Cursor pointing just past the given article"""
+    published_at = article.get('published_at')
+    if hasattr(published_at, 'isoformat'):
+        published_at = published_at.isoformat()
+    data = json.dumps([published_at or '', article['id']], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """(published_at, id) of a cursor; ValueError if it is not one of ours"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        published_at, article_id = json.loads(
+            base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(published_at, str) or not isinstance(article_id, str):
+        raise ValueError("Invalid cursor")
+    return published_at, article_id
+
+
+def cursor_sort_key(cursor: Tuple[str, str]) -> Tuple[float, str]:
+    """Snapshot sort key of a decoded cursor"""
+    published_at, article_id = cursor
+    return published_timestamp({'published_at': published_at}), article_id
+
+
+def next_cursor(articles, has_more: bool) -> Optional[str]:
+    """Cursor for the page after these articles, or None on the last page"""
+    if not has_more or not articles:
+        return None
+    return encode_cursor(articles[-1])
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Adaptive Poll Scheduler
+Per-source polling intervals learned from how many new entries each feed
+publishes, with exponential backoff for failing sources and jitter so polls
+do not line up
+"""
+
+import logging
+import os
+import random
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bounds on the time between two polls of one source, in seconds
+MIN_POLL_INTERVAL = float(os.getenv('NEWS_POLL_MIN_INTERVAL', 180))
+MAX_POLL_INTERVAL = float(os.getenv('NEWS_POLL_MAX_INTERVAL', 3600))
+# Interval for a source whose publish rate is not known yet
+INITIAL_POLL_INTERVAL = float(os.getenv('NEWS_POLL_INITIAL_INTERVAL', 900))
+# New entries a poll should find on average
+TARGET_NEW_ENTRIES = float(os.getenv('NEWS_POLL_TARGET_NEW', 2))
+# Weight of the latest observation in the publish rate average
+RATE_ALPHA = float(os.getenv('NEWS_POLL_RATE_ALPHA', 0.3))
+# Intervals are spread by up to this fraction either way
+POLL_JITTER = float(os.getenv('NEWS_POLL_JITTER', 0.1))
+
+
+class SourceSchedule:
+    """Polling state of one source"""
+
+    __slots__ = ('name', 'interval', 'rate', 'last_polled', 'next_due',
+                 'failures')
+
+    def __init__(self, name: str, interval: float, next_due: float):
+        self.name = name
+        self.interval = interval
+        # New entries per second (EWMA); None until two polls were seen
+        self.rate: Optional[float] = None
+        self.last_polled: Optional[float] = None
+        self.next_due = next_due
+        self.failures = 0
+
+
+class PollScheduler:
+    """Decides which sources are due and when each should be polled next
+
+    Not thread-safe; the aggregation that drives it runs one poll at a time.
+    With a db_path, flush() records the schedule for other processes to
+    report; it is never read back into a scheduler.
+    """
+
+    def __init__(self, sources: Iterable[str],
+                 min_interval: float = MIN_POLL_INTERVAL,
+                 max_interval: float = MAX_POLL_INTERVAL,
+                 initial_interval: float = INITIAL_POLL_INTERVAL,
+                 target_new_entries: float = TARGET_NEW_ENTRIES,
+                 alpha: float = RATE_ALPHA, jitter: float = POLL_JITTER,
+                 now: Optional[float] = None, db_path: Optional[str] = None,
+                 writer=None):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.initial_interval = initial_interval
+        self.target_new_entries = target_new_entries
+        self.alpha = alpha
+        self.jitter = jitter
+
+        # Every source is due straight away on startup
+        now = time.time() if now is None else now
+        self.sources: Dict[str, SourceSchedule] = {
+            name: SourceSchedule(name, initial_interval, now) for name in sources}
+
+        self.db_path = db_path
+        # Optional SQLiteWriter; without one, flush() opens its own connection
+        self.writer = writer
+        if db_path is not None:
+            self.init_table()
+
+    def init_table(self):
+        """Create the poll schedule table if needed"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS poll_schedule (
+                    source TEXT PRIMARY KEY,
+                    interval_seconds INTEGER NOT NULL,
+                    new_per_hour REAL,
+                    failures INTEGER NOT NULL,
+                    next_due REAL NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            logger.error(f"Poll schedule table initialization error: {e}")
+
+    def _clamp(self, interval: float) -> float:
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def _schedule(self, state: SourceSchedule, interval: float, now: float):
+        state.interval = interval
+        spread = random.uniform(1 - self.jitter, 1 + self.jitter)
+        state.next_due = now + interval * spread
+
+    def due(self, now: Optional[float] = None) -> List[str]:
+        """Sources whose next poll time has passed, most overdue first"""
+        now = time.time() if now is None else now
+        due = [state for state in self.sources.values() if state.next_due <= now]
+        due.sort(key=lambda state: state.next_due)
+        return [state.name for state in due]
+
+    def seconds_until_next(self, now: Optional[float] = None) -> float:
+        """Time until the next source is due, 0 if one already is"""
+        if not self.sources:
+            return self.max_interval
+        now = time.time() if now is None else now
+        next_due = min(state.next_due for state in self.sources.values())
+        return max(next_due - now, 0.0)
+
+    def mark_due(self, names: Optional[Iterable[str]] = None):
+        """Make sources (all by default) due now, e.g. for a manual refresh"""
+        now = time.time()
+        for name in self.sources if names is None else names:
+            state = self.sources.get(name)
+            if state is not None:
+                state.next_due = min(state.next_due, now)
+
+    def defer(self, name: str, until: float):
+        """Hold a source back until the given time, e.g. while its circuit is open"""
+        state = self.sources.get(name)
+        if state is not None:
+            state.next_due = max(state.next_due, until)
+
+    def record_success(self, name: str, new_entries: int, saturated: bool = False,
+                       now: Optional[float] = None):
+        """Learn from a successful poll that found new_entries new entries
+
+        saturated means every entry the feed returned was new, so entries
+        may have been missed and the observed rate is only a lower bound.
+        """
+        state = self.sources.get(name)
+        if state is None:
+            return
+        now = time.time() if now is None else now
+        state.failures = 0
+
+        if state.last_polled is not None and now > state.last_polled:
+            observed = new_entries / (now - state.last_polled)
+            state.rate = (observed if state.rate is None else
+                          self.alpha * observed + (1 - self.alpha) * state.rate)
+        state.last_polled = now
+
+        if saturated:
+            # Catch up quickly instead of waiting for the average to move
+            interval = self._clamp(state.interval / 2)
+        elif state.rate is None:
+            interval = self.initial_interval
+        elif state.rate <= 0:
+            interval = self.max_interval
+        else:
+            interval = self._clamp(self.target_new_entries / state.rate)
+        self._schedule(state, interval, now)
+
+    def record_failure(self, name: str, now: Optional[float] = None):
+        """Back off exponentially from a source that could not be fetched"""
+        state = self.sources.get(name)
+        if state is None:
+            return
+        now = time.time() if now is None else now
+        state.failures += 1
+        # The learned interval is kept for when the source recovers
+        backoff = max(min(self.min_interval * 2 ** state.failures, self.max_interval),
+                      state.interval)
+        spread = random.uniform(1 - self.jitter, 1 + self.jitter)
+        state.next_due = now + backoff * spread
+        logger.info(f"Backing off {name} for {backoff:.0f}s "
+                    f"after {state.failures} failure(s)")
+
+    def stats(self) -> Dict[str, Dict]:
+        """Current interval, publish rate and failures per source"""
+        return {
+            name: {
+                'interval_seconds': round(state.interval),
+                'new_per_hour': (round(state.rate * 3600, 2)
+                                 if state.rate is not None else None),
+                'failures': state.failures,
+                'next_due': state.next_due,
+            }
+            for name, state in self.sources.items()
+        }
+
+    def flush(self):
+        """Write the current schedule of every source"""
+        if self.db_path is None:
+            return
+
+        sql = '''
+            INSERT OR REPLACE INTO poll_schedule
+                (source, interval_seconds, new_per_hour, failures, next_due, updated_at)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        '''
+        rows = [(name, stats['interval_seconds'], stats['new_per_hour'],
+                 stats['failures'], stats['next_due'])
+                for name, stats in self.stats().items()]
+        try:
+            if self.writer is not None:
+                self.writer.submit(sql, rows)
+            else:
+                conn = sqlite3.connect(self.db_path)
+                conn.executemany(sql, rows)
+                conn.commit()
+                conn.close()
+        except Exception as e:
+            logger.error(f"Error saving poll schedule: {e}")
+
+
+def load_poll_stats(db_path: str) -> Dict[str, Dict]:
+    """Schedule stats last flushed by whichever process polls, as stats() returns them"""
+    try:
+        conn = sqlite3.connect(db_path)
+        rows = conn.execute('''
+            SELECT source, interval_seconds, new_per_hour, failures, next_due
+            FROM poll_schedule
+        ''').fetchall()
+        conn.close()
+    except Exception as e:
+        logger.error(f"Error loading poll schedule: {e}")
+        return {}
+    return {
+        source: {
+            'interval_seconds': interval_seconds,
+            'new_per_hour': new_per_hour,
+            'failures': failures,
+            'next_due': next_due,
+        }
+        for source, interval_seconds, new_per_hour, failures, next_due in rows
+    }
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Refresh Coordinator
+Single-flight coalescing for news refreshes, so concurrent callers share one
+upstream aggregation instead of each fanning out to every feed
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between two real upstream fetches
+DEFAULT_MIN_INTERVAL = float(os.getenv('NEWS_MIN_REFRESH_INTERVAL', 60))
+
+
+class _Flight:
+    """A refresh in progress that other callers can wait on"""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class RefreshCoordinator:
+    """Single-flight wrapper around a blocking refresh function (thread-safe)"""
+
+    def __init__(self, refresh_func: Callable[[], Any],
+                 min_interval: float = DEFAULT_MIN_INTERVAL):
+        self.refresh_func = refresh_func
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._inflight: Optional[_Flight] = None
+        self._last_result = None
+        self._last_finished: Optional[float] = None
+
+    def refresh(self, on_run: Optional[Callable[[], Any]] = None):
+        """Run the refresh, join the one in flight, or reuse a recent result
+
+        on_run is called only when this call starts a new run.
+        """
+        with self._lock:
+            flight = self._inflight
+            is_leader = False
+
+            if flight is None:
+                if (self._last_finished is not None and
+                        time.monotonic() - self._last_finished < self.min_interval):
+                    logger.info("Refresh skipped: last fetch is still fresh")
+                    return self._last_result
+
+                flight = _Flight()
+                self._inflight = flight
+                is_leader = True
+
+        if is_leader:
+            try:
+                if on_run is not None:
+                    on_run()
+                flight.result = self.refresh_func()
+            except BaseException as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    self._inflight = None
+                    if flight.error is None:
+                        self._last_result = flight.result
+                        self._last_finished = time.monotonic()
+                flight.done.set()
+        else:
+            logger.info("Joining refresh already in progress")
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+
+class AsyncRefreshCoordinator:
+    """Single-flight wrapper around a refresh coroutine function"""
+
+    def __init__(self, refresh_func: Callable[[], Awaitable[Any]],
+                 min_interval: float = DEFAULT_MIN_INTERVAL):
+        self.refresh_func = refresh_func
+        self.min_interval = min_interval
+        self._inflight: Optional[asyncio.Task] = None
+        self._last_result = None
+        self._last_finished: Optional[float] = None
+
+    async def refresh(self, on_run: Optional[Callable[[], Any]] = None):
+        """Run the refresh, join the one in flight, or reuse a recent result
+
+        on_run is called only when this call starts a new run.
+        """
+        if self._inflight is None:
+            if (self._last_finished is not None and
+                    time.monotonic() - self._last_finished < self.min_interval):
+                logger.info("Refresh skipped: last fetch is still fresh")
+                return self._last_result
+
+            if on_run is not None:
+                on_run()
+            self._inflight = asyncio.get_running_loop().create_task(self._run())
+        else:
+            logger.info("Joining refresh already in progress")
+
+        # Shield so one cancelled caller does not abort the shared refresh
+        return await asyncio.shield(self._inflight)
+
+    async def _run(self):
+        """Execute the refresh and remember its result"""
+        try:
+            result = await self.refresh_func()
+            self._last_result = result
+            self._last_finished = time.monotonic()
+            return result
+        finally:
+            self._inflight = None
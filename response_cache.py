@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Response Cache
+JSON responses rendered to bytes once per snapshot, with gzip and (if the
+brotli package is installed) brotli variants, strong ETags tied to the
+snapshot version, and If-None-Match handling
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 6
+
+# Clients revalidate every time; unchanged data costs a 304 and no body
+CACHE_CONTROL = 'no-cache'
+
+
+def snapshot_tag(snapshot) -> str:
+    """Identifies one published snapshot, also across server restarts"""
+    return f"{snapshot.version}-{int(snapshot.built_at.timestamp())}"
+
+
+def encode_json(payload) -> bytes:
+    """Compact UTF-8 JSON body"""
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'),
+                      default=str).encode('utf-8')
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> Set[str]:
+    """Content codings a client accepts, from its Accept-Encoding header"""
+    accepted = set()
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = params.strip()
+        if q.startswith('q='):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                pass
+        accepted.add(coding)
+    return accepted
+
+
+def _etag_values(if_none_match: Optional[str]) -> Set[str]:
+    # Weak comparison, as RFC 9110 requires for If-None-Match
+    return {tag.strip()[2:] if tag.strip().startswith('W/') else tag.strip()
+            for tag in (if_none_match or '').split(',') if tag.strip()}
+
+
+def not_modified(if_none_match: Optional[str], etags: Iterable[str]) -> bool:
+    """True if If-None-Match names any of the given ETags (or is *)"""
+    values = _etag_values(if_none_match)
+    return '*' in values or any(etag in values for etag in etags)
+
+
+def dynamic_etag(tag: str, key: str) -> str:
+    """ETag for a response computed per request from one snapshot"""
+    digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+    return f'"{tag}-{digest}"'
+
+
+class RenderedResponse:
+    """A JSON body with its compressed variants and their strong ETags"""
+
+    __slots__ = ('body', 'variants', 'etags')
+
+    def __init__(self, payload, tag: str):
+        self.body = encode_json(payload)
+        self.variants: Dict[str, bytes] = {
+            'gzip': gzip.compress(self.body, compresslevel=GZIP_LEVEL, mtime=0)}
+        if brotli is not None:
+            self.variants['br'] = brotli.compress(self.body, quality=BROTLI_QUALITY)
+
+        # Each content coding is a different representation, so each gets
+        # its own strong validator
+        base = f"{tag}-{hashlib.sha1(self.body).hexdigest()[:16]}"
+        self.etags = {None: f'"{base}"'}
+        for encoding in self.variants:
+            self.etags[encoding] = f'"{base}-{encoding}"'
+
+    def select(self, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """Smallest variant the client accepts, and its content coding"""
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in ('br', 'gzip'):
+            if encoding in self.variants and encoding in accepted:
+                return self.variants[encoding], encoding
+        return self.body, None
+
+    def is_not_modified(self, if_none_match: Optional[str]) -> bool:
+        """True if the client already holds any variant of this response"""
+        return not_modified(if_none_match, self.etags.values())
+
+    def headers(self, encoding: Optional[str]) -> Dict[str, str]:
+        """Response headers for the variant with the given content coding"""
+        headers = {
+            'ETag': self.etags[encoding],
+            'Vary': 'Accept-Encoding',
+            'Cache-Control': CACHE_CONTROL,
+        }
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return headers
+
+
+class ResponseCache:
+    """Responses pre-rendered for one snapshot, looked up by key"""
+
+    def __init__(self, tag: str):
+        self.tag = tag
+        self._responses: Dict[str, RenderedResponse] = {}
+
+    def __len__(self):
+        return len(self._responses)
+
+    def add(self, key: str, payload) -> RenderedResponse:
+        """Render a payload and store it under key"""
+        response = self._responses[key] = RenderedResponse(payload, self.tag)
+        return response
+
+    def get(self, key: str) -> Optional[RenderedResponse]:
+        return self._responses.get(key)
+
+    def size(self) -> int:
+        """Total bytes held, across all variants"""
+        return sum(len(response.body) + sum(len(v) for v in response.variants.values())
+                   for response in self._responses.values())
@@ -5,7 +5,7 @@ echo "Installing Python dependencies..."
 pip install -r requirements.txt
 
 # Install Flask if not already included
-pip install flask flask-cors schedule
+pip install flask flask-cors
 
 echo "Python dependencies installed successfully!"
 
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Source Health
+Per-source success rate, latency and failure streaks persisted in SQLite,
+with a circuit breaker that stops polling dead feeds and probes them later
+"""
+
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Consecutive failures that open a source's circuit
+FAILURE_THRESHOLD = int(os.getenv('NEWS_CIRCUIT_FAILURE_THRESHOLD', 3))
+# Seconds an open circuit waits before the next probe; doubles per failed probe
+OPEN_SECONDS = float(os.getenv('NEWS_CIRCUIT_OPEN_SECONDS', 600))
+MAX_OPEN_SECONDS = float(os.getenv('NEWS_CIRCUIT_MAX_OPEN_SECONDS', 6 * 3600))
+# Request timeouts: healthy sources, and slow or probing ones
+FEED_TIMEOUT = float(os.getenv('NEWS_FEED_TIMEOUT', 20))
+PROBE_TIMEOUT = float(os.getenv('NEWS_PROBE_TIMEOUT', 8))
+# Latency average above which a source counts as slow
+SLOW_LATENCY = float(os.getenv('NEWS_SLOW_SOURCE_SECONDS', 8))
+# Weight of the latest request in the success rate and latency averages
+HEALTH_ALPHA = 0.2
+
+STATE_CLOSED = 'closed'
+STATE_OPEN = 'open'
+STATE_HALF_OPEN = 'half_open'
+
+HEALTH_COLUMNS = (
+    'source', 'state', 'successes', 'failures', 'consecutive_failures',
+    'success_rate', 'latency_ewma', 'opened_until', 'last_success',
+    'last_failure', 'last_error'
+)
+
+
+class SourceHealth:
+    """Health record of one source"""
+
+    __slots__ = HEALTH_COLUMNS
+
+    def __init__(self, source: str, state: str = STATE_CLOSED, successes: int = 0,
+                 failures: int = 0, consecutive_failures: int = 0,
+                 success_rate: float = 1.0, latency_ewma: Optional[float] = None,
+                 opened_until: float = 0.0, last_success: Optional[str] = None,
+                 last_failure: Optional[str] = None, last_error: Optional[str] = None):
+        self.source = source
+        self.state = state
+        self.successes = successes
+        self.failures = failures
+        self.consecutive_failures = consecutive_failures
+        self.success_rate = success_rate
+        self.latency_ewma = latency_ewma
+        self.opened_until = opened_until
+        self.last_success = last_success
+        self.last_failure = last_failure
+        self.last_error = last_error
+
+    def to_row(self):
+        return tuple(getattr(self, column) for column in HEALTH_COLUMNS)
+
+    def to_dict(self) -> Dict:
+        data = {column: getattr(self, column) for column in HEALTH_COLUMNS}
+        data['success_rate'] = round(self.success_rate, 3)
+        if self.latency_ewma is not None:
+            data['latency_ewma'] = round(self.latency_ewma, 3)
+        data['opened_until'] = (datetime.fromtimestamp(self.opened_until).isoformat()
+                                if self.state != STATE_CLOSED else None)
+        return data
+
+
+class SourceHealthStore:
+    """Health records for every source, kept in memory and flushed to SQLite
+
+    Not thread-safe; the aggregation that updates it runs one poll at a time.
+    """
+
+    def __init__(self, db_path: str, writer=None,
+                 failure_threshold: int = FAILURE_THRESHOLD,
+                 open_seconds: float = OPEN_SECONDS,
+                 max_open_seconds: float = MAX_OPEN_SECONDS):
+        self.db_path = db_path
+        # Optional SQLiteWriter; without one, flush() opens its own connection
+        self.writer = writer
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+
+        self._sources: Dict[str, SourceHealth] = {}
+        self._dirty = set()
+
+        self.init_table()
+        self.load()
+
+    def init_table(self):
+        """Create the source health table if needed"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS source_health (
+                    source TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    successes INTEGER NOT NULL,
+                    failures INTEGER NOT NULL,
+                    consecutive_failures INTEGER NOT NULL,
+                    success_rate REAL NOT NULL,
+                    latency_ewma REAL,
+                    opened_until REAL NOT NULL,
+                    last_success TEXT,
+                    last_failure TEXT,
+                    last_error TEXT,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            conn.commit()
+            conn.close()
+        except Exception as e:
+            logger.error(f"Source health table initialization error: {e}")
+
+    def load(self):
+        """Load the stored health of every source"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            rows = conn.execute(
+                f"SELECT {', '.join(HEALTH_COLUMNS)} FROM source_health").fetchall()
+            conn.close()
+            for row in rows:
+                self._sources[row[0]] = SourceHealth(*row)
+            logger.info(f"Loaded health of {len(rows)} sources")
+        except Exception as e:
+            logger.error(f"Error loading source health: {e}")
+
+    def reload(self):
+        """Replace the in-memory records with the stored ones
+
+        For processes that report health another process records.
+        """
+        self._sources.clear()
+        self._dirty.clear()
+        self.load()
+
+    def get(self, source: str) -> SourceHealth:
+        health = self._sources.get(source)
+        if health is None:
+            health = self._sources[source] = SourceHealth(source)
+        return health
+
+    def allow(self, source: str, now: Optional[float] = None) -> bool:
+        """Whether a source may be polled; an open circuit lets one probe through"""
+        health = self.get(source)
+        if health.state == STATE_CLOSED:
+            return True
+        now = time.time() if now is None else now
+        if now < health.opened_until:
+            return False
+        if health.state == STATE_OPEN:
+            health.state = STATE_HALF_OPEN
+            self._dirty.add(source)
+            logger.info(f"Probing {source} after its circuit was open")
+        return True
+
+    def retry_at(self, source: str) -> float:
+        """When a source with an open circuit may be polled again, else 0"""
+        health = self.get(source)
+        return health.opened_until if health.state != STATE_CLOSED else 0.0
+
+    def timeout_for(self, source: str) -> float:
+        """Request timeout: short for probes and slow sources"""
+        health = self.get(source)
+        if health.state != STATE_CLOSED:
+            return PROBE_TIMEOUT
+        if health.latency_ewma is not None and health.latency_ewma > SLOW_LATENCY:
+            return PROBE_TIMEOUT
+        return FEED_TIMEOUT
+
+    def _observe(self, health: SourceHealth, ok: bool, latency: float):
+        health.success_rate = (HEALTH_ALPHA * (1.0 if ok else 0.0)
+                               + (1 - HEALTH_ALPHA) * health.success_rate)
+        health.latency_ewma = (latency if health.latency_ewma is None else
+                               HEALTH_ALPHA * latency + (1 - HEALTH_ALPHA) * health.latency_ewma)
+        self._dirty.add(health.source)
+
+    def record_success(self, source: str, latency: float):
+        """A request that got a usable response after latency seconds"""
+        health = self.get(source)
+        self._observe(health, True, latency)
+        health.successes += 1
+        health.last_success = datetime.now().isoformat()
+        if health.state != STATE_CLOSED:
+            logger.info(f"Circuit closed for {source}")
+        health.state = STATE_CLOSED
+        health.consecutive_failures = 0
+        health.opened_until = 0.0
+
+    def record_failure(self, source: str, latency: float, error: str,
+                       now: Optional[float] = None):
+        """A failed request; opens the circuit once failures pile up"""
+        health = self.get(source)
+        self._observe(health, False, latency)
+        health.failures += 1
+        health.consecutive_failures += 1
+        health.last_failure = datetime.now().isoformat()
+        health.last_error = error
+
+        if (health.state == STATE_HALF_OPEN or
+                health.consecutive_failures >= self.failure_threshold):
+            # Each failed probe doubles the wait before the next one
+            streak = max(health.consecutive_failures - self.failure_threshold, 0)
+            wait = min(self.open_seconds * 2 ** streak, self.max_open_seconds)
+            now = time.time() if now is None else now
+            health.state = STATE_OPEN
+            health.opened_until = now + wait
+            logger.warning(f"Circuit open for {source} for {wait:.0f}s "
+                           f"after {health.consecutive_failures} failures ({error})")
+
+    def report(self) -> List[Dict]:
+        """Health of every known source, least healthy first"""
+        return [health.to_dict() for health in sorted(
+            self._sources.values(),
+            key=lambda health: (health.state == STATE_CLOSED, health.success_rate))]
+
+    def flush(self):
+        """Write changed health records"""
+        if not self._dirty:
+            return
+
+        sql = f'''
+            INSERT OR REPLACE INTO source_health ({', '.join(HEALTH_COLUMNS)}, updated_at)
+            VALUES ({', '.join('?' for _ in HEALTH_COLUMNS)}, CURRENT_TIMESTAMP)
+        '''
+        rows = [self._sources[source].to_row() for source in self._dirty]
+        try:
+            if self.writer is not None:
+                self.writer.submit(sql, rows)
+            else:
+                conn = sqlite3.connect(self.db_path)
+                conn.executemany(sql, rows)
+                conn.commit()
+                conn.close()
+            self._dirty.clear()
+        except Exception as e:
+            logger.error(f"Error saving source health: {e}")
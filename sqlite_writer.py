@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+SQLite Writer
+Dedicated writer thread that owns one long-lived WAL-mode connection and
+commits queued writes in batches with executemany
+"""
+
+import logging
+import queue
+import sqlite3
+import threading
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Pragmas applied to the long-lived writer connection
+WRITER_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA busy_timeout=5000',
+)
+
+
+def configure_connection(conn: sqlite3.Connection) -> sqlite3.Connection:
+    """Apply the WAL/performance pragmas to a connection"""
+    for pragma in WRITER_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+class _FlushMarker:
+    """Queue item that is signalled once everything before it is committed"""
+
+    __slots__ = ('done',)
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+
+class SQLiteWriter:
+    """Single-connection, queue-fed batch writer for one SQLite database
+
+    submit() never touches the disk: it only enqueues. The writer thread
+    drains up to max_batch queued statements at a time, groups consecutive
+    statements with the same SQL into one executemany call, and commits the
+    whole drain as a single transaction.
+    """
+
+    def __init__(self, db_path: str, max_batch: int = 1000):
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self._queue: 'queue.Queue' = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start the writer thread if it is not running"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='sqlite-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, sql: str, rows: Iterable[Sequence]):
+        """Queue rows to be written with executemany(sql, rows)"""
+        rows = list(rows)
+        if rows:
+            self.start()
+            self._queue.put((sql, rows))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until everything submitted so far has been committed"""
+        if self._thread is None or not self._thread.is_alive():
+            return True
+        marker = _FlushMarker()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """Commit outstanding writes and stop the writer thread"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _run(self):
+        try:
+            conn = configure_connection(sqlite3.connect(self.db_path))
+        except Exception as e:
+            logger.error(f"SQLite writer could not open {self.db_path}: {e}")
+            return
+
+        try:
+            while True:
+                items = [self._queue.get()]
+                while len(items) < self.max_batch:
+                    try:
+                        items.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+
+                statements: List[Tuple[str, list]] = []
+                markers = []
+                stop = False
+                for item in items:
+                    if item is _STOP:
+                        stop = True
+                    elif isinstance(item, _FlushMarker):
+                        markers.append(item)
+                    elif statements and statements[-1][0] == item[0]:
+                        statements[-1][1].extend(item[1])
+                    else:
+                        statements.append((item[0], list(item[1])))
+
+                if statements:
+                    self._write(conn, statements)
+
+                for marker in markers:
+                    marker.done.set()
+
+                if stop:
+                    break
+        finally:
+            conn.close()
+
+    def _write(self, conn: sqlite3.Connection, statements: List[Tuple[str, list]]):
+        """Write one drained batch as a single transaction"""
+        try:
+            with conn:
+                for sql, rows in statements:
+                    conn.executemany(sql, rows)
+            logger.debug(
+                f"SQLite writer committed {sum(len(rows) for _, rows in statements)} rows")
+            return
+        except Exception as e:
+            logger.error(f"SQLite writer batch failed, retrying statements: {e}")
+
+        # Retry statement by statement so one bad write does not drop the rest
+        for sql, rows in statements:
+            try:
+                with conn:
+                    conn.executemany(sql, rows)
+            except Exception as e:
+                logger.error(f"SQLite writer dropped {len(rows)} rows: {e}")
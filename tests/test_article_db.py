@@ -0,0 +1,137 @@
+"""Article schema migrations and the FTS index triggers"""
+
+import json
+import sqlite3
+
+import pytest
+
+from article_db import (SCHEMA_VERSION, article_write_statements, count_search_results,
+                        init_article_schema, query_articles, search_articles)
+
+
+def store(conn, articles):
+    for sql, rows in article_write_statements(articles):
+        conn.executemany(sql, rows)
+    conn.commit()
+
+
+def search_ids(conn, text):
+    return sorted(article['id'] for article in search_articles(conn, text))
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    init_article_schema(conn)
+    yield conn
+    conn.close()
+
+
+def test_legacy_blob_table_is_migrated(tmp_path):
+    path = str(tmp_path / 'news_cache.db')
+    legacy = sqlite3.connect(path)
+    legacy.execute('''
+        CREATE TABLE articles (
+            id TEXT PRIMARY KEY, data TEXT NOT NULL, source TEXT, category TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    legacy.execute('CREATE INDEX idx_articles_source ON articles(source)')
+    article = {
+        'id': 'a1', 'title': 'Nairobi traders welcome new port rules',
+        'description': 'Mombasa cargo moves faster', 'url': 'https://example.com/a1',
+        'source': 'Daily Nation', 'category': 'Business', 'language': 'en',
+        'published_at': '2024-05-01T09:30:00+03:00', 'is_breaking': True,
+        'country_focus': ['kenya', 'uganda'],
+    }
+    legacy.execute('INSERT INTO articles (id, data, source, category, created_at) '
+                   'VALUES (?, ?, ?, ?, ?)',
+                   ('a1', json.dumps(article), 'Daily Nation', 'Business',
+                    '2024-05-01 06:31:00'))
+    legacy.execute("INSERT INTO articles (id, data) VALUES ('bad', 'not json')")
+    legacy.commit()
+    legacy.close()
+
+    conn = sqlite3.connect(path)
+    init_article_schema(conn)
+
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master")}
+    assert 'articles_v1' not in tables
+    assert conn.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION
+    [migrated] = query_articles(conn)
+    assert migrated['title'] == article['title']
+    assert migrated['category'] == 'business'
+    assert migrated['is_breaking'] is True
+    assert migrated['published_at'] == '2024-05-01T06:30:00'
+    assert migrated['country_focus'] == ['kenya', 'uganda']
+    assert conn.execute("SELECT created_at FROM articles").fetchone()[0] == '2024-05-01 06:31:00'
+    # Migrated rows are searchable straight away
+    assert search_ids(conn, 'mombasa') == ['a1']
+    conn.close()
+
+
+def test_schema_init_is_idempotent(tmp_path):
+    path = str(tmp_path / 'news_cache.db')
+    conn = sqlite3.connect(path)
+    init_article_schema(conn)
+    store(conn, [{'id': 'a1', 'title': 'Accra hosts summit'}])
+    init_article_schema(conn)
+
+    assert [a['id'] for a in query_articles(conn)] == ['a1']
+    assert search_ids(conn, 'accra') == ['a1']
+    conn.close()
+
+
+def test_version_4_timestamps_are_normalized(tmp_path):
+    path = str(tmp_path / 'news_cache.db')
+    conn = sqlite3.connect(path)
+    init_article_schema(conn)
+    # Values written in the formats older versions stored
+    conn.execute("INSERT INTO articles (id, title, published_at) "
+                 "VALUES ('a1', 'One', '2024-05-01T12:00:00.123456+02:00')")
+    conn.execute("INSERT INTO articles (id, title, published_at) "
+                 "VALUES ('a2', 'Two', 'yesterday')")
+    conn.execute("INSERT INTO article_countries (article_id, position, country, published_at) "
+                 "VALUES ('a1', 0, 'ghana', '2024-05-01T12:00:00.123456+02:00')")
+    conn.execute('PRAGMA user_version = 4')
+    conn.commit()
+
+    init_article_schema(conn)
+
+    stored = dict(conn.execute('SELECT id, published_at FROM articles'))
+    assert stored == {'a1': '2024-05-01T10:00:00', 'a2': None}
+    assert conn.execute('SELECT published_at FROM article_countries').fetchone()[0] == \
+        '2024-05-01T10:00:00'
+    conn.close()
+
+
+def test_triggers_keep_search_in_sync(conn):
+    store(conn, [
+        {'id': 'a1', 'title': 'Lagos floods displace thousands',
+         'description': 'Heavy rain in Nigeria'},
+        {'id': 'a2', 'title': 'Kampala marathon draws record field',
+         'description': 'Runners from Kenya and Uganda'},
+    ])
+    assert search_ids(conn, 'floods') == ['a1']
+    assert search_ids(conn, 'uganda') == ['a2']
+
+    # Upserting new text replaces the indexed text
+    store(conn, [{'id': 'a1', 'title': 'Lagos drainage works begin',
+                  'description': 'Heavy rain in Nigeria'}])
+    assert search_ids(conn, 'floods') == []
+    assert search_ids(conn, 'drainage') == ['a1']
+
+    conn.execute("DELETE FROM articles WHERE id = 'a2'")
+    conn.commit()
+    assert search_ids(conn, 'kampala') == []
+    assert count_search_results(conn, 'rain') == 1
+
+
+def test_search_prefix_matches_the_last_word(conn):
+    store(conn, [{'id': 'a1', 'title': 'Johannesburg stocks rally'},
+                 {'id': 'a2', 'title': 'Johannesburg derby ends level'}])
+
+    assert search_ids(conn, 'johannesburg sto') == ['a1']
+    assert search_ids(conn, 'joh') == ['a1', 'a2']
+    # Operators are searched as words, not parsed
+    assert search_ids(conn, 'NOT') == []
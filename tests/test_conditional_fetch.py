@@ -0,0 +1,108 @@
+"""Conditional feed requests: ETag/Last-Modified, 304s and unchanged bodies"""
+
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from feed_fetcher import FeedFetcher
+from feed_validators import FeedValidatorStore
+from source_health import SourceHealthStore
+
+FEED = '<rss version="2.0"><channel><title>Feed</title></channel></rss>'
+
+
+def feed_app(requests, etag='"v1"', last_modified='Wed, 01 May 2024 09:00:00 GMT',
+             status=200):
+    async def handler(request):
+        requests.append(dict(request.headers))
+        if status != 200:
+            return web.Response(status=status)
+        headers = {}
+        if etag:
+            headers['ETag'] = etag
+            if request.headers.get('If-None-Match') == etag:
+                return web.Response(status=304, headers=headers)
+        if last_modified:
+            headers['Last-Modified'] = last_modified
+        return web.Response(text=FEED, headers=headers, content_type='application/rss+xml')
+
+    app = web.Application()
+    app.router.add_get('/rss', handler)
+    return app
+
+
+def fetch_twice(app, validators, health=None, conditional=True):
+    async def run():
+        fetcher = FeedFetcher()
+        async with TestServer(app) as server:
+            url = str(server.make_url('/rss'))
+            try:
+                return [await fetcher.fetch_feed('feed', url, validators,
+                                                 conditional=conditional, health=health)
+                        for _ in range(2)]
+            finally:
+                await fetcher.close()
+    return asyncio.run(run())
+
+
+def test_second_request_gets_304(tmp_path):
+    requests = []
+    validators = FeedValidatorStore(str(tmp_path / 'news_cache.db'))
+
+    first, second = fetch_twice(feed_app(requests), validators)
+
+    assert first == (True, FEED)
+    assert second == (False, None)
+    assert 'If-None-Match' not in requests[0]
+    assert requests[1]['If-None-Match'] == '"v1"'
+    assert requests[1]['If-Modified-Since'] == 'Wed, 01 May 2024 09:00:00 GMT'
+
+
+def test_validators_survive_a_restart(tmp_path):
+    path = str(tmp_path / 'news_cache.db')
+    validators = FeedValidatorStore(path)
+    fetch_twice(feed_app([]), validators)
+    validators.flush()
+
+    requests = []
+    restarted = FeedValidatorStore(path)
+    first, _ = fetch_twice(feed_app(requests), restarted)
+
+    assert first == (False, None)
+    assert requests[0]['If-None-Match'] == '"v1"'
+
+
+def test_unchanged_body_without_validators_is_not_returned(tmp_path):
+    requests = []
+    validators = FeedValidatorStore(str(tmp_path / 'news_cache.db'))
+
+    first, second = fetch_twice(feed_app(requests, etag=None, last_modified=None),
+                                validators)
+
+    assert first == (True, FEED)
+    assert second == (False, None)
+    assert 'If-None-Match' not in requests[1]
+
+
+def test_unconditional_fetch_always_returns_the_body(tmp_path):
+    requests = []
+    validators = FeedValidatorStore(str(tmp_path / 'news_cache.db'))
+
+    results = fetch_twice(feed_app(requests), validators, conditional=False)
+
+    assert results == [(True, FEED), (True, FEED)]
+    assert all('If-None-Match' not in headers for headers in requests)
+
+
+def test_304_and_errors_are_recorded_as_health(tmp_path):
+    path = str(tmp_path / 'news_cache.db')
+    health = SourceHealthStore(path)
+
+    fetch_twice(feed_app([]), FeedValidatorStore(path), health=health)
+    assert health.get('feed').successes == 2
+
+    results = fetch_twice(feed_app([], status=503), FeedValidatorStore(path), health=health)
+    assert results == [None, None]
+    assert health.get('feed').consecutive_failures == 2
+    assert health.get('feed').last_error == 'HTTP 503'
@@ -0,0 +1,69 @@
+"""Gazetteer classification of feed entries through the daemon aggregator"""
+
+import asyncio
+
+import pytest
+
+from feed_fetcher import create_parse_executor
+from news_aggregator import AfricanNewsAggregator
+
+FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>Test feed</title>
+<item><title>Lagos governor meets investors</title>
+<description>Trade and investment in Nigeria's biggest city</description>
+<link>https://example.com/lagos</link></item>
+<item><title>Ceasefire talks resume in Juba</title>
+<description>The president of South Sudan met ministers</description>
+<link>https://example.com/juba</link></item>
+<item><title>Côte d'Ivoire and Ghana sign football deal</title>
+<description>Abidjan will host the match</description>
+<link>https://example.com/abidjan</link></item>
+<item><title>Weather warning issued for the weekend</title>
+<description>Heavy rain is expected</description>
+<link>https://example.com/weather</link></item>
+</channel></rss>
+"""
+
+
+@pytest.fixture
+def aggregator(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    aggregator = AfricanNewsAggregator()
+    aggregator.parse_executor = create_parse_executor('thread')
+
+    async def fetch_feed(source, url, validators, conditional=True, health=None):
+        return True, FEED
+
+    monkeypatch.setattr(aggregator.fetcher, 'fetch_feed', fetch_feed)
+    yield aggregator
+    aggregator.close()
+
+
+def fetch(aggregator, source_id):
+    articles = asyncio.run(aggregator.fetch_rss_feed(
+        source_id, aggregator.news_sources[source_id]))
+    return {article.url.rsplit('/', 1)[-1]: article for article in articles}
+
+
+def test_feed_entries_are_classified_from_the_gazetteer(aggregator):
+    articles = fetch(aggregator, 'bbc_africa')
+
+    assert list(articles['lagos'].country_focus) == ['nigeria']
+    assert articles['lagos'].category == 'business'
+    # 'South Sudan' wins over the 'sudan' inside it
+    assert list(articles['juba'].country_focus) == ['south-sudan']
+    assert articles['juba'].category == 'politics'
+    # Accents are folded and both countries are kept, in gazetteer order
+    assert list(articles['abidjan'].country_focus) == ['ghana', 'ivory-coast']
+    assert articles['abidjan'].category == 'sports'
+
+
+def test_unmatched_entries_fall_back_to_the_source(aggregator):
+    source_id = next(source_id for source_id, info in aggregator.news_sources.items()
+                     if info['country'] == 'kenya')
+    source = aggregator.news_sources[source_id]
+
+    article = fetch(aggregator, source_id)['weather']
+
+    assert list(article.country_focus) == ['kenya']
+    assert article.category == source['category']
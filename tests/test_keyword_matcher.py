@@ -0,0 +1,85 @@
+"""Aho-Corasick keyword matching over word tokens"""
+
+import pytest
+
+from keyword_matcher import AhoCorasick, GazetteerMatcher, tokenize
+
+GAZETTEER = {
+    'countries': {
+        'niger': ['niger', 'niamey'],
+        'nigeria': ['nigeria', 'lagos'],
+        'sudan': ['sudan', 'khartoum'],
+        'south-sudan': ['south sudan', 'juba'],
+        'ivory-coast': ["cote d'ivoire", 'abidjan'],
+    },
+    'categories': [
+        {'name': 'technology', 'keywords': ['tech', 'startup']},
+        {'name': 'business', 'keywords': ['bank', 'market']},
+        {'name': 'politics', 'keywords': ['election', 'minister']},
+    ],
+}
+
+
+@pytest.fixture(scope='module')
+def matcher():
+    return GazetteerMatcher(GAZETTEER)
+
+
+def test_tokenize_folds_case_accents_and_possessives():
+    assert tokenize("Côte d’Ivoire's Lomé-based BANKS") == \
+        ["cote", "d'ivoire", 'lome', 'based', 'banks']
+
+
+def test_overlapping_matches_are_all_reported():
+    automaton = AhoCorasick([('a', 'b'), ('b', 'c'), ('a', 'b', 'c', 'd'), ('c',)])
+
+    matches = sorted(automaton.iter_matches(['a', 'b', 'c', 'd']))
+
+    assert matches == [(0, 2, 0), (0, 4, 2), (1, 3, 1), (2, 3, 3)]
+
+
+def test_failure_links_recover_inside_a_partial_match():
+    automaton = AhoCorasick([('a', 'a', 'b')])
+
+    assert list(automaton.iter_matches(['a', 'a', 'a', 'b'])) == [(1, 4, 0)]
+
+
+def test_find_all_prefers_leftmost_longest():
+    automaton = AhoCorasick([('sudan',), ('south', 'sudan'), ('south',)])
+
+    assert automaton.find_all(['in', 'south', 'sudan', 'and', 'sudan']) == \
+        [(1, 3, 1), (4, 5, 0)]
+
+
+def test_plurals_match_their_singular_keyword():
+    automaton = AhoCorasick([('bank',)])
+
+    assert automaton.find_all(['central', 'banks']) == [(1, 2, 0)]
+
+
+def test_matches_stay_on_word_boundaries(matcher):
+    assert matcher.countries_in('Nigeria and Nigerian markets') == ['nigeria']
+    assert matcher.countries_in('Floods in Niger') == ['niger']
+    assert matcher.countries_in('Nigerians vote') == []
+
+
+def test_multi_word_names_win_over_contained_names(matcher):
+    assert matcher.countries_in('Talks in Juba, South Sudan') == ['south-sudan']
+    assert matcher.countries_in('South Sudan and Sudan sign deal') == ['sudan', 'south-sudan']
+
+
+def test_accented_keywords_match(matcher):
+    assert matcher.countries_in("Côte d'Ivoire beats Nigeria") == ['nigeria', 'ivory-coast']
+
+
+def test_category_follows_gazetteer_priority(matcher):
+    assert matcher.match('Lagos startup raises money from a bank') == (['nigeria'], 'technology')
+    assert matcher.category_of('Minister comments on the market') == 'business'
+    assert matcher.category_of('Weather in Niamey') is None
+
+
+def test_bundled_gazetteer_compiles():
+    matcher = GazetteerMatcher.load()
+
+    assert matcher.automaton.size > 0
+    assert 'nigeria' in matcher.countries_in('Protests in Lagos')
@@ -0,0 +1,99 @@
+"""Leader election between workers sharing one database"""
+
+import sqlite3
+import time
+
+import pytest
+
+import leader_lease
+from leader_lease import LeaderLease
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return str(tmp_path / 'news_cache.db')
+
+
+def test_only_one_worker_holds_the_lease(db_path):
+    first = LeaderLease(db_path, holder='first')
+    second = LeaderLease(db_path, holder='second')
+
+    assert first.acquire()
+    assert not second.acquire()
+    # Renewing keeps it with the holder
+    assert first.acquire()
+    assert first.is_leader and not second.is_leader
+
+
+def test_expired_lease_is_taken_over(db_path):
+    first = LeaderLease(db_path, holder='first', lease_seconds=0.2)
+    second = LeaderLease(db_path, holder='second', lease_seconds=0.2)
+    assert first.acquire()
+
+    time.sleep(0.3)
+
+    # The old holder stepped down without renewing
+    assert not first.is_leader
+    assert second.acquire()
+    assert not first.acquire()
+
+
+def test_release_hands_over_immediately(db_path):
+    first = LeaderLease(db_path, holder='first')
+    second = LeaderLease(db_path, holder='second')
+    first.acquire()
+
+    first.release()
+
+    assert not first.is_leader
+    assert second.acquire()
+
+
+def test_release_does_not_drop_another_workers_lease(db_path):
+    first = LeaderLease(db_path, holder='first')
+    second = LeaderLease(db_path, holder='second')
+    first.acquire()
+
+    second.release()
+
+    conn = sqlite3.connect(db_path)
+    holder = conn.execute("SELECT holder FROM leader_lease").fetchone()[0]
+    conn.close()
+    assert holder == 'first'
+
+
+def test_holder_steps_down_when_renewal_fails(db_path, monkeypatch):
+    monkeypatch.setattr(leader_lease, 'LOCK_TIMEOUT', 0.05)
+    lease = LeaderLease(db_path, holder='first', lease_seconds=0.3)
+    assert lease.acquire()
+
+    # Another process keeps the database locked past the lease
+    blocker = sqlite3.connect(db_path, isolation_level=None)
+    blocker.execute('BEGIN EXCLUSIVE')
+    try:
+        assert lease.acquire()  # renewal failed, but the lease still runs
+        time.sleep(0.35)
+        assert not lease.acquire()
+        assert not lease.is_leader
+    finally:
+        blocker.execute('ROLLBACK')
+        blocker.close()
+
+    assert lease.acquire()
+
+
+def test_start_and_stop(db_path):
+    lease = LeaderLease(db_path, holder='first', lease_seconds=0.3)
+    other = LeaderLease(db_path, holder='second', lease_seconds=0.3)
+
+    lease.start()
+    try:
+        # The background thread renews before the lease runs out
+        time.sleep(0.5)
+        assert lease.is_leader
+        assert not other.acquire()
+    finally:
+        lease.stop()
+
+    assert not lease.is_leader
+    assert other.acquire()
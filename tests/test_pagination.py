@@ -0,0 +1,151 @@
+"""Cursor pagination over the snapshot and the SQLite article table"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from article_db import article_write_statements, init_article_schema, query_articles
+from news_snapshot import NewsSnapshot, sort_key
+from pagination import cursor_sort_key, decode_cursor, encode_cursor, next_cursor
+
+START = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def make_articles(count, undated=0):
+    articles = []
+    for i in range(count):
+        # Pairs share a timestamp so ties are broken by id
+        articles.append({
+            'id': f"a{i:03d}",
+            'title': f"Story {i}",
+            'published_at': (START + timedelta(minutes=i // 2)).isoformat(),
+            'category': 'politics' if i % 3 else 'business',
+            'country_focus': ['kenya'] if i % 2 else ['nigeria'],
+        })
+    for i in range(undated):
+        articles.append({'id': f"u{i:03d}", 'title': f"Undated {i}",
+                         'published_at': None, 'category': 'politics',
+                         'country_focus': ['kenya']})
+    return articles
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor({'id': 'abc', 'published_at': START})
+    assert decode_cursor(cursor) == (START.isoformat(), 'abc')
+
+
+@pytest.mark.parametrize('cursor', ['not base64 json!', 'W10', 'eyJhIjoxfQ'])
+def test_foreign_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_next_cursor_is_none_on_the_last_page():
+    assert next_cursor([{'id': 'a', 'published_at': None}], has_more=False) is None
+    assert next_cursor([], has_more=True) is None
+
+
+def walk_snapshot(snapshot, limit, **filters):
+    seen = []
+    cursor = (float('inf'), '')
+    while True:
+        total, page, has_more = snapshot.page_after(cursor, limit=limit, **filters)
+        seen.extend(article['id'] for article in page)
+        if not has_more:
+            return total, seen
+        cursor = cursor_sort_key(decode_cursor(next_cursor(page, has_more)))
+
+
+def test_snapshot_pages_cover_every_article_once():
+    snapshot = NewsSnapshot.build(make_articles(45, undated=3))
+
+    total, seen = walk_snapshot(snapshot, limit=7)
+
+    expected = [article['id'] for article in snapshot.articles]
+    assert total == 48
+    assert seen == expected
+
+
+def test_snapshot_cursor_survives_a_refresh():
+    articles = make_articles(30)
+    first = NewsSnapshot.build(articles)
+    _, page, has_more = first.page_after((float('inf'), ''), limit=10)
+    cursor = cursor_sort_key(decode_cursor(next_cursor(page, has_more)))
+
+    # Newer stories arrive between two page requests
+    newer = [{'id': f"n{i}", 'title': 'New',
+              'published_at': (START + timedelta(days=1, minutes=i)).isoformat()}
+             for i in range(5)]
+    second = NewsSnapshot.build(articles + newer)
+    _, next_page, _ = second.page_after(cursor, limit=10)
+
+    ordered = sorted(articles, key=sort_key, reverse=True)
+    assert [a['id'] for a in next_page] == [a['id'] for a in ordered[10:20]]
+
+
+def test_snapshot_cursor_with_filters():
+    snapshot = NewsSnapshot.build(make_articles(40))
+
+    total, seen = walk_snapshot(snapshot, limit=4, country='kenya', category='politics')
+
+    expected = [article['id'] for article in snapshot.query(country='kenya', category='politics')]
+    assert total == len(expected)
+    assert seen == expected
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(':memory:')
+    init_article_schema(conn)
+    yield conn
+    conn.close()
+
+
+def store(conn, articles):
+    for sql, rows in article_write_statements(articles):
+        conn.executemany(sql, rows)
+    conn.commit()
+
+
+def walk_database(conn, limit, **filters):
+    seen = []
+    after = None
+    while True:
+        page = query_articles(conn, limit=limit + 1, after=after, **filters)
+        has_more = len(page) > limit
+        page = page[:limit]
+        seen.extend(article['id'] for article in page)
+        cursor = next_cursor(page, has_more)
+        if cursor is None:
+            return seen
+        after = decode_cursor(cursor)
+
+
+@pytest.mark.parametrize('filters', [{}, {'country': 'kenya'}, {'category': 'politics'}])
+def test_database_pages_cover_every_article_once(conn, filters):
+    articles = make_articles(35, undated=4)
+    store(conn, articles)
+
+    seen = walk_database(conn, limit=6, **filters)
+
+    expected = [article['id'] for article in query_articles(conn, **filters)]
+    assert seen == expected
+    assert len(seen) == len(set(seen))
+    # Undated articles come last, after every dated one
+    undated = [article_id for article_id in seen if article_id.startswith('u')]
+    assert seen[len(seen) - len(undated):] == undated
+
+
+def test_database_cursor_accepts_offset_timestamps(conn):
+    store(conn, [
+        {'id': 'utc', 'title': 'UTC', 'published_at': '2024-05-01T12:00:00'},
+        {'id': 'east', 'title': 'UTC+3', 'published_at': '2024-05-01T14:30:00+03:00'},
+        {'id': 'zulu', 'title': 'Z', 'published_at': '2024-05-01T11:00:00Z'},
+    ])
+
+    # 14:30+03:00 is 11:30 UTC, between the other two
+    assert [a['id'] for a in query_articles(conn)] == ['utc', 'east', 'zulu']
+    after = decode_cursor(encode_cursor({'id': 'east',
+                                         'published_at': '2024-05-01T14:30:00+03:00'}))
+    assert [a['id'] for a in query_articles(conn, after=after)] == ['zulu']
@@ -0,0 +1,55 @@
+"""ETags and If-None-Match handling of pre-rendered API responses"""
+
+import gzip
+import json
+
+from response_cache import (ResponseCache, accepted_encodings, dynamic_etag,
+                            not_modified)
+
+PAYLOAD = {'articles': [{'id': 'a1', 'title': 'Kigali tech week opens'}], 'total': 1}
+
+
+def test_each_variant_has_its_own_strong_etag():
+    response = ResponseCache('7-1714550400').add('latest', PAYLOAD)
+
+    body, encoding = response.select('gzip, deflate')
+    assert encoding == 'gzip'
+    assert json.loads(gzip.decompress(body)) == PAYLOAD
+
+    identity = response.headers(None)['ETag']
+    gzipped = response.headers('gzip')['ETag']
+    assert identity != gzipped
+    assert identity.startswith('"7-1714550400-') and not identity.startswith('W/')
+    assert response.headers('gzip')['Vary'] == 'Accept-Encoding'
+
+
+def test_any_held_variant_is_not_modified():
+    response = ResponseCache('7-1714550400').add('latest', PAYLOAD)
+    gzipped = response.headers('gzip')['ETag']
+
+    assert response.is_not_modified(gzipped)
+    # Weak comparison and lists of tags, as clients and proxies send them
+    assert response.is_not_modified(f'"other", W/{gzipped}')
+    assert response.is_not_modified('*')
+    assert not response.is_not_modified('"other"')
+    assert not response.is_not_modified(None)
+
+
+def test_a_new_snapshot_changes_the_etag():
+    old = ResponseCache('7-1714550400').add('latest', PAYLOAD)
+    new = ResponseCache('8-1714550460').add('latest', PAYLOAD)
+
+    assert not new.is_not_modified(old.headers(None)['ETag'])
+
+
+def test_dynamic_etags_depend_on_snapshot_and_request():
+    etag = dynamic_etag('7-1714550400', '/news/search?q=kigali')
+
+    assert not_modified(etag, (dynamic_etag('7-1714550400', '/news/search?q=kigali'),))
+    assert not not_modified(etag, (dynamic_etag('8-1714550460', '/news/search?q=kigali'),))
+    assert not not_modified(etag, (dynamic_etag('7-1714550400', '/news/search?q=accra'),))
+
+
+def test_refused_encodings_are_not_accepted():
+    assert accepted_encodings('gzip;q=0, br;q=0.5, identity') == {'br', 'identity'}
+    assert accepted_encodings(None) == set()
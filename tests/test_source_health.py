@@ -0,0 +1,85 @@
+"""The per-source circuit breaker"""
+
+import pytest
+
+from source_health import (PROBE_TIMEOUT, STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN,
+                           SourceHealthStore)
+
+NOW = 1_714_550_400.0
+
+
+@pytest.fixture
+def health(tmp_path):
+    return SourceHealthStore(str(tmp_path / 'news_cache.db'), failure_threshold=3,
+                             open_seconds=60, max_open_seconds=200)
+
+
+def fail(health, times, now=NOW):
+    for _ in range(times):
+        health.record_failure('feed', 1.0, 'timeout', now=now)
+
+
+def test_circuit_opens_after_the_failure_threshold(health):
+    fail(health, 2)
+    assert health.get('feed').state == STATE_CLOSED
+    assert health.allow('feed', NOW)
+
+    fail(health, 1)
+
+    assert health.get('feed').state == STATE_OPEN
+    assert not health.allow('feed', NOW + 59)
+    assert health.retry_at('feed') == NOW + 60
+
+
+def test_open_circuit_lets_one_probe_through(health):
+    fail(health, 3)
+
+    assert health.allow('feed', NOW + 60)
+    assert health.get('feed').state == STATE_HALF_OPEN
+    assert health.timeout_for('feed') == PROBE_TIMEOUT
+
+
+def test_failed_probes_back_off_exponentially(health):
+    fail(health, 3)
+    waits = []
+    now = NOW
+    for _ in range(4):
+        now = health.retry_at('feed')
+        assert health.allow('feed', now)
+        fail(health, 1, now=now)
+        waits.append(health.retry_at('feed') - now)
+
+    # 60s doubles per failed probe, capped at max_open_seconds
+    assert waits == [120, 200, 200, 200]
+
+
+def test_successful_probe_closes_the_circuit(health):
+    fail(health, 3)
+    health.allow('feed', NOW + 60)
+
+    health.record_success('feed', 0.5)
+
+    record = health.get('feed')
+    assert record.state == STATE_CLOSED
+    assert record.consecutive_failures == 0
+    assert health.retry_at('feed') == 0.0
+    assert health.allow('feed', NOW + 61)
+
+
+def test_success_resets_the_failure_streak(health):
+    fail(health, 2)
+    health.record_success('feed', 0.5)
+    fail(health, 2)
+
+    assert health.get('feed').state == STATE_CLOSED
+
+
+def test_open_circuits_survive_a_restart(health):
+    fail(health, 3)
+    health.flush()
+
+    restarted = SourceHealthStore(health.db_path)
+
+    assert restarted.get('feed').state == STATE_OPEN
+    assert not restarted.allow('feed', NOW + 30)
+    assert restarted.report()[0]['source'] == 'feed'
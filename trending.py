@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Trending Engine
+Incremental topic counts over sliding 1h/6h/24h windows of time buckets,
+with exponential decay, multi-word phrases and velocity against the
+day's baseline
+"""
+
+import heapq
+import logging
+import os
+import re
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from article_store import published_timestamp
+
+logger = logging.getLogger(__name__)
+
+# Width of the time buckets articles are counted in
+BUCKET_SECONDS = int(os.getenv('NEWS_TREND_BUCKET_SECONDS', 300))
+# Sliding windows topics are ranked over; decay half-life is a quarter of each
+WINDOWS = {'1h': 3600, '6h': 6 * 3600, '24h': 24 * 3600}
+DEFAULT_WINDOW = '24h'
+# Articles a topic needs within a window to be ranked
+MIN_MENTIONS = int(os.getenv('NEWS_TREND_MIN_MENTIONS', 2))
+# Topics kept per window; requests slice these
+MAX_TOPICS = 50
+# Longest phrase detected, in words
+MAX_PHRASE_WORDS = 3
+# Shortest single word counted as a topic
+MIN_WORD_LENGTH = 4
+# Weight of velocity (last hour vs the day's hourly baseline) in the rank
+VELOCITY_WEIGHT = 0.5
+# A word or phrase mostly seen inside a longer ranked phrase is left out
+PHRASE_COVERAGE = 1.25
+# Decay weights are rebased before they grow past this many half-lives
+MAX_DECAY_HALF_LIVES = 64
+
+STOP_WORDS = frozenset({
+    'a', 'about', 'after', 'against', 'all', 'also', 'an', 'and', 'are', 'as',
+    'at', 'be', 'been', 'before', 'but', 'by', 'can', 'could', 'did', 'do',
+    'for', 'from', 'had', 'has', 'have', 'he', 'her', 'his', 'how', 'i', 'if',
+    'in', 'into', 'is', 'it', 'its', 'more', 'new', 'news', 'no', 'not', 'of',
+    'on', 'or', 'our', 'out', 'over', 'said', 'says', 'she', 'so', 'than',
+    'that', 'the', 'their', 'them', 'there', 'they', 'this', 'to', 'up', 'us',
+    'was', 'we', 'were', 'what', 'when', 'where', 'which', 'while', 'who',
+    'why', 'will', 'with', 'would', 'you',
+})
+
+# WordPress feed footer ("The post <title> appeared first on <site>")
+FEED_FOOTER = re.compile(r"\bthe post .* appeared first on .*$", re.DOTALL)
+# Punctuation that ends a phrase; possessives are dropped before tokenizing
+PHRASE_BREAK = re.compile(r"[.,;:!?()\[\]\"|“”—–]+|\s-\s")
+POSSESSIVE = re.compile(r"['’]s\b")
+TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def extract_terms(text: str) -> Set[str]:
+    """Words and phrases of up to MAX_PHRASE_WORDS words in text
+
+    Phrases never span punctuation or stop words, so "South Africa" is one
+    topic and "president of kenya" is not.
+    """
+    terms = set()
+    text = POSSESSIVE.sub('', FEED_FOOTER.sub('', text.lower()))
+    for chunk in PHRASE_BREAK.split(text):
+        tokens = TOKEN.findall(chunk)
+        for i, token in enumerate(tokens):
+            if token in STOP_WORDS:
+                continue
+            if len(token) >= MIN_WORD_LENGTH and not token.isdigit():
+                terms.add(token)
+            phrase = [token]
+            for following in tokens[i + 1:i + MAX_PHRASE_WORDS]:
+                if following in STOP_WORDS:
+                    break
+                phrase.append(following)
+                terms.add(' '.join(phrase))
+    return terms
+
+
+def _article_fields(article) -> Tuple[str, str, str, float]:
+    """(id, title, description, published timestamp) of an article or dict"""
+    if isinstance(article, dict):
+        return (article.get('id') or '', article.get('title') or '',
+                article.get('description') or '', published_timestamp(article))
+    return (article.id, article.title or '', article.description or '',
+            article.published_at.timestamp())
+
+
+class _Window:
+    """Counts and decayed scores of every term in one sliding window"""
+
+    __slots__ = ('name', 'buckets', 'half_life', 'start', 'landmark',
+                 'counts', 'scores')
+
+    def __init__(self, name: str, seconds: int, start: int, landmark: float):
+        self.name = name
+        self.buckets = max(seconds // BUCKET_SECONDS, 1)
+        self.half_life = seconds / 4
+        # Oldest bucket still inside the window
+        self.start = start
+        # Decay weights are relative to this time (forward decay), so adding
+        # or expiring a bucket never touches the other terms
+        self.landmark = landmark
+        self.counts: Dict[str, int] = {}
+        self.scores: Dict[str, float] = {}
+
+    def weight(self, bucket: int) -> float:
+        return 2.0 ** ((bucket * BUCKET_SECONDS - self.landmark) / self.half_life)
+
+    def add(self, terms: Iterable[str], bucket: int, sign: int = 1):
+        weight = sign * self.weight(bucket)
+        counts, scores = self.counts, self.scores
+        for term in terms:
+            count = counts.get(term, 0) + sign
+            if count > 0:
+                counts[term] = count
+                scores[term] = scores.get(term, 0.0) + weight
+            else:
+                counts.pop(term, None)
+                scores.pop(term, None)
+
+    def rebase(self, landmark: float):
+        """Move the landmark forward so weights stay within float range"""
+        factor = 2.0 ** ((self.landmark - landmark) / self.half_life)
+        self.scores = {term: score * factor for term, score in self.scores.items()}
+        self.landmark = landmark
+
+    def decay(self, now: float) -> float:
+        """Factor turning stored scores into scores as of now"""
+        return 2.0 ** ((self.landmark - now) / self.half_life)
+
+
+class TrendingEngine:
+    """Trending topics updated as articles arrive
+
+    Each article's words and phrases are counted once in the time bucket
+    of its publication; buckets leave each window as time passes, so
+    keeping the counts current costs work per article and per expired
+    bucket, never a rescan. Rankings are rebuilt once per change and
+    requests slice them.
+
+    Not thread-safe; callers update it from one thread or loop.
+    """
+
+    def __init__(self, windows: Optional[Dict[str, int]] = None,
+                 now: Optional[float] = None):
+        now = time.time() if now is None else now
+        self.current = int(now // BUCKET_SECONDS)
+        self._windows = {
+            name: _Window(name, seconds, self.current - seconds // BUCKET_SECONDS + 1, now)
+            for name, seconds in (windows or WINDOWS).items()
+        }
+        # Window the day's baseline and the last hour come from
+        self._longest = max(self._windows.values(), key=lambda window: window.buckets)
+        self._recent = min(self._windows.values(), key=lambda window: window.buckets)
+
+        # Terms of each article, by bucket, until the bucket leaves every window
+        self._buckets: Dict[int, List[Tuple[str, Set[str]]]] = {}
+        self._seen: Dict[str, int] = {}
+        self._rankings: Optional[Dict[str, Tuple[Dict, ...]]] = None
+
+    def __len__(self):
+        return len(self._seen)
+
+    def add(self, articles, now: Optional[float] = None) -> int:
+        """Count articles not seen before; returns how many were added"""
+        now = time.time() if now is None else now
+        self.advance(now)
+
+        added = 0
+        oldest = self._longest.start
+        for article in articles:
+            article_id, title, description, published = _article_fields(article)
+            if not article_id or article_id in self._seen:
+                continue
+            # Undated or future articles count as published now
+            bucket = int(min(published or now, now) // BUCKET_SECONDS)
+            if bucket < oldest:
+                continue
+
+            terms = extract_terms(title) | extract_terms(description)
+            self._buckets.setdefault(bucket, []).append((article_id, terms))
+            self._seen[article_id] = bucket
+            for window in self._windows.values():
+                if bucket >= window.start:
+                    window.add(terms, bucket)
+            added += 1
+
+        if added:
+            self._rankings = None
+        return added
+
+    def advance(self, now: Optional[float] = None):
+        """Expire buckets that have slid out of each window"""
+        now = time.time() if now is None else now
+        current = int(now // BUCKET_SECONDS)
+        if current <= self.current:
+            return
+        self.current = current
+
+        for window in self._windows.values():
+            start = current - window.buckets + 1
+            if start <= window.start:
+                continue
+            for bucket in sorted(b for b in self._buckets if window.start <= b < start):
+                for _, terms in self._buckets[bucket]:
+                    window.add(terms, bucket, sign=-1)
+            window.start = start
+            if now - window.landmark > MAX_DECAY_HALF_LIVES * window.half_life:
+                window.rebase(now)
+
+        oldest = self._longest.start
+        for bucket in [b for b in self._buckets if b < oldest]:
+            for article_id, _ in self._buckets.pop(bucket):
+                self._seen.pop(article_id, None)
+        self._rankings = None
+
+    def velocity(self, term: str) -> float:
+        """Mentions in the last hour against the hourly rate before it"""
+        recent = self._recent.counts.get(term, 0)
+        baseline = self._longest.counts.get(term, 0) - recent
+        hours = max((self._longest.buckets - self._recent.buckets) * BUCKET_SECONDS / 3600, 1.0)
+        recent_hours = self._recent.buckets * BUCKET_SECONDS / 3600
+        return ((recent + 1) / recent_hours) / ((baseline + 1) / hours)
+
+    def _rank(self, window: _Window, now: float) -> Tuple[Dict, ...]:
+        counts, scores = window.counts, window.scores
+        candidates = [term for term, count in counts.items() if count >= MIN_MENTIONS]
+        velocities = {term: self.velocity(term) for term in candidates}
+        # Ties go to the longer phrase
+        ranked = heapq.nlargest(
+            MAX_TOPICS * 3, candidates,
+            key=lambda term: (scores[term] * velocities[term] ** VELOCITY_WEIGHT,
+                              term.count(' ')))
+
+        # Words and shorter phrases that mostly occur inside a ranked phrase
+        covered = set()
+        for term in ranked:
+            words = term.split()
+            for size in range(1, len(words)):
+                for i in range(len(words) - size + 1):
+                    part = ' '.join(words[i:i + size])
+                    if counts.get(part, 0) <= counts[term] * PHRASE_COVERAGE:
+                        covered.add(part)
+
+        decay = window.decay(now)
+        topics = []
+        chosen: List[Tuple[Set[str], int]] = []
+        for term in ranked:
+            if term in covered:
+                continue
+            # Overlapping phrases with about the same count are one story
+            words, count = set(term.split()), counts[term]
+            if any(words & other_words and
+                   max(count, other_count) <= min(count, other_count) * PHRASE_COVERAGE
+                   for other_words, other_count in chosen):
+                continue
+            chosen.append((words, count))
+            topics.append({
+                'topic': term,
+                'count': counts[term],
+                'score': round(scores[term] * decay, 3),
+                'velocity': round(velocities[term], 2),
+            })
+            if len(topics) == MAX_TOPICS:
+                break
+        return tuple(topics)
+
+    def rankings(self, now: Optional[float] = None) -> Dict[str, Tuple[Dict, ...]]:
+        """Ranked topics of every window, rebuilt only after a change"""
+        now = time.time() if now is None else now
+        self.advance(now)
+        if self._rankings is None:
+            self._rankings = {name: self._rank(window, now)
+                              for name, window in self._windows.items()}
+        return self._rankings
+
+    def top(self, window: str = DEFAULT_WINDOW, limit: int = 10,
+            now: Optional[float] = None) -> Tuple[Dict, ...]:
+        """The limit highest ranked topics of a window"""
+        return self.rankings(now)[window][:limit]
+
+    def top_pairs(self, window: str = DEFAULT_WINDOW, limit: int = 10) -> List[Tuple[str, int]]:
+        """(topic, mentions) pairs, the shape get_trending_topics returns"""
+        return [(topic['topic'], topic['count']) for topic in self.top(window, limit)]